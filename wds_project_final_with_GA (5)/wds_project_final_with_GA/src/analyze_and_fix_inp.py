@@ -2,12 +2,12 @@ import sys
 import wntr
 import pandas as pd
 import numpy as np
+from sim_runner import run_hydraulics
 
 def run_hydraulic(inp_path):
     """Run hydraulic simulation and extract results"""
     wn = wntr.network.WaterNetworkModel(inp_path)
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
+    results = run_hydraulics(wn)
 
     pressures = results.node['pressure']
     demands = results.node['demand']
@@ -1,48 +1,39 @@
 import wntr
 import os
+from sim_cache import SimulationCache, run_hydraulics_cached
+from sim_runner import HydraulicSession
+from head_calibration import calibrate_heads
 
-def run_simulation(wn):
+def run_simulation(wn, cache=None, session=None):
     """Run a hydraulic simulation and return the minimum pressure."""
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
+    results = run_hydraulics_cached(wn, cache, session=session)
     pressures = results.node['pressure'].min(axis=1)
     return pressures.min()
 
 def main():
     inp_path = "data/Bangalore_WDS_with_heads.inp"
     wn = wntr.network.WaterNetworkModel(inp_path)
+    cache = SimulationCache()
+    session = HydraulicSession(wn)   # warm-starts each re-solve (native engine)
 
     print(f"🔍 Starting auto-fix for: {inp_path}")
     reservoirs = list(wn.reservoir_name_list)
     print(f"Found reservoirs: {reservoirs}")
 
-    # Initial parameters
-    step = 50  # increase in meters per iteration
-    max_iterations = 15
-    iteration = 0
-
-    while iteration < max_iterations:
-        iteration += 1
-        min_pressure = run_simulation(wn)
-        print(f"Iteration {iteration}: Min pressure = {min_pressure:.2f} m")
-
-        if min_pressure > 0:
-            print("✅ All pressures are positive — fix complete.")
-            break
-
-        # Increase reservoir heads
-        for name in reservoirs:
-            node = wn.get_node(name)
-            if hasattr(node, "base_head"):
-                node.base_head += step
-            else:
-                # Fallback (older versions)
-                try:
-                    node.head = node.head + step
-                except Exception:
-                    pass
-
-        print(f"⬆️  Increased all reservoir heads by {step} m")
+    min_pressure = run_simulation(wn, cache, session)
+    print(f"Initial min pressure = {min_pressure:.2f} m")
+
+    # Root-find the lowest head per source with positive pressure in its zone
+    calib = calibrate_heads(wn, target_pressure=0.0, session=session, cache=cache)
+    for name, head in calib["heads"].items():
+        print(f"⬆️  {name}: head → {head:.2f} m")
+    print(f"Min pressure = {calib['min_pressure']:.2f} m after {calib['n_solves']} solves")
+    if calib["converged"]:
+        print("✅ All pressures are positive — fix complete.")
+    else:
+        print("⚠️  Calibration did not converge; check the network.")
+
+    print(f"Simulation cache: {cache.stats()}")
 
     # Save the new INP file
     fixed_path = os.path.join("data", "Bangalore_WDS_final_fixed.inp")
@@ -0,0 +1,356 @@
+# src/candidate_store.py
+"""
+Candidate designs stored as deltas against a content-addressed base network.
+
+Writing a full INP per evaluated candidate copies ~22 KB of which only the
+diameter column changes. The store instead keeps every base INP once,
+keyed by the SHA-256 of its bytes, and each candidate as the values that
+differ from it: pipe diameters, reservoir heads and link statuses.
+Candidates are indexed by run, generation and fitness in a SQLite file,
+and a full INP is only produced when one is asked for:
+
+    store = CandidateStore()
+    base = store.add_base("data/Bangalore_WDS_Realistic.inp")
+    cid = store.add("ga_1760361054818", 3, 1.2e9, base,
+                    store.make_delta(base, diameters={"P_Reservoir1_J1": 0.3}))
+    store.query(run="ga_1760361054818", limit=5)      # best first
+    store.diff(cid, other_cid)                        # which genes changed
+    store.materialise(cid, "reports/best_solution.inp")
+
+Delta values are SI like wntr (metres); materialise() converts them to
+the base file's units and patches only those tokens (see inp_file.InpFile).
+
+    python src/candidate_store.py import reports/candidate_*.inp --base reports/best_solution.inp
+    python src/candidate_store.py list --limit 10
+    python src/candidate_store.py materialise 12 reports/candidate_12.inp
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from compact_network import FT, LINK_PIPE, NODE_RESERVOIR, US_FLOW_UNITS, CompactNetwork
+from inp_file import InpFile
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORE_PATH = os.path.join(BASE_DIR, "reports", "candidates.sqlite")
+
+DELTA_KEYS = ("diameters", "heads", "status")   # pipe diameter (m), reservoir head (m), link "Open"/"Closed"
+TOLERANCE = 1e-9                                # values closer than this to the base are not stored
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bases (
+    hash TEXT PRIMARY KEY, name TEXT, inp BLOB, created REAL
+);
+CREATE TABLE IF NOT EXISTS candidates (
+    id INTEGER PRIMARY KEY, run TEXT, generation INTEGER, fitness REAL,
+    base TEXT REFERENCES bases(hash), n_changed INTEGER, delta BLOB, diagnostics TEXT, created REAL
+);
+CREATE INDEX IF NOT EXISTS candidates_run ON candidates (run, generation);
+CREATE INDEX IF NOT EXISTS candidates_fitness ON candidates (run, fitness);
+"""
+
+
+def new_run_id(prefix="ga"):
+    """Run label from the current time in ms (same stamp the old candidate_<ms>.inp files used)."""
+    return f"{prefix}_{int(time.time() * 1000)}"
+
+
+def _encode(obj):
+    return zlib.compress(json.dumps(obj, separators=(",", ":"), default=float).encode())
+
+
+def _decode(blob):
+    return json.loads(zlib.decompress(blob))
+
+
+class CandidateStore:
+    """SQLite file of base networks (stored once) and candidate deltas against them."""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        self._conn = None
+        self._conn_pid = None
+        self._networks = {}       # base hash -> CompactNetwork
+
+    def _db(self):
+        # SQLite connections must not cross a fork, so open one per process
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    # ──────────────────────────────────────────────────────────────
+    # Bases
+    # ──────────────────────────────────────────────────────────────
+    def add_base(self, inp_path):
+        """Store an INP (if not already there) and return its content hash."""
+        with open(inp_path, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        with self._db() as db:
+            db.execute("INSERT OR IGNORE INTO bases VALUES (?, ?, ?, ?)",
+                       (digest, os.path.basename(inp_path), zlib.compress(data), time.time()))
+        return digest
+
+    def base_inp(self, base):
+        """A fresh InpFile over the stored bytes of a base."""
+        row = self._db().execute("SELECT name, inp FROM bases WHERE hash = ?", (base,)).fetchone()
+        if row is None:
+            raise KeyError(f"No base network {base!r} in {self.path}")
+        return InpFile(row[0], data=zlib.decompress(row[1]))
+
+    def base_network(self, base):
+        if base not in self._networks:
+            self._networks[base] = CompactNetwork.from_inp(self.base_inp(base))
+        return self._networks[base]
+
+    # ──────────────────────────────────────────────────────────────
+    # Deltas
+    # ──────────────────────────────────────────────────────────────
+    def make_delta(self, base, diameters=None, heads=None, status=None):
+        """
+        Delta dict of the given values against a base, keeping only entries
+        that differ from it. `diameters` is {pipe: metres} or an array over
+        the base's pipes in file order (a decoded GA genome); `heads` is
+        {reservoir: metres}; `status` is {link: "Open"/"Closed" or bool}.
+        """
+        net = self.base_network(base)
+        delta = {}
+        if diameters is not None:
+            pipes = np.flatnonzero(net.link_type == LINK_PIPE)
+            if isinstance(diameters, dict):
+                rows = np.array([net.link_index(n) for n in diameters], dtype=np.int64)
+                values = np.array(list(diameters.values()), dtype=float)
+            else:
+                values = np.asarray(diameters, dtype=float)
+                if len(values) != len(pipes):
+                    raise ValueError(f"Expected {len(pipes)} pipe diameters, got {len(values)}")
+                rows = pipes
+            changed = np.abs(values - net.diameter[rows]) > TOLERANCE
+            if changed.any():
+                delta["diameters"] = dict(zip(net.link_names[rows[changed]].tolist(), values[changed].tolist()))
+        if heads:
+            changed = {}
+            for name, head in heads.items():
+                k = net.node_index(name)
+                if net.node_type[k] != NODE_RESERVOIR:
+                    raise ValueError(f"{name} is not a reservoir; only reservoir heads can be stored")
+                if abs(float(head) - net.head[k]) > TOLERANCE:
+                    changed[name] = float(head)
+            if changed:
+                delta["heads"] = changed
+        if status:
+            changed = {}
+            for name, value in status.items():
+                is_open = value.strip().lower() == "open" if isinstance(value, str) else bool(value)
+                if is_open != bool(net.open[net.link_index(name)]):
+                    changed[name] = "Open" if is_open else "Closed"
+            if changed:
+                delta["status"] = changed
+        return delta
+
+    def delta_from_inp(self, base, inp_path):
+        """Delta of a full candidate INP against a base with the same elements."""
+        net, other = self.base_network(base), CompactNetwork.from_inp(inp_path)
+        if (not np.array_equal(net.link_names, other.link_names)
+                or not np.array_equal(net.node_names, other.node_names)):
+            raise ValueError(f"{inp_path} does not have the same nodes and links as base {base[:12]}")
+        pipes = net.link_type == LINK_PIPE
+        reservoirs = net.node_type == NODE_RESERVOIR
+        return self.make_delta(
+            base,
+            diameters=other.diameter[pipes],
+            heads=dict(zip(net.node_names[reservoirs].tolist(), other.head[reservoirs].tolist())),
+            status=dict(zip(net.link_names.tolist(), other.open.tolist())),
+        )
+
+    # ──────────────────────────────────────────────────────────────
+    # Candidates
+    # ──────────────────────────────────────────────────────────────
+    def add(self, run, generation, fitness, base, delta, diagnostics=None):
+        """Store one candidate and return its id."""
+        return self.add_many([(run, generation, fitness, base, delta, diagnostics)])[0]
+
+    def add_many(self, rows):
+        """Store (run, generation, fitness, base, delta, diagnostics) tuples in one transaction; returns their ids."""
+        now = time.time()
+        ids = []
+        with self._db() as db:
+            for run, generation, fitness, base, delta, diagnostics in rows:
+                unknown = set(delta) - set(DELTA_KEYS)
+                if unknown:
+                    raise ValueError(f"Unknown delta key(s) {sorted(unknown)} (choose from {DELTA_KEYS})")
+                cursor = db.execute(
+                    "INSERT INTO candidates (run, generation, fitness, base, n_changed, delta, diagnostics, created)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (run, generation, None if fitness is None else float(fitness), base,
+                     sum(len(v) for v in delta.values()), _encode(delta),
+                     None if diagnostics is None else json.dumps(diagnostics, default=float), now))
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def query(self, run=None, generation=None, limit=None):
+        """Candidates (without their deltas) as a DataFrame, best fitness first."""
+        where, params = [], []
+        if run is not None:
+            where.append("run = ?")
+            params.append(run)
+        if generation is not None:
+            where.append("generation = ?")
+            params.append(int(generation))
+        sql = "SELECT id, run, generation, fitness, base, n_changed, created FROM candidates"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY fitness IS NULL, fitness, id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return pd.read_sql_query(sql, self._db(), params=params)
+
+    def runs(self):
+        """One row per run: candidate count, generations and best fitness."""
+        return pd.read_sql_query(
+            "SELECT run, COUNT(*) AS candidates, MAX(generation) AS last_generation, MIN(fitness) AS best_fitness,"
+            " MIN(created) AS started FROM candidates GROUP BY run ORDER BY started", self._db())
+
+    def _row(self, candidate_id):
+        row = self._db().execute("SELECT base, delta, diagnostics FROM candidates WHERE id = ?",
+                                 (int(candidate_id),)).fetchone()
+        if row is None:
+            raise KeyError(f"No candidate {candidate_id} in {self.path}")
+        return row
+
+    def delta(self, candidate_id):
+        return _decode(self._row(candidate_id)[1])
+
+    def diagnostics(self, candidate_id):
+        raw = self._row(candidate_id)[2]
+        return None if raw is None else json.loads(raw)
+
+    def diff(self, a, b):
+        """{key: {element: (value in a, value in b)}} for every element where two candidates differ."""
+        (base_a, delta_a, _), (base_b, delta_b, _) = self._row(a), self._row(b)
+        if base_a != base_b:
+            raise ValueError(f"Candidates {a} and {b} have different base networks")
+        delta_a, delta_b = _decode(delta_a), _decode(delta_b)
+        net = self.base_network(base_a)
+        base_value = {
+            "diameters": lambda n: float(net.diameter[net.link_index(n)]),
+            "heads": lambda n: float(net.head[net.node_index(n)]),
+            "status": lambda n: "Open" if net.open[net.link_index(n)] else "Closed",
+        }
+        out = {}
+        for key in DELTA_KEYS:
+            va, vb = delta_a.get(key, {}), delta_b.get(key, {})
+            changed = {}
+            for name in set(va) | set(vb):
+                x = va[name] if name in va else base_value[key](name)
+                y = vb[name] if name in vb else base_value[key](name)
+                if x != y:
+                    changed[name] = (x, y)
+            if changed:
+                out[key] = dict(sorted(changed.items()))
+        return out
+
+    def materialise(self, candidate_id, path=None):
+        """The full INP of a candidate: written to `path` if given (returns path), else returned as bytes."""
+        base, blob, _ = self._row(candidate_id)
+        inp, delta = self.base_inp(base), _decode(blob)
+        us = inp.flow_units in US_FLOW_UNITS
+        to_file = 1.0 / FT if us else 1.0               # heads
+        diameter_to_file = 1.0 / 0.0254 if us else 1000.0   # inches / millimetres
+
+        for name, diameter in delta.get("diameters", {}).items():
+            inp.set("PIPES", name, 4, float(diameter) * diameter_to_file)
+        for name, head in delta.get("heads", {}).items():
+            inp.set("RESERVOIRS", name, 1, float(head) * to_file)
+        pipes, status = inp.section("PIPES"), inp.section("STATUS")
+        listed = set(status.ids.tolist())
+        for name, value in delta.get("status", {}).items():
+            if name in listed:
+                inp.set("STATUS", name, 1, value)       # [STATUS] overrides the initial status
+            elif name in set(pipes.ids.tolist()):
+                if pipes.count[pipes.row(name)] < 7:
+                    inp.set("PIPES", name, 6, pipes.column(6, default=0.0)[pipes.row(name)])
+                inp.set("PIPES", name, 7, value)
+            else:
+                raise ValueError(f"Cannot set the status of {name}: not a pipe and not listed in [STATUS]")
+
+        if path is None:
+            return inp.render()
+        inp.write(path)
+        return path
+
+    def import_inp_files(self, paths, base_path, run="legacy"):
+        """
+        Turn full candidate INPs into deltas against base_path. Files are
+        taken in name order (the old candidate_<ms>.inp names sort by time)
+        and numbered 0, 1, ... as generations of one run. Returns the ids.
+        """
+        base = self.add_base(base_path)
+        rows = [(run, k, None, base, self.delta_from_inp(base, p), {"source": os.path.basename(p)})
+                for k, p in enumerate(sorted(paths))]
+        return self.add_many(rows)
+
+    def close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+# ──────────────────────────────────────────────────────────────
+# Command line
+# ──────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect and materialise stored candidate designs.")
+    parser.add_argument("--store", default=STORE_PATH, help="candidate store file")
+    commands = parser.add_subparsers(dest="command", required=True)
+    p = commands.add_parser("import", help="store full candidate INPs as deltas against a base")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--base", required=True, help="base INP the deltas are taken against")
+    p.add_argument("--run", default="legacy")
+    p.add_argument("--delete", action="store_true", help="remove each INP once it is stored")
+    p = commands.add_parser("list", help="list candidates, best first")
+    p.add_argument("--run")
+    p.add_argument("--generation", type=int)
+    p.add_argument("--limit", type=int, default=20)
+    commands.add_parser("runs", help="summarise the stored runs")
+    p = commands.add_parser("show", help="print a candidate's delta, or what changed between two candidates")
+    p.add_argument("ids", type=int, nargs="+")
+    p = commands.add_parser("materialise", help="write a candidate's full INP")
+    p.add_argument("id", type=int)
+    p.add_argument("output")
+    args = parser.parse_args()
+
+    store = CandidateStore(args.store)
+    if args.command == "import":
+        files = sorted({f for pattern in args.files for f in glob.glob(pattern)
+                        if os.path.abspath(f) != os.path.abspath(args.base)})
+        size = sum(os.path.getsize(f) for f in files)
+        ids = store.import_inp_files(files, args.base, args.run)
+        print(f"✅ Stored {len(ids)} candidates ({size / 1024:.0f} KB of INP) as deltas in {store.path}")
+        if args.delete:
+            for f in files:
+                os.remove(f)
+            print(f"🗑️  Removed {len(files)} INP files")
+    elif args.command == "list":
+        print(store.query(args.run, args.generation, args.limit).to_string(index=False))
+    elif args.command == "runs":
+        print(store.runs().to_string(index=False))
+    elif args.command == "show":
+        result = store.delta(args.ids[0]) if len(args.ids) == 1 else store.diff(args.ids[0], args.ids[1])
+        print(json.dumps(result, indent=2))
+    elif args.command == "materialise":
+        print(f"✅ Candidate {args.id} written to {store.materialise(args.id, args.output)}")
+    store.close()
@@ -1,5 +1,6 @@
 import sys
 import wntr
+from sim_runner import run_hydraulics
 
 def check_hydraulic_status(inp_file):
     print(f"🔍 Checking hydraulic convergence for: {inp_file}")
@@ -9,8 +10,7 @@ def check_hydraulic_status(inp_file):
         wn = wntr.network.WaterNetworkModel(inp_file)
 
         # Run hydraulic simulation
-        sim = wntr.sim.EpanetSimulator(wn)
-        results = sim.run_sim()
+        results = run_hydraulics(wn)
 
         # Extract pressures
         pressure = results.node["pressure"]
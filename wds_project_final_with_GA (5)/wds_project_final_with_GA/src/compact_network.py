@@ -0,0 +1,266 @@
+# src/compact_network.py
+"""
+Structure-of-arrays network model with a memory-mapped binary cache.
+
+A CompactNetwork holds the whole network as flat NumPy columns instead of
+thousands of wntr objects: integer node and link indices, float columns
+for elevation, demand, length, diameter and roughness, and an undirected
+CSR adjacency. It is parsed from the INP once (with inp_file.InpFile) and
+saved next to it as <name>.inp.wdsnet; every later load just maps that
+file, and the arrays are read-only views into the mapping.
+
+    net = load_network("data/Bangalore_WDS_Realistic.inp")
+    k = net.node_index("J5")
+    net.elevation[k], net.demand[k]
+    nodes, links = net.neighbours(k)
+
+The cache records the SHA-256 of the INP it was built from and is rebuilt
+whenever the INP content (or FORMAT_VERSION) changes. Units are SI like
+wntr: metres, m³/s; node order is junctions, reservoirs, tanks and link
+order is pipes, pumps, valves, each in file order.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+
+import numpy as np
+
+from inp_file import InpFile
+
+CACHE_SUFFIX = ".wdsnet"
+FORMAT_VERSION = 1
+MAGIC = b"WDSNET\x00\x01"
+ALIGN = 64
+
+NODE_JUNCTION, NODE_RESERVOIR, NODE_TANK = 0, 1, 2
+LINK_PIPE, LINK_PUMP, LINK_VALVE = 0, 1, 2
+
+US_FLOW_UNITS = ("CFS", "GPM", "MGD", "IMGD", "AFD")
+FT = 0.3048
+
+# Array columns stored in the cache, in file order
+FIELDS = (
+    "node_names", "node_type", "elevation", "demand", "head", "x", "y",
+    "link_names", "link_type", "start", "end", "length", "diameter", "roughness", "minor_loss",
+    "open", "check_valve", "adj_indptr", "adj_node", "adj_link",
+)
+
+
+class CompactNetwork:
+    """
+    Flat arrays describing one network.
+
+    Nodes:  node_names, node_type (NODE_*), elevation, demand (base demand,
+            m³/s), head (fixed head of reservoirs and tanks, NaN for
+            junctions), x, y
+    Links:  link_names, link_type (LINK_*), start, end (node indices),
+            length, diameter, roughness, minor_loss (NaN where a link type
+            has none), open, check_valve
+    Graph:  adj_indptr, adj_node, adj_link: the neighbours of node k are
+            adj_node[adj_indptr[k]:adj_indptr[k + 1]], reached by adj_link
+    """
+
+    def __init__(self, arrays, meta=None):
+        for name in FIELDS:
+            setattr(self, name, arrays[name])
+        self.meta = meta or {}
+        self._node_index = None
+        self._link_index = None
+
+    @property
+    def n_nodes(self):
+        return len(self.node_names)
+
+    @property
+    def n_links(self):
+        return len(self.link_names)
+
+    @property
+    def junctions(self):
+        """Indices of the junction nodes."""
+        return np.flatnonzero(self.node_type == NODE_JUNCTION)
+
+    @property
+    def sources(self):
+        """Indices of the reservoir and tank nodes."""
+        return np.flatnonzero(self.node_type != NODE_JUNCTION)
+
+    def node_index(self, name):
+        if self._node_index is None:
+            self._node_index = {n: k for k, n in enumerate(self.node_names.tolist())}
+        return self._node_index[name]
+
+    def link_index(self, name):
+        if self._link_index is None:
+            self._link_index = {n: k for k, n in enumerate(self.link_names.tolist())}
+        return self._link_index[name]
+
+    def neighbours(self, k):
+        """(neighbour node indices, connecting link indices) of node k."""
+        lo, hi = self.adj_indptr[k], self.adj_indptr[k + 1]
+        return self.adj_node[lo:hi], self.adj_link[lo:hi]
+
+    # ──────────────────────────────────────────────────────────────
+    # Building from an INP
+    # ──────────────────────────────────────────────────────────────
+    @classmethod
+    def from_inp(cls, inp_path):
+        inp = inp_path if isinstance(inp_path, InpFile) else InpFile(inp_path)
+        us = inp.flow_units in US_FLOW_UNITS
+        to_m = FT if us else 1.0                      # elevations, heads, lengths
+        diameter_to_m = 0.0254 if us else 0.001        # inches / millimetres
+        flow_to_m3s = inp.flow_factor()
+
+        junctions, reservoirs = inp.junctions(), inp.reservoirs()
+        tanks = inp.section("TANKS")
+        tank_elevation = tanks.column(1)
+        node_names = np.concatenate([junctions["id"], reservoirs["id"], tanks.ids])
+        node_type = np.repeat(np.array([NODE_JUNCTION, NODE_RESERVOIR, NODE_TANK], dtype=np.int8),
+                              [len(junctions["id"]), len(reservoirs["id"]), len(tanks)])
+        head = np.concatenate([np.full(len(junctions["id"]), np.nan), reservoirs["head"],
+                               tank_elevation + tanks.column(2)]) * to_m
+        # Reservoirs have no ground level; their head stands in for it
+        elevation = np.concatenate([junctions["elevation"], reservoirs["head"], tank_elevation]) * to_m
+        demand = np.zeros(len(node_names))
+        demand[:len(junctions["id"])] = junctions["demand"]
+
+        index = {n: k for k, n in enumerate(node_names.tolist())}
+        # [DEMANDS] entries replace the demand given on the junction line (several entries add up)
+        listed = inp.section("DEMANDS")
+        if len(listed):
+            rows = np.array([index[n] for n in listed.ids.tolist()], dtype=np.int64)
+            demand[np.unique(rows)] = 0.0
+            np.add.at(demand, rows, listed.column(1))
+        demand *= flow_to_m3s
+
+        x = np.full(len(node_names), np.nan)
+        y = np.full(len(node_names), np.nan)
+        coords = inp.coordinates()
+        if len(coords["id"]):
+            rows = np.array([index[n] for n in coords["id"].tolist()], dtype=np.int64)
+            x[rows], y[rows] = coords["x"], coords["y"]
+
+        pipes, pumps, valves = inp.pipes(), inp.section("PUMPS"), inp.section("VALVES")
+        n_pipes, n_pumps, n_valves = len(pipes["id"]), len(pumps), len(valves)
+        link_names, node1, node2 = inp.links()
+        link_type = np.repeat(np.array([LINK_PIPE, LINK_PUMP, LINK_VALVE], dtype=np.int8),
+                              [n_pipes, n_pumps, n_valves])
+        start = np.array([index[n] for n in node1.tolist()], dtype=np.int32)
+        end = np.array([index[n] for n in node2.tolist()], dtype=np.int32)
+
+        blank = np.full(n_pumps, np.nan)
+        length = np.concatenate([pipes["length"] * to_m, blank, np.full(n_valves, np.nan)])
+        diameter = np.concatenate([pipes["diameter"], blank, valves.column(3)]) * diameter_to_m
+        roughness = np.concatenate([pipes["roughness"], blank, np.full(n_valves, np.nan)])
+        minor_loss = np.concatenate([pipes["minor_loss"], blank, valves.column(6, default=0.0)])
+
+        # Initial status: the PIPES status column, overridden by [STATUS] entries
+        pipe_status = np.char.upper(pipes["status"])
+        is_open = np.concatenate([pipe_status != "CLOSED", np.ones(n_pumps + n_valves, dtype=bool)])
+        check_valve = np.concatenate([pipe_status == "CV", np.zeros(n_pumps + n_valves, dtype=bool)])
+        status = inp.section("STATUS")
+        link_rows = {n: k for k, n in enumerate(link_names.tolist())}
+        for name, setting in zip(status.ids.tolist(), status.column(1, dtype=str).tolist()):
+            if setting.upper() in ("OPEN", "CLOSED") and name in link_rows:
+                is_open[link_rows[name]] = setting.upper() == "OPEN"
+
+        adj_indptr, adj_node, adj_link = _adjacency(len(node_names), start, end)
+        arrays = {
+            "node_names": node_names, "node_type": node_type, "elevation": elevation, "demand": demand,
+            "head": head, "x": x, "y": y,
+            "link_names": link_names, "link_type": link_type, "start": start, "end": end,
+            "length": length, "diameter": diameter, "roughness": roughness, "minor_loss": minor_loss,
+            "open": is_open, "check_valve": check_valve,
+            "adj_indptr": adj_indptr, "adj_node": adj_node, "adj_link": adj_link,
+        }
+        return cls(arrays, {"flow_units": inp.flow_units, "source": os.path.basename(inp.path)})
+
+    # ──────────────────────────────────────────────────────────────
+    # Binary cache
+    # ──────────────────────────────────────────────────────────────
+    def save(self, path, source_hash=""):
+        """
+        Write the arrays as one file: MAGIC, header length, a JSON header
+        (dtype, shape and offset per array) and the raw arrays, each aligned
+        to ALIGN bytes so they can be mapped in place.
+        """
+        arrays = [np.ascontiguousarray(getattr(self, name)) for name in FIELDS]
+        layout, offset = {}, 0
+        for name, a in zip(FIELDS, arrays):
+            layout[name] = {"dtype": a.dtype.str, "shape": list(a.shape), "offset": offset}
+            offset += -(-a.nbytes // ALIGN) * ALIGN
+        header = json.dumps({"version": FORMAT_VERSION, "source_hash": source_hash,
+                             "meta": self.meta, "arrays": layout}).encode()
+        data_start = -(-(len(MAGIC) + 8 + len(header)) // ALIGN) * ALIGN
+
+        tmp = f"{path}.tmp{os.getpid()}"
+        with open(tmp, "wb") as f:
+            f.write(MAGIC + len(header).to_bytes(8, "little") + header)
+            for name, a in zip(FIELDS, arrays):
+                f.seek(data_start + layout[name]["offset"])
+                f.write(a.tobytes())
+            f.truncate(data_start + offset)
+        os.replace(tmp, path)     # readers never see a half-written cache
+
+    @classmethod
+    def load(cls, path):
+        """Map a cache file; returns (network, header). Arrays are read-only views of the mapping."""
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a network cache file")
+        size = int.from_bytes(mm[len(MAGIC):len(MAGIC) + 8], "little")
+        header = json.loads(mm[len(MAGIC) + 8:len(MAGIC) + 8 + size])
+        data_start = -(-(len(MAGIC) + 8 + size) // ALIGN) * ALIGN
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"]))
+            arrays[name] = np.frombuffer(mm, dtype=dtype, count=count,
+                                         offset=data_start + spec["offset"]).reshape(spec["shape"])
+        return cls(arrays, header["meta"]), header
+
+
+def _adjacency(n_nodes, start, end):
+    """Undirected CSR adjacency: (indptr, neighbour node, link) with each link listed at both ends."""
+    links = np.arange(len(start), dtype=np.int32)
+    here = np.concatenate([start, end])
+    there = np.concatenate([end, start])
+    via = np.concatenate([links, links])
+    order = np.argsort(here, kind="stable")
+    indptr = np.concatenate([[0], np.cumsum(np.bincount(here, minlength=n_nodes))]).astype(np.int64)
+    return indptr, there[order].astype(np.int32), via[order]
+
+
+def source_hash(path):
+    """SHA-256 of the INP bytes (same value as sim_cache.file_fingerprint, without importing wntr)."""
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def cache_path_for(inp_path):
+    return f"{inp_path}{CACHE_SUFFIX}"
+
+
+def load_network(inp_path, cache_path=None, rebuild=False):
+    """
+    CompactNetwork for an INP, mapped from its binary cache when that was
+    built from the same INP content, otherwise parsed and (re)cached.
+    """
+    cache_path = cache_path or cache_path_for(inp_path)
+    digest = source_hash(inp_path)
+    if not rebuild and os.path.exists(cache_path):
+        try:
+            net, header = CompactNetwork.load(cache_path)
+            if header.get("version") == FORMAT_VERSION and header.get("source_hash") == digest:
+                return net
+        except (ValueError, KeyError, OSError):
+            pass                # unreadable or foreign file: rebuild it
+    net = CompactNetwork.from_inp(inp_path)
+    try:
+        net.save(cache_path, digest)
+    except OSError as e:
+        print(f"⚠️ Could not write network cache {cache_path}: {e}")
+    return net
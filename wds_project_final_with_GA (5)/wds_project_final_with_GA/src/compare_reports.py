@@ -1,37 +1,288 @@
+# src/compare_reports.py
+"""
+Diff ward reports across any number of versions (runs, optimisations, ...).
+
+    python src/compare_reports.py                                   # checked vs optimized report
+    python src/compare_reports.py runs/*.csv --chain --out reports/report_changes.json
+    python src/compare_reports.py a.csv b.parquet --tol "Pressure(m)=0.5" --rel-tol 0.01
+
+Every report is indexed on its ward key ("Ward Name") and aligned to the
+union of wards, so all versions form one (version x ward x column) array
+and every comparison is a single array operation. That stays fast for
+hundreds of runs. Numeric columns count as changed when
+|after - before| > tol + rel_tol * |before|. The explanation column counts
+as changed when its text differs.
+
+Versions are compared with the first one (the baseline), or with the
+previous one under --chain. The result is a compact change set: one row
+per (pair of versions, ward, field) that changed, plus one row per ward
+that was added or removed. It is written as CSV, Parquet or JSON (by the
+--out suffix), so the frontend can load it directly.
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
 import pandas as pd
 
-# Load both reports
-checked_path = "reports/final_water_report_checked.csv"
-optimized_path = "reports/final_water_report_optimized.csv"
-
-try:
-    checked = pd.read_csv(checked_path)
-    optimized = pd.read_csv(optimized_path)
-    print("✅ Reports loaded successfully!\n")
-except FileNotFoundError:
-    print("❌ Could not find one or both report files.")
-    exit()
-
-# Make sure ward names align properly
-wards = set(checked["Ward Name"]).intersection(set(optimized["Ward Name"]))
-print(f"🔹 Found {len(wards)} matching wards.\n")
-
-# Compare each ward
-for ward in sorted(wards):
-    c_row = checked[checked["Ward Name"] == ward].iloc[0]
-    o_row = optimized[optimized["Ward Name"] == ward].iloc[0]
-
-    # Check if any key values differ
-    diffs = {}
-    for col in ["Pressure(m)", "Supplied_LPS", "Shortage_LPS", "Shortage_pct", "Leakage_pct", "Explanation"]:
-        if col in c_row and col in o_row:
-            if str(c_row[col]) != str(o_row[col]):
-                diffs[col] = (c_row[col], o_row[col])
-
-    if diffs:
-        print(f"⚠️  Ward: {ward}")
-        for key, (before, after) in diffs.items():
-            print(f"   - {key}: {before}  →  {after}")
+from generate_reports import read_table
+
+# ──────────────────────────────────────────────────────────────
+# Configuration
+# ──────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CHECKED_REPORT = os.path.join(BASE_DIR, "reports", "final_water_report_checked.csv")
+OPTIMIZED_REPORT = os.path.join(BASE_DIR, "reports", "final_water_report_optimized.csv")
+CHANGES_OUT = os.path.join(BASE_DIR, "reports", "report_changes.csv")
+
+KEY = "Ward Name"
+
+# Absolute tolerance per numeric column; differences at or below these are not changes
+TOLERANCES = {
+    "Pressure(m)": 0.01,
+    "Supplied_LPS": 0.01,
+    "Shortage_LPS": 0.01,
+    "Shortage_pct": 0.01,
+    "Leakage_pct": 1e-4,
+}
+TEXT_COLUMNS = ["Explanation"]
+REL_TOLERANCE = 0.0
+SHOW_WARDS = 20               # wards listed per version pair on the console
+
+CHANGE_COLUMNS = ["from", "to", KEY, "field", "status", "before", "after", "delta", "delta_pct",
+                  "before_text", "after_text"]
+
+
+# ──────────────────────────────────────────────────────────────
+# Loading
+# ──────────────────────────────────────────────────────────────
+def default_labels(paths):
+    """
+    File stems, with parent folders prepended to the ones that clash until
+    all differ (runs/a/report.csv, runs/b/report.csv -> a/report, b/report);
+    paths that still clash get a #n suffix.
+    """
+    parts = [Path(os.path.abspath(p)).with_suffix("").parts[1:] for p in paths]     # without the root
+    depth = [1] * len(paths)
+    while True:
+        labels = ["/".join(pp[-d:]) for pp, d in zip(parts, depth)]
+        counts = pd.Series(labels).value_counts()
+        clash = [k for k, label in enumerate(labels) if counts[label] > 1 and depth[k] < len(parts[k])]
+        if not clash:
+            break
+        for k in clash:
+            depth[k] += 1
+    # Still clashing: the same file given twice
+    seen = {}
+    for k, label in enumerate(labels):
+        seen[label] = seen.get(label, 0) + 1
+        if counts[label] > 1:
+            labels[k] = f"{parts[k][-1]}#{seen[label]}"
+    return labels
+
+
+def load_versions(paths, labels=None, key=KEY):
+    """{label: report indexed by key} (first row of a repeated ward wins); labels default to default_labels()."""
+    labels = list(labels) if labels else default_labels(paths)
+    if len(labels) != len(paths):
+        raise ValueError(f"{len(labels)} label(s) for {len(paths)} report(s)")
+    if len(set(labels)) != len(labels):
+        raise ValueError(f"report labels must be unique, got {labels}")
+    versions = {}
+    for label, path in zip(labels, paths):
+        df = read_table(path)
+        if df is None:
+            raise FileNotFoundError(path)
+        if key not in df.columns:
+            raise ValueError(f"{path} has no '{key}' column")
+        versions[label] = df.drop_duplicates(key).set_index(key)
+    return versions
+
+
+# ──────────────────────────────────────────────────────────────
+# Diff engine
+# ──────────────────────────────────────────────────────────────
+def align(versions, columns, text_columns=()):
+    """
+    Stack versions over the union of their wards: (wards, present[v, w],
+    values[v, w, c] for numeric columns, codes[v, w, t] for text columns
+    (-1 where missing), text categories per text column).
+    """
+    frames = list(versions.values())
+    wards = pd.Index(pd.unique(np.concatenate([f.index.to_numpy() for f in frames])))
+    present = np.stack([wards.isin(f.index) for f in frames])
+    values = np.full((len(frames), len(wards), len(columns)), np.nan)
+    raw = [[] for _ in text_columns]
+    for v, f in enumerate(frames):
+        f = f.reindex(wards)
+        for c, col in enumerate(columns):
+            if col in f.columns:
+                values[v, :, c] = pd.to_numeric(f[col], errors="coerce").to_numpy(dtype=float)
+        for t, col in enumerate(text_columns):
+            raw[t].append(f[col].astype("string") if col in f.columns else pd.Series(pd.NA, index=wards, dtype="string"))
+    codes = np.full((len(frames), len(wards), len(text_columns)), -1)
+    categories = []
+    for t, series in enumerate(raw):
+        code, uniques = pd.factorize(pd.concat(series, ignore_index=True))
+        codes[:, :, t] = code.reshape(len(frames), len(wards))
+        categories.append(np.asarray(uniques, dtype=object))
+    return wards, present, values, codes, categories
+
+
+def diff_reports(versions, tolerances=None, rel_tol=REL_TOLERANCE, text_columns=TEXT_COLUMNS, chain=False):
+    """
+    Change set between report versions ({label: report indexed by ward}):
+    each version against the first, or against the previous one with
+    chain=True. One row per changed (pair, ward, field), plus "added" /
+    "removed" rows for wards present on only one side.
+    """
+    tolerances = dict(TOLERANCES if tolerances is None else tolerances)
+    labels = list(versions)
+    columns = list(tolerances)
+    text_columns = [c for c in text_columns if any(c in f.columns for f in versions.values())]
+    if len(labels) < 2:
+        return pd.DataFrame(columns=CHANGE_COLUMNS)
+
+    wards, present, values, codes, categories = align(versions, columns, text_columns)
+    to_v = np.arange(1, len(labels))
+    from_v = to_v - 1 if chain else np.zeros_like(to_v)
+    both = present[from_v] & present[to_v]                                      # (pairs, wards)
+    parts = []
+
+    # Numeric fields
+    before, after = values[from_v], values[to_v]                                # (pairs, wards, columns)
+    tol = np.array([tolerances[c] for c in columns])
+    with np.errstate(invalid="ignore"):
+        differs = np.abs(after - before) > tol + rel_tol * np.abs(before)
+    differs |= np.isnan(before) != np.isnan(after)
+    p, w, c = np.nonzero(differs & both[:, :, None])
+    delta = after[p, w, c] - before[p, w, c]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        delta_pct = np.where(before[p, w, c] != 0, delta / np.abs(before[p, w, c]) * 100.0, np.nan)
+    parts.append(pd.DataFrame({
+        "p": p, "w": w, "field": np.asarray(columns, dtype=object)[c], "status": "changed",
+        "before": before[p, w, c], "after": after[p, w, c], "delta": delta, "delta_pct": delta_pct,
+    }))
+
+    # Text fields
+    if text_columns:
+        code_before, code_after = codes[from_v], codes[to_v]
+        p, w, t = np.nonzero((code_before != code_after) & both[:, :, None])
+        lookup = [np.append(cats, None) for cats in categories]                 # code -1 reads as None
+        parts.append(pd.DataFrame({
+            "p": p, "w": w, "field": np.asarray(text_columns, dtype=object)[t], "status": "changed",
+            "before_text": [lookup[k][code] for k, code in zip(t, code_before[p, w, t])],
+            "after_text": [lookup[k][code] for k, code in zip(t, code_after[p, w, t])],
+        }))
+
+    # Wards on one side only
+    for status, mask in (("added", ~present[from_v] & present[to_v]), ("removed", present[from_v] & ~present[to_v])):
+        p, w = np.nonzero(mask)
+        parts.append(pd.DataFrame({"p": p, "w": w, "field": "", "status": status}))
+
+    parts = [part for part in parts if len(part)]
+    if not parts:
+        return pd.DataFrame(columns=CHANGE_COLUMNS)
+    changes = pd.concat(parts, ignore_index=True).sort_values(["p", "w"], kind="stable")
+    label_array = np.asarray(labels, dtype=object)
+    p, w = changes["p"].to_numpy(dtype=int), changes["w"].to_numpy(dtype=int)
+    changes = changes.assign(**{"from": label_array[from_v[p]], "to": label_array[to_v[p]],
+                                KEY: wards.to_numpy()[w]})
+    return changes.reindex(columns=CHANGE_COLUMNS).reset_index(drop=True)
+
+
+def save_changes(changes, path):
+    """
+    Write the change set as CSV, Parquet or JSON (records), by suffix. The
+    file is written beside `path` and moved into place only once complete,
+    so a failure (e.g. ImportError when Parquet has no engine) leaves no
+    partial file behind.
+    """
+    suffix = Path(path).suffix.lower()
+    writers = {
+        ".parquet": lambda f: changes.to_parquet(f, index=False),
+        ".json": lambda f: changes.to_json(f, orient="records", indent=1),
+        ".csv": lambda f: changes.to_csv(f, index=False),
+    }
+    if suffix not in writers:
+        raise ValueError(f"unsupported change set format '{suffix}' (use .csv, .parquet or .json)")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    partial = f"{path}.partial"
+    try:
+        writers[suffix](partial)
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+
+
+def parse_tolerances(items):
+    """TOLERANCES updated from "column=value" strings."""
+    tolerances = dict(TOLERANCES)
+    for item in items or []:
+        column, sep, value = item.rpartition("=")
+        if not sep or not column:
+            raise ValueError(f"--tol expects column=value, got '{item}'")
+        tolerances[column] = float(value)
+    return tolerances
+
+
+# ──────────────────────────────────────────────────────────────
+# Main
+# ──────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff ward reports across versions.")
+    parser.add_argument("reports", nargs="*", default=[CHECKED_REPORT, OPTIMIZED_REPORT],
+                        help="report CSV/Parquet files, baseline first")
+    parser.add_argument("--labels", nargs="+", help="version labels (default: file names)")
+    parser.add_argument("--chain", action="store_true", help="compare each version with the previous one")
+    parser.add_argument("--tol", action="append", metavar="COLUMN=VALUE",
+                        help="absolute tolerance for a numeric column (repeatable; adds new columns too)")
+    parser.add_argument("--rel-tol", type=float, default=REL_TOLERANCE, help="relative tolerance for all columns")
+    parser.add_argument("--out", default=CHANGES_OUT, help="change set file (.csv, .parquet or .json)")
+    parser.add_argument("--show", type=int, default=SHOW_WARDS, help="changed wards to list per version pair")
+    parser.add_argument("--no-save", action="store_true", help="print the comparison without writing it")
+    args = parser.parse_args()
+
+    if len(args.reports) < 2:
+        raise SystemExit("❌ Need at least two reports to compare.")
+    try:
+        versions = load_versions(args.reports, args.labels)
+        print(f"✅ {len(versions)} reports loaded successfully!\n")
+    except FileNotFoundError as e:
+        raise SystemExit(f"❌ Could not find report file: {e}")
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+
+    changes = diff_reports(versions, parse_tolerances(args.tol), args.rel_tol, chain=args.chain)
+
+    labels = list(versions)
+    by_pair = dict(list(changes.groupby(["from", "to"], sort=False)))
+    for k in range(1, len(labels)):
+        a, b = labels[k - 1] if args.chain else labels[0], labels[k]
+        pair = by_pair.get((a, b), changes.iloc[:0])
+        common = len(versions[a].index.intersection(versions[b].index))
+        changed = pair[pair["status"] == "changed"]
+        print(f"🔹 {a} → {b}: {common} matching wards, {changed[KEY].nunique()} changed, "
+              f"{(pair['status'] == 'added').sum()} added, {(pair['status'] == 'removed').sum()} removed")
+        for ward, rows in list(changed.groupby(KEY, sort=False))[:args.show]:
+            print(f"⚠️  Ward: {ward}")
+            for row in rows.itertuples(index=False):
+                if pd.isna(row.before_text) and pd.isna(row.after_text):
+                    print(f"   - {row.field}: {row.before:.4g}  →  {row.after:.4g}  ({row.delta:+.4g})")
+                else:
+                    print(f"   - {row.field}: {row.before_text}  →  {row.after_text}")
         print("-" * 80)
 
-print("\n✅ Comparison complete.")
+    if not args.no_save:
+        try:
+            save_changes(changes, args.out)
+        except ImportError:
+            raise SystemExit(f"❌ Could not write {args.out}: Parquet output needs pyarrow "
+                             "(pip install pyarrow), or use a .csv or .json --out")
+        except ValueError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"✅ {len(changes)} change(s) saved to {args.out}")
+    print("\n✅ Comparison complete.")
@@ -0,0 +1,177 @@
+# src/criticality.py
+"""
+N-1 pipe criticality: which pipe (or segment) failures starve which wards.
+
+Every pipe in turn (or every segment of a user-defined list) is closed and
+the network re-solved under pressure-driven demand, so each failure is
+measured as the demand the wards actually lose:
+
+    python src/criticality.py                                  # every pipe of the default INP
+    python src/criticality.py data/Bangalore_WDS_Realistic.inp --segments data/segments.csv
+
+A segments CSV has one row per pipe, with columns "segment" and "pipe";
+pipes sharing a segment name are closed together (e.g. everything between
+two isolation valves).
+
+All closures are one scenarios.run_scenarios() batch: the network arrays,
+matrix pattern and ordering are built once, the scenarios are spread over
+worker processes, and each one starts from the intact network's solution,
+which differs from it by a single pipe. Junctions a closure cuts off from
+every source (found with topology.TopologyIndex) are held at zero supply by
+the solver instead of stopping the run.
+
+Losses are counted against the intact network, so a ward that was already
+short is only charged for what the failure takes on top. Writes
+reports/criticality.csv (one ranked row per closure) and
+reports/criticality_wards.csv (closure x affected ward).
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import wntr
+
+from compact_network import load_network
+from hydraulic_solver import NetworkArrays, solve
+from scenarios import N_WORKERS, run_scenarios
+from sim_runner import set_pressure_driven
+from topology import TopologyIndex
+from wards import ward_names
+
+# ──────────────────────────────────────────────────────────────
+# Configuration
+# ──────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INP_FILE = os.path.join(BASE_DIR, "data", "Bangalore_WDS_Realistic.inp")
+SUMMARY_CSV = os.path.join(BASE_DIR, "reports", "criticality.csv")
+WARDS_CSV = os.path.join(BASE_DIR, "reports", "criticality_wards.csv")
+
+# Pressure-driven demand (as run_simulation.py --pdd): nothing at or below MIN, full from REQUIRED up
+PDD_MIN_PRESSURE_M = 0.0
+PDD_REQUIRED_PRESSURE_M = 10.0
+
+AFFECTED_FRACTION = 0.01      # a ward is affected when it loses more than this share of its demand
+TOP_N = 15                    # rows printed
+
+
+# ──────────────────────────────────────────────────────────────
+# Inputs
+# ──────────────────────────────────────────────────────────────
+def load_segments(path):
+    """{segment: [pipe, ...]} from a CSV with "segment" and "pipe" columns, in file order."""
+    df = pd.read_csv(path, dtype=str)
+    missing = {"segment", "pipe"} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} needs columns 'segment' and 'pipe' (missing {sorted(missing)})")
+    segments = {}
+    for segment, pipe in zip(df["segment"].str.strip(), df["pipe"].str.strip()):
+        segments.setdefault(segment, []).append(pipe)
+    return segments
+
+
+# ──────────────────────────────────────────────────────────────
+# Analysis
+# ──────────────────────────────────────────────────────────────
+def run_criticality(inp_file=INP_FILE, segments=None, n_workers=N_WORKERS,
+                    min_pressure=PDD_MIN_PRESSURE_M, required_pressure=PDD_REQUIRED_PRESSURE_M):
+    """
+    Close each segment (default: every open pipe on its own) and re-solve.
+    Returns (summary, wards): one ranked row per segment, and one row per
+    segment x ward that loses more than AFFECTED_FRACTION of its demand.
+    """
+    wn = wntr.network.WaterNetworkModel(inp_file)
+    set_pressure_driven(wn, min_pressure, required_pressure)
+    net = NetworkArrays(wn, allow_isolated=True)
+    if segments is None:
+        segments = {p: [p] for p, is_open in zip(net.link_names, net.open) if is_open}
+    known = set(net.link_names)
+    unknown = sorted({p for pipes in segments.values() for p in pipes} - known)
+    if unknown:
+        raise ValueError(f"{len(unknown)} segment pipe(s) not in {inp_file}, e.g. {unknown[:5]}")
+
+    base = solve(net)
+    overrides = [{"status": {p: "Closed" for p in pipes}} for pipes in segments.values()]
+    batch = run_scenarios(net, overrides, n_workers=n_workers, warm_start=base)
+
+    # Junction columns of the batch, in NetworkArrays junction order (LPS from here on)
+    columns = [batch.node_names.index(j) for j in net.junction_names]
+    demand = net.demand * 1000.0
+    delivered = batch.node("demand")[:, columns] * 1000.0
+    lost = np.clip(base.delivered * 1000.0 - delivered, 0.0, None)
+    affected = (demand > 0) & (lost > AFFECTED_FRACTION * demand)
+    pressure = batch.node("pressure")[:, columns]
+
+    topo = TopologyIndex(load_network(inp_file))
+    topo_names = topo.net.node_names
+    names = ward_names(net.junction_names)
+
+    rows, ward_rows = [], []
+    for k, (segment, pipes) in enumerate(segments.items()):
+        isolated = {str(n) for n in topo_names[topo.isolated_by(pipes)]}
+        fed = np.array([j not in isolated for j in net.junction_names])
+        hit = np.flatnonzero(affected[k])
+        worst = hit[np.argmax(lost[k, hit])] if len(hit) else None
+        rows.append({
+            "segment": segment,
+            "pipes": "; ".join(pipes),
+            "isolated_wards": len(isolated),
+            "affected_wards": len(hit),
+            "unserved_LPS": lost[k].sum(),
+            "unserved_pct": lost[k].sum() / demand.sum() * 100.0 if demand.sum() > 0 else 0.0,
+            "worst_ward": "" if worst is None else names[net.junction_names[worst]],
+            "min_pressure_m": pressure[k, fed].min() if fed.any() else np.nan,
+            "converged": bool(batch.converged[k]),
+        })
+        for j in hit.tolist():
+            node = net.junction_names[j]
+            ward_rows.append({
+                "segment": segment, "node": node, "ward": names[node], "isolated": node in isolated,
+                "demand_LPS": demand[j], "base_LPS": base.delivered[j] * 1000.0,
+                "delivered_LPS": delivered[k, j], "unserved_LPS": lost[k, j],
+            })
+
+    summary = pd.DataFrame(rows).sort_values(["unserved_LPS", "affected_wards"], ascending=False, kind="stable")
+    summary.insert(0, "rank", np.arange(1, len(summary) + 1))
+    wards = pd.DataFrame(ward_rows, columns=["segment", "node", "ward", "isolated", "demand_LPS",
+                                             "base_LPS", "delivered_LPS", "unserved_LPS"])
+    if len(wards):
+        order = dict(zip(summary["segment"], summary["rank"]))
+        wards = wards.assign(rank=wards["segment"].map(order)).sort_values(
+            ["rank", "unserved_LPS"], ascending=[True, False], kind="stable").drop(columns="rank")
+    return summary.reset_index(drop=True), wards.reset_index(drop=True)
+
+
+# ──────────────────────────────────────────────────────────────
+# Main
+# ──────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank pipes (or segments) by the demand their failure leaves unserved.")
+    parser.add_argument("inp_file", nargs="?", default=INP_FILE)
+    parser.add_argument("--segments", help="CSV of segment,pipe rows; default closes every pipe on its own")
+    parser.add_argument("--workers", type=int, default=N_WORKERS, help="worker processes")
+    parser.add_argument("--min-pressure", type=float, default=PDD_MIN_PRESSURE_M,
+                        help="PDD pressure (m) at or below which a junction gets nothing")
+    parser.add_argument("--required-pressure", type=float, default=PDD_REQUIRED_PRESSURE_M,
+                        help="PDD pressure (m) from which a junction gets its full demand")
+    parser.add_argument("--top", type=int, default=TOP_N, help="rows to print")
+    parser.add_argument("--no-save", action="store_true", help="print the ranking without writing CSVs")
+    args = parser.parse_args()
+
+    segments = load_segments(args.segments) if args.segments else None
+    t0 = time.perf_counter()
+    summary, wards = run_criticality(args.inp_file, segments, args.workers,
+                                     args.min_pressure, args.required_pressure)
+    elapsed = time.perf_counter() - t0
+
+    print(f"🔧 N-1 criticality for {args.inp_file}: {len(summary)} closures in {elapsed:.1f} s")
+    print(summary.head(args.top).to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    if not summary["converged"].all():
+        print(f"⚠️  {(~summary['converged']).sum()} closure(s) did not converge; their rows are approximate")
+    if not args.no_save:
+        os.makedirs(os.path.dirname(SUMMARY_CSV), exist_ok=True)
+        summary.to_csv(SUMMARY_CSV, index=False)
+        wards.to_csv(WARDS_CSV, index=False)
+        print(f"✅ Saved {SUMMARY_CSV} and {WARDS_CSV}")
@@ -1,5 +1,6 @@
 import wntr
 import pandas as pd
+from sim_runner import run_hydraulics
 
 # 👇 Change this to the file you're using
 inp_file = r"data\Bangalore_WDS_Realistic_fixed_heads.inp"
@@ -27,8 +28,7 @@ print("Max elevation:", max(elevs), "m")
 
 # --- Run a hydraulic simulation ---
 print("\nRunning hydraulic simulation...")
-sim = wntr.sim.EpanetSimulator(wn)
-results = sim.run_sim()
+results = run_hydraulics(wn)
 
 pressure = results.node["pressure"]
 min_p = pressure.min().min()
@@ -1,12 +1,13 @@
-import wntr
+from compact_network import LINK_PIPE, LINK_PUMP, LINK_VALVE, load_network
 
 def main():
     path = "data/Bangalore_WDS_with_heads.inp"
     print(f"🔍 Diagnosing extreme negative pressure issue in {path}")
-    wn = wntr.network.WaterNetworkModel(path)
+    net = load_network(path)
+    junctions = net.junctions
 
     # --- Check demands ---
-    demands = [j.base_demand for _, j in wn.junctions()]
+    demands = net.demand[junctions]
     print(f"\n📊 Demand stats:")
     print(f"  Min: {min(demands):.4f} m³/s")
     print(f"  Max: {max(demands):.4f} m³/s")
@@ -17,24 +18,26 @@ def main():
         print("💡 Try dividing all base demands by 1000 and re-run simulation.")
 
     # --- Check elevations ---
-    elevations = [j.elevation for _, j in wn.junctions()]
+    elevations = net.elevation[junctions]
     print(f"\n⛰️ Elevation range: {min(elevations):.2f} m – {max(elevations):.2f} m")
 
     # --- Check for closed pipes ---
-    closed_pipes = [p for p_name, p in wn.pipes() if p.status.name == "Closed"]
+    closed_pipes = net.link_names[(net.link_type == LINK_PIPE) & ~net.open].tolist()
     if closed_pipes:
-        print(f"\n🚧 Closed pipes detected: {[p.name for p in closed_pipes]}")
+        print(f"\n🚧 Closed pipes detected: {closed_pipes}")
     else:
         print("\n✅ No closed pipes detected.")
 
     # --- Check pump/valve elements ---
-    if wn.pump_name_list:
-        print(f"\n⚙️ Pumps: {wn.pump_name_list}")
+    pumps = net.link_names[net.link_type == LINK_PUMP].tolist()
+    valves = net.link_names[net.link_type == LINK_VALVE].tolist()
+    if pumps:
+        print(f"\n⚙️ Pumps: {pumps}")
     else:
         print("\n❌ No pumps found — may cause lack of flow balance.")
 
-    if wn.valve_name_list:
-        print(f"🔧 Valves: {wn.valve_name_list}")
+    if valves:
+        print(f"🔧 Valves: {valves}")
     else:
         print("ℹ️ No valves present (OK if network is simple).")
 
@@ -1,18 +1,16 @@
 import sys
 import wntr
 import pandas as pd
+from sim_runner import final_state
 
 def diagnose_zero_pressure_nodes(inp_file, threshold=1.0):
     print(f"🔍 Loading network model from: {inp_file}")
     wn = wntr.network.WaterNetworkModel(inp_file)
 
-    # Run hydraulic simulation
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
-
-    # Extract node pressures and heads
-    pressure = results.node['pressure'].iloc[-1]
-    head = results.node['head'].iloc[-1]
+    # Run hydraulic simulation, reading back only final pressures and heads
+    nodes, _ = final_state(wn, ("pressure", "head"))
+    pressure = nodes['pressure']
+    head = nodes['head']
 
     # Gather elevations safely
     elevations = {}
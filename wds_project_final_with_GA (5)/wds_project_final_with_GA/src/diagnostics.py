@@ -0,0 +1,351 @@
+# src/diagnostics.py
+"""
+Network health check: load once, solve once, run every analyzer on the result.
+
+The individual diagnose_* / check_* scripts each load the INP and most run
+their own simulation. run_diagnostics() loads the network once (a wntr
+model for the solve plus the cached CompactNetwork arrays), solves it once
+and hands one DiagnosticContext to every registered analyzer. Analyzers
+run concurrently in threads and their findings are collected into one
+report:
+
+    python src/diagnostics.py data/Bangalore_WDS_Realistic.inp
+    python src/diagnostics.py data/Bangalore_WDS_Realistic.inp --only pressure_range low_pressure
+
+Adding a check is one function:
+
+    @analyzer("my_check")
+    def my_check(ctx):
+        p = ctx.node("pressure", ctx.junctions, periods=-1)
+        return finding("ok", f"lowest pressure {p.min():.2f} m")
+
+With EPANET, results stay in the memory-mapped output file (see
+epanet_output.py) and analyzers read only what they need. Analyzers that
+need no results (connectivity, unit sanity) still run when the solve fails.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import wntr
+
+from compact_network import LINK_PIPE, LINK_PUMP, LINK_VALVE, load_network
+from sim_runner import ENGINES, engine_name, epanet_output, run_hydraulics
+from topology import TopologyIndex
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = os.path.join(BASE_DIR, "reports")
+SUMMARY_CSV = "diagnostics_summary.csv"
+
+LOW_PRESSURE_M = 1.0            # nodes at or below this are reported (diagnose_zero_pressure_nodes)
+NEGATIVE_TOLERANCE_M = -0.1     # pressures below this count as negative (check_hydraulic_status)
+MAX_TOTAL_DEMAND_M3S = 10.0     # more than this across the network suggests wrong demand units
+N_WORKERS = min(8, os.cpu_count() or 1)
+
+STATUSES = ("ok", "warning", "error")
+
+# name -> (function, needs_results); filled by @analyzer
+ANALYZERS = {}
+
+
+def analyzer(name, needs_results=True):
+    """Register a function(ctx) -> finding(...) under `name`."""
+    def register(fn):
+        ANALYZERS[name] = (fn, needs_results)
+        return fn
+    return register
+
+
+def finding(status, summary, table=None, **values):
+    """What an analyzer returns: a status, a one-line summary, an optional DataFrame and scalar values."""
+    if status not in STATUSES:
+        raise ValueError(f"Unknown status: {status} (choose from {STATUSES})")
+    return {"status": status, "summary": summary, "table": table, "values": values}
+
+
+class _FrameResults:
+    """wntr SimulationResults behind the read interface of EpanetOutput."""
+
+    def __init__(self, results):
+        self._results = results
+        self.node_names = np.array(results.node["pressure"].columns)
+        self.link_names = np.array(results.link["flowrate"].columns)
+        self.times = results.node["pressure"].index.to_numpy()
+        self.n_periods = len(self.times)
+
+    def read(self, kind, variable, elements=None, periods=None):
+        frame = (self._results.node if kind == "node" else self._results.link)[variable]
+        values = frame.to_numpy()
+        values = values if elements is None else values[:, np.asarray(elements)]
+        return values if periods is None else values[periods]
+
+    def reduce(self, kind, variable, how="min", elements=None):
+        return getattr(self.read(kind, variable, elements), how)(axis=0)
+
+
+class DiagnosticContext:
+    """
+    What every analyzer sees: the network arrays (`net`, a CompactNetwork),
+    the wntr model (`wn`), the solve outcome (`results`, or `error`) and the
+    thresholds in `options`. node()/link()/reduce() take element indices in
+    `net` order and translate them to the results' order.
+    """
+
+    def __init__(self, inp_file, net, wn, results, error, options):
+        self.inp_file = inp_file
+        self.net = net
+        self.wn = wn
+        self.results = results
+        self.error = error
+        self.options = options
+        self.junctions = net.junctions
+        if results is not None:
+            node_rows = {n: k for k, n in enumerate(results.node_names.tolist())}
+            link_rows = {n: k for k, n in enumerate(results.link_names.tolist())}
+            self._node_rows = np.array([node_rows[n] for n in net.node_names.tolist()], dtype=np.int64)
+            self._link_rows = np.array([link_rows[n] for n in net.link_names.tolist()], dtype=np.int64)
+
+    def _rows(self, kind, elements):
+        rows = self._node_rows if kind == "node" else self._link_rows
+        return rows if elements is None else rows[np.asarray(elements)]
+
+    def node(self, variable, nodes=None, periods=None):
+        return self.results.read("node", variable, self._rows("node", nodes), periods)
+
+    def link(self, variable, links=None, periods=None):
+        return self.results.read("link", variable, self._rows("link", links), periods)
+
+    def reduce(self, kind, variable, how="min", elements=None):
+        return self.results.reduce(kind, variable, how, self._rows(kind, elements))
+
+
+# ──────────────────────────────────────────────────────────────
+# Analyzers
+# ──────────────────────────────────────────────────────────────
+@analyzer("pressure_range")
+def pressure_range(ctx):
+    """Lowest and highest junction pressure over the whole run."""
+    low = ctx.reduce("node", "pressure", "min", ctx.junctions)
+    high = ctx.reduce("node", "pressure", "max", ctx.junctions)
+    worst = np.argsort(low)[:10]
+    table = pd.DataFrame({"Node": ctx.net.node_names[ctx.junctions[worst]], "Min_Pressure_m": low[worst]})
+    status = "warning" if low.min() < ctx.options["negative_tolerance_m"] else "ok"
+    return finding(status, f"pressure {low.min():.2f} m – {high.max():.2f} m"
+                           + (" (negative pressures: hydraulic imbalance)" if status == "warning" else ""),
+                   table, min_pressure_m=float(low.min()), max_pressure_m=float(high.max()))
+
+
+@analyzer("low_pressure")
+def low_pressure(ctx):
+    """Junctions at or below the low-pressure threshold in the final period."""
+    threshold = ctx.options["low_pressure_m"]
+    pressure = ctx.node("pressure", ctx.junctions, periods=-1)
+    head = ctx.node("head", ctx.junctions, periods=-1)
+    low = np.flatnonzero(pressure <= threshold)
+    table = pd.DataFrame({"Node": ctx.net.node_names[ctx.junctions[low]],
+                          "Elevation_m": ctx.net.elevation[ctx.junctions[low]],
+                          "Head_m": head[low], "Pressure_m": pressure[low]})
+    return finding("warning" if len(low) else "ok",
+                   f"{len(low)} of {len(pressure)} junctions at or below {threshold} m", table,
+                   n_low=int(len(low)))
+
+
+@analyzer("connectivity", needs_results=False)
+def connectivity(ctx):
+    """Junctions with no path to a reservoir or tank, over all links and over open links only."""
+    net = ctx.net
+    every_link = TopologyIndex(net, is_open=np.ones(net.n_links, dtype=bool))
+    n_components = every_link.n_components
+    unfed = ~every_link.fed()[ctx.junctions]
+    unfed_open = ~TopologyIndex(net).fed()[ctx.junctions]
+    rows = np.flatnonzero(unfed_open)
+    table = pd.DataFrame({"Node": net.node_names[ctx.junctions[rows]], "Cut_Off_By_Topology": unfed[rows]})
+    status = "error" if unfed.any() else ("warning" if unfed_open.any() else "ok")
+    return finding(status, f"{n_components} component(s); {unfed.sum()} junctions cut off from every source "
+                           f"({unfed_open.sum()} once closed links are removed)", table,
+                   n_components=int(n_components), n_disconnected=int(unfed.sum()),
+                   n_disconnected_open=int(unfed_open.sum()))
+
+
+@analyzer("unit_sanity", needs_results=False)
+def unit_sanity(ctx):
+    """Demand and elevation magnitudes that point at wrong units."""
+    net = ctx.net
+    demand = net.demand[ctx.junctions]
+    elevation = net.elevation[ctx.junctions]
+    problems = []
+    if demand.sum() > ctx.options["max_total_demand_m3s"]:
+        problems.append(f"total demand {demand.sum():.2f} m³/s is implausible (L/s entered as "
+                        f"{net.meta.get('flow_units', '?')}? try dividing by 1000)")
+    if (demand < 0).any():
+        problems.append(f"{(demand < 0).sum()} junctions have negative demand")
+    if elevation.max() - elevation.min() > 1000:
+        problems.append(f"elevations span {elevation.max() - elevation.min():.0f} m (feet entered as metres?)")
+    table = pd.DataFrame([{"Quantity": "demand_m3_s", "Min": demand.min(), "Max": demand.max(), "Total": demand.sum()},
+                          {"Quantity": "elevation_m", "Min": elevation.min(), "Max": elevation.max(),
+                           "Total": np.nan}])
+    summary = "; ".join(problems) if problems else (
+        f"{net.meta.get('flow_units', '?')} units, total demand {demand.sum():.3f} m³/s, "
+        f"elevations {elevation.min():.1f}–{elevation.max():.1f} m")
+    return finding("warning" if problems else "ok", summary, table, total_demand_m3_s=float(demand.sum()))
+
+
+@analyzer("closed_links")
+def closed_links(ctx):
+    """Links closed in the input, links found closed at the end of the run, pumps and valves."""
+    net = ctx.net
+    closed_input = np.flatnonzero(~net.open)
+    closed_final = np.flatnonzero(ctx.link("status", periods=-1) == 0)
+    table = pd.DataFrame({
+        "Link": net.link_names[np.union1d(closed_input, closed_final)],
+        "Type": pd.Series(net.link_type[np.union1d(closed_input, closed_final)]).map(
+            {LINK_PIPE: "Pipe", LINK_PUMP: "Pump", LINK_VALVE: "Valve"}).to_numpy(),
+        "Closed_In_Input": np.isin(np.union1d(closed_input, closed_final), closed_input),
+        "Closed_At_End": np.isin(np.union1d(closed_input, closed_final), closed_final),
+    })
+    n_pumps = int((net.link_type == LINK_PUMP).sum())
+    n_valves = int((net.link_type == LINK_VALVE).sum())
+    return finding("warning" if len(closed_final) else "ok",
+                   f"{len(closed_input)} links closed in the input, {len(closed_final)} closed at the end; "
+                   f"{n_pumps} pumps, {n_valves} valves", table,
+                   n_closed_input=int(len(closed_input)), n_closed_final=int(len(closed_final)))
+
+
+@analyzer("peak_snapshot")
+def peak_snapshot(ctx):
+    """Junction pressure and demand at the period of highest total demand."""
+    n = ctx.results.n_periods
+    totals = np.concatenate([ctx.node("demand", ctx.junctions, periods=slice(lo, lo + 256)).sum(axis=1)
+                             for lo in range(0, n, 256)])
+    peak = int(np.argmax(totals))
+    pressure = ctx.node("pressure", ctx.junctions, periods=peak)
+    demand = ctx.node("demand", ctx.junctions, periods=peak)
+    table = pd.DataFrame({"Node": ctx.net.node_names[ctx.junctions], "Demand_LPS": demand * 1000,
+                          "Pressure_m": pressure})
+    negative = int((pressure < 0).sum())
+    time_s = int(ctx.results.times[peak])
+    return finding("warning" if negative else "ok",
+                   f"peak demand {totals[peak] * 1000:.1f} LPS at t = {time_s // 3600}:{time_s % 3600 // 60:02d} h; "
+                   f"{negative} junctions below 0 m then", table, peak_time_s=time_s,
+                   peak_demand_LPS=float(totals[peak] * 1000))
+
+
+# ──────────────────────────────────────────────────────────────
+# Runner
+# ──────────────────────────────────────────────────────────────
+class DiagnosticReport:
+    """Findings of one diagnostics run, one per analyzer in registration order."""
+
+    def __init__(self, inp_file, findings, timings):
+        self.inp_file = inp_file
+        self.findings = findings
+        self.timings = timings
+
+    @property
+    def summary(self):
+        return pd.DataFrame([{"Analyzer": name, "Status": f["status"], "Summary": f["summary"],
+                              "Seconds": self.timings.get(name, np.nan)}
+                             for name, f in self.findings.items()])
+
+    @property
+    def status(self):
+        """Worst status over all findings."""
+        return max((f["status"] for f in self.findings.values()), key=STATUSES.index, default="ok")
+
+    def print(self, rows=10):
+        icon = {"ok": "✅", "warning": "⚠️ ", "error": "❌"}
+        print(f"\n🩺 Diagnostics for {self.inp_file}")
+        for name, f in self.findings.items():
+            print(f"{icon[f['status']]} {name}: {f['summary']}")
+            if f["status"] != "ok" and f["table"] is not None and len(f["table"]):
+                print(f["table"].head(rows).to_string(index=False))
+        for name in ("load", "solve"):
+            if name in self.timings:
+                print(f"⏱️  {name}: {self.timings[name]:.2f} s")
+
+    def save(self, folder=REPORT_DIR):
+        """Write the summary CSV plus one diagnostics_<analyzer>.csv per non-empty table."""
+        os.makedirs(folder, exist_ok=True)
+        self.summary.to_csv(os.path.join(folder, SUMMARY_CSV), index=False)
+        for name, f in self.findings.items():
+            if f["table"] is not None and len(f["table"]):
+                f["table"].to_csv(os.path.join(folder, f"diagnostics_{name}.csv"), index=False)
+        return os.path.join(folder, SUMMARY_CSV)
+
+
+def _run_analyzer(name, ctx):
+    fn, needs_results = ANALYZERS[name]
+    started = time.perf_counter()
+    if needs_results and ctx.results is None:
+        result = finding("error", f"skipped: the hydraulic solve failed ({ctx.error})")
+    else:
+        try:
+            result = fn(ctx)
+        except Exception as e:        # one broken analyzer must not sink the whole report
+            result = finding("error", f"analyzer failed: {type(e).__name__}: {e}")
+    return result, time.perf_counter() - started
+
+
+def run_diagnostics(inp_file, analyzers=None, engine=None, n_workers=N_WORKERS, **options):
+    """
+    Load and solve inp_file once, run the selected analyzers (default all)
+    concurrently and return a DiagnosticReport. Keyword options override
+    the thresholds (low_pressure_m, negative_tolerance_m, max_total_demand_m3s).
+    """
+    names = list(ANALYZERS) if analyzers is None else list(analyzers)
+    unknown = set(names) - set(ANALYZERS)
+    if unknown:
+        raise ValueError(f"Unknown analyzer(s) {sorted(unknown)} (choose from {list(ANALYZERS)})")
+    settings = {"low_pressure_m": LOW_PRESSURE_M, "negative_tolerance_m": NEGATIVE_TOLERANCE_M,
+                "max_total_demand_m3s": MAX_TOTAL_DEMAND_M3S}
+    settings.update(options)
+
+    timings = {}
+    started = time.perf_counter()
+    net = load_network(inp_file)
+    wn = wntr.network.WaterNetworkModel(inp_file)
+    timings["load"] = time.perf_counter() - started
+
+    def analyse(results, error):
+        ctx = DiagnosticContext(inp_file, net, wn, results, error, settings)
+        with ThreadPoolExecutor(max_workers=max(1, n_workers)) as pool:
+            done = dict(zip(names, pool.map(lambda name: _run_analyzer(name, ctx), names)))
+        timings.update({name: seconds for name, (_, seconds) in done.items()})
+        return {name: result for name, (result, _) in done.items()}
+
+    started = time.perf_counter()
+    try:
+        if engine_name(engine) == "native":
+            results, error = _FrameResults(run_hydraulics(wn, engine="native")), None
+            timings["solve"] = time.perf_counter() - started
+            return DiagnosticReport(inp_file, analyse(results, error), timings)
+        with epanet_output(wn) as out:
+            timings["solve"] = time.perf_counter() - started
+            # The output stays mapped while the analyzers read from it
+            return DiagnosticReport(inp_file, analyse(out, None), timings)
+    except Exception as e:
+        timings["solve"] = time.perf_counter() - started
+        return DiagnosticReport(inp_file, analyse(None, f"{type(e).__name__}: {e}"), timings)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="One-pass health check of a network INP.")
+    parser.add_argument("inp_file")
+    parser.add_argument("--only", nargs="+", metavar="ANALYZER", choices=list(ANALYZERS),
+                        help=f"analyzers to run (default all: {', '.join(ANALYZERS)})")
+    parser.add_argument("--threshold", type=float, default=LOW_PRESSURE_M, help="low-pressure threshold (m)")
+    parser.add_argument("--engine", choices=ENGINES, default=None,
+                        help="hydraulic engine (default: $WDS_ENGINE or epanet)")
+    parser.add_argument("--workers", type=int, default=N_WORKERS, help="analyzer threads")
+    parser.add_argument("--no-save", action="store_true", help="print the report without writing CSVs")
+    args = parser.parse_args()
+
+    report = run_diagnostics(args.inp_file, args.only, engine=args.engine, n_workers=args.workers,
+                             low_pressure_m=args.threshold)
+    report.print()
+    if not args.no_save:
+        print(f"💾 Saved report → {report.save()}")
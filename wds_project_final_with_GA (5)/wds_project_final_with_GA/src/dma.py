@@ -0,0 +1,401 @@
+# src/dma.py
+"""
+District metered areas (DMAs): partition the network, solve the parts in
+parallel, and couple them through the heads at their boundaries.
+
+    net = NetworkArrays(wn)
+    part = partition(net, n_dmas=5, hints=ward_hints(inp_file))
+    solution, info = DmaSolver(wn, part).solve()      # a HydraulicSolution of the whole network
+
+partition() grows DMAs by merging across the strongest links first, so the
+links left between DMAs (the cut) are the weakest. Strength is a link's
+Hazen-Williams conveyance (C d^2.63 / L^0.54), or |flow| when a previous
+solution's flows are given. DMAs are kept within `imbalance` of an equal
+share of junctions. Junctions whose INP comments carry the same label (the
+ward name) always stay in one DMA, and each DMA is named after the ward of
+its largest demand.
+
+DmaSolver builds one sub-network per DMA: its own nodes and links, plus
+every cut link, ending at a reservoir standing in for the junction on the
+far side. Each coupling round solves every DMA (across worker processes,
+warm-started from the previous round) with those reservoirs at the current
+boundary heads, then moves the boundary heads by one Newton step towards
+the heads their own DMAs compute for them, using each DMA's
+head_sensitivity() for the Jacobian. Rounds repeat until the two agree
+within HEAD_TOLERANCE_M, and the parts are then assembled into one global
+solution. Where DMAs share no links at all (the Bangalore model is one star
+per source), one round gives the exact answer.
+
+    python src/dma.py data/Bangalore_WDS_Realistic.inp --dmas 5
+"""
+
+import argparse
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import wntr
+
+from hydraulic_solver import HW_EXPONENT, HydraulicSolution, NetworkArrays, head_sensitivity, solve
+from inp_file import InpFile
+from scenarios import apply_override
+from sim_runner import set_pressure_driven
+
+# ──────────────────────────────────────────────────────────────
+# Configuration
+# ──────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INP_FILE = os.path.join(BASE_DIR, "data", "Bangalore_WDS_Realistic.inp")
+PARTITION_CSV = os.path.join(BASE_DIR, "reports", "dma_partition.csv")
+
+IMBALANCE = 0.2               # a DMA may hold up to 20% more than an equal share of junctions
+HEAD_TOLERANCE_M = 1e-4       # coupling stops when boundary heads agree with their own DMA's to this
+MAX_ROUNDS = 100
+RELAXATION = 1.0              # fraction of each Newton step the boundary heads take
+N_WORKERS = os.cpu_count() or 1
+GHOST_PREFIX = "~"            # boundary reservoir standing for node X in a sub-network is "~X"
+
+# Sub-networks held by each worker process (see _init_worker)
+_subnets = None
+
+
+# ──────────────────────────────────────────────────────────────
+# Partitioning
+# ──────────────────────────────────────────────────────────────
+def ward_hints(inp_file):
+    """{junction: ward label} from the comments on the INP's [JUNCTIONS] lines."""
+    inp = InpFile(inp_file)
+    section = inp.section("JUNCTIONS")
+    return {j: c for j, c in zip(section.ids.tolist(), inp.comments("JUNCTIONS").tolist()) if c}
+
+
+class Partition:
+    """
+    DMA of every node of a NetworkArrays (junctions first, then fixed-head
+    nodes; -1 for a source with no open link), with the cut links between DMAs.
+    """
+
+    def __init__(self, net, label, names, hints):
+        self.net = net
+        self.label = label
+        self.names = names
+        self.hints = hints
+        self.n_dmas = len(names)
+        ends = (label[net.start], label[net.end])
+        self.cut = np.flatnonzero(net.open & (ends[0] != ends[1]))
+
+    def nodes(self, dma):
+        """Indices (NetworkArrays numbering) of the nodes in one DMA."""
+        return np.flatnonzero(self.label == dma)
+
+    def summary(self):
+        net, nj = self.net, self.net.n_junctions
+        rows = []
+        for k, name in enumerate(self.names):
+            inside = self.label == k
+            touching = (self.label[net.start[self.cut]] == k) | (self.label[net.end[self.cut]] == k)
+            rows.append({"dma": name, "junctions": int(inside[:nj].sum()), "sources": int(inside[nj:].sum()),
+                         "demand_LPS": net.demand[inside[:nj]].sum() * 1000.0, "cut_links": int(touching.sum())})
+        return pd.DataFrame(rows)
+
+    def frame(self):
+        """One row per node: its DMA and ward hint."""
+        net = self.net
+        names = net.junction_names + net.fixed_names
+        return pd.DataFrame({"node": names,
+                             "dma": [self.names[k] if k >= 0 else "" for k in self.label.tolist()],
+                             "ward": [self.hints.get(n, "") for n in names]})
+
+
+def link_strength(net, flows=None):
+    """How strongly each open link ties its ends together: |flow| if given, else H-W conveyance."""
+    if flows is not None:
+        strength = np.abs(flows)
+    else:
+        strength = net.roughness * net.diameter ** 2.63 / net.length ** (1.0 / HW_EXPONENT)
+    return np.where(net.open, strength, 0.0)
+
+
+def partition(net, n_dmas, hints=None, flows=None, imbalance=IMBALANCE):
+    """
+    Split net (NetworkArrays) into at most n_dmas DMAs, merging clusters
+    across the strongest links first; see the module docstring.
+    """
+    if n_dmas < 1:
+        raise ValueError(f"Need at least one DMA, not {n_dmas}")
+    hints = hints or {}
+    nj = net.n_junctions
+    n = nj + len(net.fixed_names)
+    parent = list(range(n))
+    size = [1] * nj + [0] * (n - nj)          # junctions per cluster
+    n_clusters = nj
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    def union(a, b):
+        nonlocal n_clusters
+        if size[a] < size[b]:
+            a, b = b, a
+        parent[b] = a
+        if size[a] and size[b]:
+            n_clusters -= 1
+        size[a] += size[b]
+
+    # Junctions sharing a ward label start out together
+    groups = {}
+    for k, j in enumerate(net.junction_names):
+        if hints.get(j):
+            groups.setdefault(hints[j], []).append(k)
+    for members in groups.values():
+        for k in members[1:]:
+            a, b = find(members[0]), find(k)
+            if a != b:
+                union(a, b)
+
+    # Strongest links first, as long as the merged cluster stays within the size cap
+    strength = link_strength(net, flows)
+    order = np.argsort(-strength, kind="stable")
+    order = order[strength[order] > 0]
+    start, end = net.start.tolist(), net.end.tolist()
+    cap = int(np.ceil(nj / n_dmas * (1.0 + imbalance)))
+    for i in order.tolist():
+        a, b = find(start[i]), find(end[i])
+        if a == b or (size[a] and size[b] and (n_clusters <= n_dmas or size[a] + size[b] > cap)):
+            continue
+        union(a, b)
+
+    # Then fold the smallest leftover clusters into their strongest neighbour until n_dmas remain
+    stuck = set()
+    while n_clusters > n_dmas:
+        roots = np.array([find(k) for k in range(n)])
+        small = min((size[r], r) for r in set(roots[:nj].tolist()) if r not in stuck)[1]
+        a, b = roots[net.start[order]], roots[net.end[order]]
+        across = np.flatnonzero((a == small) != (b == small))
+        if len(across) == 0:
+            stuck.add(small)          # a separate component; it stays a DMA of its own
+            if len(stuck) >= n_clusters:
+                break
+            continue
+        i = order[across[0]]          # order is strongest first
+        union(find(start[i]), find(end[i]))
+
+    # Number the clusters that hold junctions in order of their first junction
+    roots = np.array([find(k) for k in range(n)])
+    label = np.full(n, -1)
+    first = {}
+    for k in range(nj):
+        first.setdefault(roots[k], len(first))
+    for k in range(n):
+        label[k] = first.get(roots[k], -1)
+
+    names = []
+    for d in range(len(first)):
+        members = np.flatnonzero(label[:nj] == d)
+        anchor = net.junction_names[members[np.argmax(net.demand[members])]]
+        names.append(f"DMA{d + 1}" + (f" ({hints[anchor]})" if hints.get(anchor) else ""))
+    return Partition(net, label, names, hints)
+
+
+# ──────────────────────────────────────────────────────────────
+# Sub-networks and coupled solves
+# ──────────────────────────────────────────────────────────────
+def _sub_network(wn, partition, dma, boundary_head):
+    """
+    wn cut down to one DMA: its nodes and links plus its cut links, whose far
+    ends become reservoirs (named GHOST_PREFIX + node) at `boundary_head`
+    {node: head}. Returns (NetworkArrays, junctions those reservoirs stand for,
+    own junctions that stand as reservoirs in neighbouring DMAs).
+    """
+    net = partition.net
+    names = net.junction_names + net.fixed_names
+    inside = {names[k] for k in partition.nodes(dma)}
+    cut = [i for i in partition.cut.tolist()
+           if partition.label[net.start[i]] == dma or partition.label[net.end[i]] == dma]
+    cut_names = {net.link_names[i] for i in cut}
+    boundary = sorted(({names[net.start[i]] for i in cut} | {names[net.end[i]] for i in cut}) - inside)
+    ghosts = [b for b in boundary if wn.get_node(b).node_type == "Junction"]
+    exports = sorted(({names[net.start[i]] for i in cut} | {names[net.end[i]] for i in cut}) & inside)
+    exports = [e for e in exports if wn.get_node(e).node_type == "Junction"]
+
+    # Boundary reservoirs get their own names: wntr keeps a removed junction's name registered as a junction
+    sub = copy.deepcopy(wn)
+    kept_cut = []
+    for name in list(sub.link_name_list):
+        link = sub.get_link(name)
+        if name in cut_names:
+            kept_cut.append(link)
+        if name in cut_names or not (link.start_node_name in inside and link.end_node_name in inside):
+            sub.remove_link(name, force=True)
+    for name in list(sub.node_name_list):
+        if name not in inside and (name not in boundary or name in ghosts):
+            sub.remove_node(name, force=True)
+    for name in ghosts:
+        sub.add_reservoir(GHOST_PREFIX + name, base_head=boundary_head[name],
+                          coordinates=wn.get_node(name).coordinates)
+    ghost = {name: GHOST_PREFIX + name for name in ghosts}
+    for link in kept_cut:
+        sub.add_pipe(link.name, ghost.get(link.start_node_name, link.start_node_name),
+                     ghost.get(link.end_node_name, link.end_node_name), length=link.length,
+                     diameter=link.diameter, roughness=link.roughness, minor_loss=link.minor_loss,
+                     initial_status=link.initial_status, check_valve=link.check_valve)
+    return NetworkArrays(sub), ghosts, exports
+
+
+def _solve_sub(sub, ghosts, exports, heads, flow, delivered):
+    """
+    One DMA at the given boundary heads. Also returns how its exported
+    junction heads move with those boundary heads (the coupling Jacobian block).
+    """
+    scenario = apply_override(sub, {"heads": {GHOST_PREFIX + g: h for g, h in zip(ghosts, heads)}})
+    solution = solve(scenario, flows=flow, delivered=delivered if sub.pressure_driven else None)
+    rows = [sub.junction_names.index(e) for e in exports]
+    cols = [sub.fixed_names.index(GHOST_PREFIX + g) for g in ghosts]
+    sensitivity = head_sensitivity(solution)[np.ix_(rows, cols)] if rows and cols else np.zeros((len(rows), len(cols)))
+    return (solution.head[:sub.n_junctions], solution.flow, solution.delivered, solution.iterations,
+            solution.converged, sensitivity)
+
+
+def _init_worker(subnets):
+    global _subnets
+    _subnets = subnets
+
+
+def _solve_in_worker(task):
+    dma, heads, flow, delivered = task
+    return _solve_sub(*_subnets[dma], heads, flow, delivered)
+
+
+class DmaSolver:
+    """Coupled DMA solves of wn for a Partition of NetworkArrays(wn)."""
+
+    def __init__(self, wn, partition, n_workers=N_WORKERS):
+        self.partition = partition
+        net = self.net = partition.net
+        self.n_workers = max(1, min(int(n_workers), partition.n_dmas))
+
+        # Starting guess for every boundary head: the mean source head
+        guess = float(np.mean(net.fixed_head)) if len(net.fixed_head) else 0.0
+        names = net.junction_names + net.fixed_names
+        self._index = {name: k for k, name in enumerate(names)}
+        self._link_index = {name: k for k, name in enumerate(net.link_names)}
+        self.head = np.concatenate([np.full(net.n_junctions, guess), net.fixed_head])
+        self.subnets = [_sub_network(wn, partition, d, {n: guess for n in names})
+                        for d in range(partition.n_dmas)]
+
+    def solve(self, tolerance=HEAD_TOLERANCE_M, max_rounds=MAX_ROUNDS, relaxation=RELAXATION):
+        """
+        Coupling rounds until the boundary heads each DMA was given agree with
+        the heads their own DMA computes for them. Returns (HydraulicSolution of
+        the whole network, info dict with rounds, mismatch per round, Newton
+        iterations and time).
+
+        The boundary heads g are updated by Newton's method on g = F(g), where
+        F gives each boundary junction's head as solved by its own DMA; F's
+        Jacobian comes from each DMA's head_sensitivity(), so the update
+        solves one small dense system over the boundary junctions.
+        """
+        net, part = self.net, self.partition
+        nj = net.n_junctions
+        junctions = [np.array([self._index[n] for n in sub.junction_names]) for sub, _, _ in self.subnets]
+        ghosts = [np.array([self._index[n] for n in g], dtype=int) for _, g, _ in self.subnets]
+        exports = [np.array([self._index[n] for n in e], dtype=int) for _, _, e in self.subnets]
+        boundary = np.unique(np.concatenate(ghosts)) if ghosts else np.array([], dtype=int)
+        position = np.full(len(self.head), -1)
+        position[boundary] = np.arange(len(boundary))
+        warm = [(None, None)] * part.n_dmas
+        history = []
+        pool = None
+        if self.n_workers > 1:
+            pool = ProcessPoolExecutor(max_workers=self.n_workers, initializer=_init_worker,
+                                       initargs=(self.subnets,))
+        t0 = time.perf_counter()
+        try:
+            for round_ in range(1, max_rounds + 1):
+                tasks = [(d, self.head[ghosts[d]], warm[d][0], warm[d][1]) for d in range(part.n_dmas)]
+                if pool is None:
+                    results = [_solve_sub(*self.subnets[d], *task[1:]) for d, task in enumerate(tasks)]
+                else:
+                    results = list(pool.map(_solve_in_worker, tasks))
+                new_head = self.head.copy()
+                jacobian = np.eye(len(boundary))
+                for d, (head, flow, delivered, _, _, sensitivity) in enumerate(results):
+                    new_head[junctions[d]] = head
+                    warm[d] = (flow, delivered)
+                    jacobian[np.ix_(position[exports[d]], position[ghosts[d]])] -= sensitivity
+                mismatch = new_head[boundary] - self.head[boundary]
+                history.append(float(np.abs(mismatch).max()) if len(boundary) else 0.0)
+                if history[-1] <= tolerance:
+                    break
+                step = relaxation * np.linalg.solve(jacobian, mismatch)
+                self.head[:nj] = new_head[:nj]
+                self.head[boundary] = new_head[boundary] - mismatch + step
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        elapsed = time.perf_counter() - t0
+
+        # Assemble: each junction and link from the DMA that owns it (cut links from their start node's DMA)
+        head = new_head[:nj]
+        flow = np.zeros(len(net.link_names))
+        delivered = np.zeros(nj) if net.pressure_driven else None
+        for d, (sub, _, _) in enumerate(self.subnets):
+            sub_flow, sub_delivered = results[d][1], results[d][2]
+            for i, name in enumerate(sub.link_names):
+                k = self._link_index[name]
+                if part.label[net.start[k]] == d:
+                    flow[k] = sub_flow[i]
+            if delivered is not None:
+                delivered[junctions[d]] = sub_delivered
+        converged = history[-1] <= tolerance and all(r[4] for r in results)
+        iterations = sum(r[3] for r in results)
+        solution = HydraulicSolution(net, head, flow, round_, history[-1], converged, delivered)
+        info = {"rounds": round_, "mismatch_m": history, "newton_iterations": iterations, "seconds": elapsed}
+        return solution, info
+
+
+# ──────────────────────────────────────────────────────────────
+# Main: partition, solve, compare with the monolithic solve
+# ──────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Partition a network into DMAs and solve them coupled.")
+    parser.add_argument("inp_file", nargs="?", default=INP_FILE)
+    parser.add_argument("--dmas", type=int, default=None, help="number of DMAs (default: one per source)")
+    parser.add_argument("--workers", type=int, default=N_WORKERS, help="worker processes")
+    parser.add_argument("--relaxation", type=float, default=RELAXATION)
+    parser.add_argument("--tolerance", type=float, default=HEAD_TOLERANCE_M, help="boundary head tolerance (m)")
+    parser.add_argument("--pdd", action="store_true", help="pressure-driven demand (sim_runner defaults)")
+    parser.add_argument("--no-save", action="store_true", help=f"do not write {PARTITION_CSV}")
+    args = parser.parse_args()
+
+    wn = wntr.network.WaterNetworkModel(args.inp_file)
+    if args.pdd:
+        set_pressure_driven(wn)
+    net = NetworkArrays(wn)
+    part = partition(net, args.dmas or max(1, len(net.fixed_names)), ward_hints(args.inp_file))
+    print(f"🗺️  {part.n_dmas} DMAs, {len(part.cut)} cut links")
+    print(part.summary().to_string(index=False, float_format=lambda x: f"{x:.1f}"))
+
+    solver = DmaSolver(wn, part, args.workers)
+    solution, info = solver.solve(args.tolerance, relaxation=args.relaxation)
+    t0 = time.perf_counter()
+    reference = solve(net)
+    t_mono = time.perf_counter() - t0
+
+    dh = np.abs(solution.head - reference.head).max()
+    dq = np.abs(solution.flow - reference.flow).max() / max(np.abs(reference.flow).max(), 1e-12)
+    status = "✅" if solution.converged else "⚠️ "
+    print(f"{status} {info['rounds']} coupling round(s), boundary mismatch {info['mismatch_m'][-1]:.2e} m, "
+          f"{info['newton_iterations']} Newton iterations, {info['seconds'] * 1000:.1f} ms "
+          f"(monolithic {t_mono * 1000:.1f} ms)")
+    print(f"📏 vs monolithic solve: max head difference {dh:.2e} m, max flow difference {dq:.2e} (relative)")
+    if not args.no_save:
+        os.makedirs(os.path.dirname(PARTITION_CSV), exist_ok=True)
+        part.frame().to_csv(PARTITION_CSV, index=False)
+        print(f"✅ Saved {PARTITION_CSV}")
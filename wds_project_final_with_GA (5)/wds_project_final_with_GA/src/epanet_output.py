@@ -0,0 +1,236 @@
+# src/epanet_output.py
+"""
+Memory-mapped reader for EPANET binary output (.bin / .out) files.
+
+wntr's BinFile reads every variable of every reporting period into pandas
+DataFrames, and most scripts then keep one row of one variable
+(.iloc[-1], .min()). EpanetOutput maps the file instead and only touches
+the bytes of what is asked for:
+
+    out = EpanetOutput("run.bin")
+    out.node("pressure", periods=-1)                  # final pressures, SI
+    out.link("flowrate", ["P1", "P2"], periods=slice(0, 24))
+    out.reduce("node", "pressure", "min")             # per node, over all periods
+    out.frame("node", "head")                         # DataFrame like results.node["head"]
+
+The results block is viewed as a (periods, 4*nodes + 8*links) float32
+array over the mapping; selecting a variable is a strided view and only
+the chosen elements and periods are copied (and converted to SI like
+wntr). reduce() walks the periods in chunks, so memory stays flat however
+long the extended-period run is.
+
+OutputReader plugs into wntr.sim.EpanetSimulator(reader=...) so a run
+returns an EpanetOutput instead of parsed results; see
+sim_runner.epanet_output().
+"""
+
+import mmap
+
+import numpy as np
+import pandas as pd
+
+from inp_file import FLOW_UNITS
+
+MAGIC = 516114521
+ID_BYTES = 32                   # MAXID + 1 in EPANET 2.x
+PROLOG_INTS = 15
+EPILOG_BYTES = 28               # 4 reaction averages, period count, warning flag, magic
+CHUNK_PERIODS = 256             # periods per block in reduce()
+
+NODE_VARIABLES = ("demand", "head", "pressure", "quality")
+LINK_VARIABLES = ("flowrate", "velocity", "headloss", "quality", "status", "setting",
+                  "reaction_rate", "friction_factor")
+
+# EPANET codes in the prolog
+FLOW_UNIT_CODES = ("CFS", "GPM", "MGD", "IMGD", "AFD", "LPS", "LPM", "MLD", "CMH", "CMD")
+LINK_TYPE_PUMP = 2
+FT = 0.3048
+PSI_PER_FT, KPA_PER_PSI = 0.4333, 6.895               # EPANET's own conversion constants
+PRESSURE_TO_M = (FT / PSI_PER_FT, FT / (PSI_PER_FT * KPA_PER_PSI), 1.0)   # psi, kPa, metres
+
+
+class EpanetOutput:
+    """
+    One EPANET binary output file, mapped read-only.
+
+    node_names, link_names, link_type (EPANET codes), elevation, length,
+    diameter (file units), times (s) and n_periods describe the run; node(),
+    link(), frame() and reduce() read results in SI units.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        mm = self._mm
+
+        # Small description arrays are copied; only the results block stays a view of the mapping
+        prolog = np.frombuffer(mm, dtype=np.int32, count=PROLOG_INTS).copy()
+        if prolog[0] != MAGIC:
+            raise ValueError(f"{self.path} is not an EPANET binary output file")
+        (self.version, nn, n_tanks, nl, n_pumps, _, _, _, flow_code, pressure_code, self.stats_flag,
+         self.report_start, self.report_step, self.duration) = (int(v) for v in prolog[1:])
+        self.n_nodes, self.n_links, self.n_tanks, self.n_pumps = nn, nl, n_tanks, n_pumps
+        self.flow_units = FLOW_UNIT_CODES[flow_code]
+
+        pos = 4 * PROLOG_INTS + 240 + 260 + 260 + 2 * ID_BYTES   # prolog, title, file names, chemical
+        self.node_names = self._ids(pos, nn)
+        pos += nn * ID_BYTES
+        self.link_names = self._ids(pos, nl)
+        pos += nl * ID_BYTES
+        ints = np.frombuffer(mm, dtype=np.int32, count=3 * nl + n_tanks, offset=pos).copy()
+        self.link_start, self.link_end = ints[:nl] - 1, ints[nl:2 * nl] - 1
+        self.link_type = ints[2 * nl:3 * nl]
+        self.tank_index = ints[3 * nl:] - 1
+        pos += 4 * (3 * nl + n_tanks)
+        floats = np.frombuffer(mm, dtype=np.float32, count=n_tanks + nn + 2 * nl, offset=pos).copy()
+        self.tank_area = floats[:n_tanks]
+        self.elevation = floats[n_tanks:n_tanks + nn]
+        self.length = floats[n_tanks + nn:n_tanks + nn + nl]
+        self.diameter = floats[n_tanks + nn + nl:]
+        pos += 4 * (n_tanks + nn + 2 * nl)
+        pos += n_pumps * (4 + 6 * 4) + 4                            # pump energy records, peak demand charge
+
+        self._period_floats = 4 * nn + 8 * nl
+        epilog = np.frombuffer(mm, dtype=np.int32, count=3, offset=len(mm) - 12).copy()
+        # A run that stopped early has no epilog; keep the periods that were written
+        self.complete = bool(epilog[2] == MAGIC)
+        written = len(mm) - pos - (EPILOG_BYTES if self.complete else 0)
+        self.n_periods = int(epilog[0]) if self.complete else written // (4 * self._period_floats)
+        self._data = np.frombuffer(mm, dtype=np.float32, count=self.n_periods * self._period_floats,
+                                   offset=pos).reshape(self.n_periods, self._period_floats)
+        self.times = self.report_start + self.report_step * np.arange(self.n_periods)
+
+        us = flow_code < FLOW_UNIT_CODES.index("LPS")
+        length_to_m = FT if us else 1.0
+        flow = FLOW_UNITS[self.flow_units]
+        self._to_si = {
+            ("node", "demand"): flow, ("node", "head"): length_to_m,
+            ("node", "pressure"): PRESSURE_TO_M[pressure_code],
+            ("link", "flowrate"): flow, ("link", "velocity"): length_to_m,
+        }
+        # Pipe headloss is per 1000 length units; pump and valve headloss is a head
+        self._headloss_to_si = np.where(self.link_type < LINK_TYPE_PUMP, 1e-3, length_to_m).astype(np.float32)
+        self._node_index = None
+        self._link_index = None
+
+    def _ids(self, offset, count):
+        raw = np.frombuffer(self._mm, dtype=f"S{ID_BYTES}", count=count, offset=offset)
+        try:
+            return raw.astype(str)
+        except UnicodeDecodeError:
+            return np.char.decode(raw, "latin-1")
+
+    def close(self):
+        self._data = None
+        self._mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ──────────────────────────────────────────────────────────────
+    # Selection
+    # ──────────────────────────────────────────────────────────────
+    def _columns(self, kind, variable, elements):
+        """Absolute column indices of a variable for the chosen elements."""
+        if kind == "node":
+            names, offset, n, variables = self.node_names, 0, self.n_nodes, NODE_VARIABLES
+        elif kind == "link":
+            names, offset, n, variables = self.link_names, 4 * self.n_nodes, self.n_links, LINK_VARIABLES
+        else:
+            raise ValueError(f"Unknown element kind: {kind} (choose 'node' or 'link')")
+        if variable not in variables:
+            raise ValueError(f"Unknown {kind} variable: {variable} (choose from {variables})")
+        first = offset + variables.index(variable) * n
+        if elements is None:
+            return slice(first, first + n), np.arange(n)
+        index = self._index(kind, names)
+        rows = np.array([index[e] if isinstance(e, str) else int(e) for e in np.atleast_1d(elements)],
+                        dtype=np.int64)
+        return first + rows, rows
+
+    def _index(self, kind, names):
+        attr = f"_{kind}_index"
+        if getattr(self, attr) is None:
+            setattr(self, attr, {n: k for k, n in enumerate(names.tolist())})
+        return getattr(self, attr)
+
+    def _convert(self, kind, variable, values, rows):
+        if (kind, variable) in self._to_si:
+            return values * self._to_si[(kind, variable)]
+        if (kind, variable) == ("link", "headloss"):
+            return values * self._headloss_to_si[rows]
+        if (kind, variable) == ("link", "status"):
+            # EPANET status codes -> wntr LinkStatus (0 closed, 1 open, 2 active)
+            return np.select([values <= 2, values == 4], [0.0, 2.0], 1.0).astype(np.float32)
+        return values.copy()     # quality, setting, reaction rate, friction factor: file units
+
+    def read(self, kind, variable, elements=None, periods=None):
+        """
+        Values of one variable, shape (periods, elements), or 1-D when
+        `periods` is a single int (e.g. -1 for the final state). float32 as
+        stored in the file (and in wntr's results). `elements` are names or
+        indices (default all); `periods` an int, slice or index array
+        (default all). The result is a copy, never a view of the mapping.
+        """
+        columns, rows = self._columns(kind, variable, elements)
+        single = isinstance(periods, (int, np.integer))
+        if periods is None:
+            periods = slice(None)
+        elif single:
+            periods = slice(periods, periods + 1 if periods != -1 else None)
+        if isinstance(periods, slice) or isinstance(columns, slice):
+            values = self._data[periods][:, columns] if isinstance(periods, slice) else self._data[periods, columns]
+        else:
+            values = self._data[np.ix_(np.asarray(periods), columns)]
+        values = self._convert(kind, variable, values, rows)
+        return values[0] if single else values
+
+    def node(self, variable, nodes=None, periods=None):
+        return self.read("node", variable, nodes, periods)
+
+    def link(self, variable, links=None, periods=None):
+        return self.read("link", variable, links, periods)
+
+    def frame(self, kind, variable, elements=None, periods=None):
+        """Time x element DataFrame, laid out like wntr's results.node[...] / results.link[...]."""
+        columns, rows = self._columns(kind, variable, elements)
+        names = (self.node_names if kind == "node" else self.link_names)[rows]
+        index = self.times[periods if periods is not None else slice(None)]
+        values = self.read(kind, variable, elements, periods)
+        return pd.DataFrame(np.atleast_2d(values), index=np.atleast_1d(index), columns=names)
+
+    def reduce(self, kind, variable, how="min", elements=None, chunk=CHUNK_PERIODS):
+        """
+        Per-element min, max or mean over every period, read CHUNK_PERIODS
+        periods at a time so memory does not grow with the run length.
+        """
+        if how not in ("min", "max", "mean"):
+            raise ValueError(f"Unknown reduction: {how} (choose 'min', 'max' or 'mean')")
+        if self.n_periods == 0:
+            raise ValueError(f"{self.path} holds no reporting periods")
+        result = None
+        for lo in range(0, self.n_periods, chunk):
+            block = self.read(kind, variable, elements, slice(lo, lo + chunk))
+            part = block.sum(axis=0, dtype=np.float64) if how == "mean" else getattr(block, how)(axis=0)
+            if result is None:
+                result = part
+            elif how == "mean":
+                result += part
+            else:
+                result = np.minimum(result, part) if how == "min" else np.maximum(result, part)
+        return result / self.n_periods if how == "mean" else result
+
+
+class OutputReader:
+    """wntr EpanetSimulator reader that maps the output file instead of parsing it."""
+
+    def read(self, filename, convergence_error=False, darcy_weisbach=False, *args, **kwargs):
+        out = EpanetOutput(filename)
+        if convergence_error and not out.complete:
+            out.close()
+            raise RuntimeError(f"Simulation did not converge: {filename} stops after {out.n_periods} periods.")
+        return out
@@ -1,6 +1,8 @@
 import sys
-import wntr
-import networkx as nx
+import numpy as np
+
+from compact_network import NODE_RESERVOIR, load_network
+from topology import TopologyIndex
 
 def main():
     if len(sys.argv) < 2:
@@ -10,27 +12,17 @@ def main():
     inp_file = sys.argv[1]
     print(f"🔍 Loading network from: {inp_file}")
 
-    # Load network
-    wn = wntr.network.WaterNetworkModel(inp_file)
-    G_directed = wn.to_graph()  # Directed graph (by default)
-    G = G_directed.to_undirected()  # ✅ Convert to undirected for connectivity
-
-    # Get reservoir names properly
-    reservoirs = [name for name, _ in wn.reservoirs()]
-    print(f"Found reservoirs: {reservoirs}")
-
-    # Use NetworkX connected components
-    connected_components = list(nx.connected_components(G))
-    print(f"Total connected components: {len(connected_components)}")
+    # Array network (mapped from its binary cache after the first run)
+    net = load_network(inp_file)
+    reservoirs = np.flatnonzero(net.node_type == NODE_RESERVOIR)
+    print(f"Found reservoirs: {net.node_names[reservoirs].tolist()}")
 
-    # Identify components containing reservoirs
-    reservoir_components = [
-        comp for comp in connected_components if any(r in comp for r in reservoirs)
-    ]
-    reservoir_nodes = set().union(*reservoir_components)
+    # Components over every pipe, pump and valve, whatever their status
+    topo = TopologyIndex(net, is_open=np.ones(net.n_links, dtype=bool))
+    print(f"Total connected components: {topo.n_components}")
 
-    # Find disconnected junctions
-    disconnected_nodes = [name for name, _ in wn.junctions() if name not in reservoir_nodes]
+    # Junctions outside every component that holds a reservoir or tank
+    disconnected_nodes = net.node_names[topo.cut_off()].tolist()
 
     if disconnected_nodes:
         print(f"⚠️ Disconnected nodes (not linked to any reservoir): {len(disconnected_nodes)}")
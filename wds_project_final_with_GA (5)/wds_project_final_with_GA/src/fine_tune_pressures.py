@@ -1,13 +1,17 @@
 import wntr
 import os
+from sim_cache import SimulationCache, run_hydraulics_cached
+from sim_runner import HydraulicSession
+from head_calibration import calibrate_heads
 
 def main():
     inp_path = "data/Bangalore_WDS_demand_fixed.inp"
     wn = wntr.network.WaterNetworkModel(inp_path)
+    cache = SimulationCache()
+    session = HydraulicSession(wn)   # warm-starts each re-solve (native engine)
 
     print(f"🔍 Fine-tuning pressures in: {inp_path}")
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
+    results = run_hydraulics_cached(wn, cache, session=session)
     min_p = results.node["pressure"].min().min()
     print(f"Initial minimum pressure: {min_p:.4f} m")
 
@@ -17,32 +21,20 @@ def main():
         print("❌ No reservoirs found. Cannot adjust heads.")
         return
 
-    iteration = 0
-    while min_p < 0:
-        iteration += 1
-        print(f"\nIteration {iteration}: Increasing reservoir heads slightly...")
-
-        # Increase each reservoir’s head by 0.5 m
-        for r_name in reservoirs:
-            res = wn.get_node(r_name)
-            current = res.base_head
-            res.base_head = current + 0.5
-            print(f"  {r_name}: {current:.2f} → {res.base_head:.2f} m")
-
-        sim = wntr.sim.EpanetSimulator(wn)
-        results = sim.run_sim()
-        min_p = results.node["pressure"].min().min()
-        print(f"  🔁 New minimum pressure: {min_p:.4f} m")
-
-        if iteration > 20:
-            print("⚠️  Stopping after 20 iterations — something else may be wrong.")
-            break
+    # Root-find the lowest head per source that keeps its zone at >= 0 m
+    calib = calibrate_heads(wn, target_pressure=0.0, session=session, cache=cache)
+    for r_name, head in calib["heads"].items():
+        print(f"  {r_name}: → {head:.2f} m (zone min {calib['zone_min_pressure'][r_name]:.3f} m)")
+    min_p = calib["min_pressure"]
+    print(f"  🔁 Calibrated in {calib['n_solves']} solves")
 
     if min_p >= 0:
         print(f"\n✅ Success! Final minimum pressure: {min_p:.4f} m")
     else:
         print(f"\n⚠️  Still slightly negative: {min_p:.4f} m (within rounding limits)")
 
+    print(f"Simulation cache: {cache.stats()}")
+
     # Save the tuned network
     out_path = os.path.join("data", "Bangalore_WDS_fine_tuned.inp")
     wntr.network.io.write_inpfile(wn, out_path)
@@ -1,31 +1,28 @@
 import wntr
 import pandas as pd
 from pathlib import Path
+from sim_cache import SimulationCache, run_hydraulics_cached
+from sim_runner import HydraulicSession
+from head_calibration import calibrate_heads
 
 def fix_negative_pressures(inp_path, output_path, max_iterations=10):
     print(f"🔹 Loading model: {inp_path}")
     wn = wntr.network.WaterNetworkModel(inp_path)
+    cache = SimulationCache()
+    session = HydraulicSession(wn)   # warm-starts each re-solve (native engine)
 
-    for iteration in range(max_iterations):
-        sim = wntr.sim.EpanetSimulator(wn)
-        results = sim.run_sim()
-        pressures = results.node["pressure"]
-        min_pressure = pressures.min().min()
-        print(f"🔁 Iteration {iteration+1}: Minimum pressure = {min_pressure:.2f} m")
-
-        if min_pressure >= 0:
-            print("✅ All pressures are positive now!")
-            break
-
-        # Slightly increase reservoir heads
-        for reservoir_name, reservoir in wn.reservoirs():
-            old_head = reservoir.head_timeseries.base_value
-            reservoir.head_timeseries.base_value = old_head + abs(min_pressure) * 0.1
-
-        # Slightly increase pump head curve
-        for pump_name, pump in wn.pumps():
-            curve = wn.get_curve(pump.head_curve_name)
-            curve.points = [(x, y * 1.02) for x, y in curve.points]
+    # Root-find the lowest head per source that clears negative pressures in its zone
+    calib = calibrate_heads(wn, target_pressure=0.0, session=session, cache=cache, max_solves=max_iterations)
+    for reservoir_name, head in calib["heads"].items():
+        print(f"🔁 {reservoir_name}: head → {head:.2f} m")
+    print(f"🔁 Minimum pressure = {calib['min_pressure']:.2f} m after {calib['n_solves']} solves")
+    if calib["converged"]:
+        print("✅ All pressures are positive now!")
+
+    results = run_hydraulics_cached(wn, cache, session=session)   # cache hit: the calibrated network
+    pressures = results.node["pressure"]
+
+    print(f"Simulation cache: {cache.stats()}")
 
     # ✅ Universal safe writer (handles all WNTR versions)
     try:
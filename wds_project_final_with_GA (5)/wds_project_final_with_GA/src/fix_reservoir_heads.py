@@ -1,7 +1,19 @@
 import wntr
 import os
+import argparse
+
+from head_calibration import optimize_heads
+
+MIN_PRESSURE_M = 10.0   # pressure floor for --optimize
 
 def main():
+    parser = argparse.ArgumentParser(description="Assign reservoir/borewell heads")
+    parser.add_argument("--optimize", action="store_true",
+                        help="choose per-source heads by LP (least energy meeting --min-pressure)")
+    parser.add_argument("--min-pressure", type=float, default=MIN_PRESSURE_M,
+                        help="pressure floor at every junction for --optimize (m)")
+    args = parser.parse_args()
+
     inp_path = "data/Bangalore_WDS_Realistic_fixed_adjusted_target100m.inp"
     fixed_path = "data/Bangalore_WDS_with_heads.inp"
 
@@ -20,12 +32,18 @@ def main():
         "Borewell2": 795,
     }
 
+    if args.optimize:
+        opt = optimize_heads(wn, args.min_pressure, sources=reservoirs)
+        head_values = opt["heads"]
+        print(f"📐 LP heads for a {args.min_pressure:.1f} m floor: min pressure {opt['min_pressure']:.2f} m, "
+              f"energy {opt['energy_kW']:.1f} kW ({opt['rounds']} rounds, {opt['n_solves']} solves)")
+
     for r_name in reservoirs:
         node = wn.get_node(r_name)
         new_head = head_values.get(r_name, 800)
         try:
             node.base_head = new_head
-            print(f"✅ Set {r_name} base_head = {new_head} m")
+            print(f"✅ Set {r_name} base_head = {new_head:.2f} m")
         except Exception as e:
             print(f"⚠️ Could not set head for {r_name}: {e}")
 
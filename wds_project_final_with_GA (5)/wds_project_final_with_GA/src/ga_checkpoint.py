@@ -0,0 +1,109 @@
+# src/ga_checkpoint.py
+"""
+Checkpointing and stopping rules for long GA runs.
+
+A checkpoint holds everything needed to continue a run exactly where it
+stopped: the next population, the RNG state, the best solution so far, the
+objective history and the evaluation/time counters. Files are written
+atomically (temp file + rename), so a crash mid-write never corrupts the
+last good checkpoint. Fitness values are not stored in the checkpoint
+because the on-disk SimulationCache already persists them across runs.
+"""
+
+import os
+import pickle
+import tempfile
+
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+
+
+def save_checkpoint(path, state):
+    """Atomically pickle `state` (a dict) to `path`."""
+    folder = os.path.dirname(os.path.abspath(path))
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix=".ga_checkpoint_", dir=folder)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(dict(state, version=CHECKPOINT_VERSION), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def load_checkpoint(path, run_key=None):
+    """
+    Load a checkpoint written by save_checkpoint, or return None if there is none.
+
+    If `run_key` is given it must match the key stored with the checkpoint,
+    which stops a run from resuming on a different network or objective.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        state = pickle.load(f)
+    if state.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version in {path}: {state.get('version')}")
+    if run_key is not None and state.get("run_key") != run_key:
+        raise ValueError(f"Checkpoint {path} belongs to a different network or objective; "
+                         "delete it or start without --resume.")
+    return state
+
+
+def rng_state(rng):
+    return rng.bit_generator.state
+
+
+def restore_rng(state):
+    rng = np.random.default_rng()
+    rng.bit_generator.state = state
+    return rng
+
+
+class StoppingRules:
+    """
+    Decide when a GA run should stop before its generation limit.
+
+    stagnation_generations  stop after this many generations without the best
+                            objective improving by more than `stagnation_tol`
+                            (relative)
+    max_seconds             wall-clock budget for the run, resumes included
+    max_evaluations         budget of hydraulic solves (cache hits are free)
+
+    Any rule set to None is disabled.
+    """
+
+    def __init__(self, stagnation_generations=None, stagnation_tol=1e-6,
+                 max_seconds=None, max_evaluations=None):
+        self.stagnation_generations = stagnation_generations
+        self.stagnation_tol = stagnation_tol
+        self.max_seconds = max_seconds
+        self.max_evaluations = max_evaluations
+
+    def generations_without_improvement(self, history):
+        if not history:
+            return 0
+        best = history[0]
+        since = 0
+        for value in history[1:]:
+            if value < best - self.stagnation_tol * max(abs(best), 1.0):
+                best = value
+                since = 0
+            else:
+                since += 1
+        return since
+
+    def check(self, history, elapsed_s, n_evaluations):
+        """Return a human-readable reason to stop, or None to keep going."""
+        if self.max_seconds is not None and elapsed_s >= self.max_seconds:
+            return f"wall-clock budget of {self.max_seconds:.0f} s reached"
+        if self.max_evaluations is not None and n_evaluations >= self.max_evaluations:
+            return f"evaluation budget of {self.max_evaluations} solves reached"
+        if self.stagnation_generations is not None:
+            stale = self.generations_without_improvement(history)
+            if stale >= self.stagnation_generations:
+                return f"no improvement in the last {stale} generations"
+        return None
@@ -0,0 +1,113 @@
+# src/ga_engine.py
+"""
+Vectorized GA operators over a population matrix.
+
+The population is a 2-D integer array of shape (pop_size, n_genes), each
+gene an index into an option table (e.g. pipe diameters). Selection,
+crossover and mutation work on the whole generation at once with NumPy, so
+a generation costs a handful of array operations regardless of population
+size or genome length. All randomness comes from an explicit
+np.random.Generator, which keeps runs reproducible and checkpointable.
+"""
+
+import numpy as np
+
+
+def init_population(rng, pop_size, n_genes, n_options):
+    """Uniform random population of option indices."""
+    return rng.integers(0, n_options, size=(pop_size, n_genes), dtype=gene_dtype(n_options))
+
+
+def gene_dtype(n_options):
+    """Smallest signed integer type that holds every option index (keeps big populations compact)."""
+    return np.int8 if n_options <= 127 else np.int16 if n_options <= 32767 else np.int32
+
+
+# ──────────────────────────────────────────────────────────────
+# Selection
+# ──────────────────────────────────────────────────────────────
+def elite_indices(fitness, n_elite):
+    """Indices of the n_elite lowest-fitness individuals, best first."""
+    fitness = np.asarray(fitness)
+    n_elite = min(n_elite, len(fitness))
+    if n_elite <= 0:
+        return np.empty(0, dtype=int)
+    idx = np.argpartition(fitness, n_elite - 1)[:n_elite]
+    return idx[np.argsort(fitness[idx])]
+
+
+def tournament_select(rng, fitness, n_select, tournament_size=3):
+    """Indices of n_select tournament winners (minimisation)."""
+    fitness = np.asarray(fitness)
+    contenders = rng.integers(0, len(fitness), size=(n_select, tournament_size))
+    winners = np.argmin(fitness[contenders], axis=1)
+    return contenders[np.arange(n_select), winners]
+
+
+# ──────────────────────────────────────────────────────────────
+# Crossover
+# ──────────────────────────────────────────────────────────────
+def uniform_crossover(rng, parents_a, parents_b):
+    """Each gene comes from either parent with equal probability."""
+    mask = rng.random(parents_a.shape, dtype=np.float32) < 0.5
+    return np.where(mask, parents_a, parents_b), np.where(mask, parents_b, parents_a)
+
+
+def k_point_crossover(rng, parents_a, parents_b, k=2):
+    """Swap alternating segments between k random cut points per pair."""
+    n_pairs, n_genes = parents_a.shape
+    if n_genes < 2:
+        return parents_a.copy(), parents_b.copy()
+    cuts = rng.integers(1, n_genes, size=(n_pairs, k))
+
+    # Mark every cut, then a running parity says which parent each gene comes from
+    toggles = np.zeros((n_pairs, n_genes), dtype=np.int8)
+    np.add.at(toggles, (np.repeat(np.arange(n_pairs), k), cuts.ravel()), 1)
+    mask = (np.cumsum(toggles, axis=1) % 2).astype(bool)
+    return np.where(mask, parents_b, parents_a), np.where(mask, parents_a, parents_b)
+
+
+def crossover(rng, parents_a, parents_b, method="uniform", k=2, rate=0.9):
+    """Recombine parent pairs row by row; pairs not selected by `rate` pass through unchanged."""
+    if method == "uniform":
+        child_a, child_b = uniform_crossover(rng, parents_a, parents_b)
+    elif method == "k_point":
+        child_a, child_b = k_point_crossover(rng, parents_a, parents_b, k)
+    else:
+        raise ValueError(f"Unknown crossover method: {method}")
+
+    keep = (rng.random(len(parents_a)) >= rate)[:, None]
+    return np.where(keep, parents_a, child_a), np.where(keep, parents_b, child_b)
+
+
+# ──────────────────────────────────────────────────────────────
+# Mutation
+# ──────────────────────────────────────────────────────────────
+def mutate(rng, population, rate, n_options, step=2):
+    """Creep mutation: each gene moves by up to ±step options with probability `rate`."""
+    population = population.copy()
+    genes = population.reshape(-1)
+    hit = np.flatnonzero(rng.random(genes.size, dtype=np.float32) < rate)
+    moved = genes[hit] + rng.integers(-step, step + 1, size=len(hit), dtype=np.int32)
+    genes[hit] = np.clip(moved, 0, n_options - 1)
+    return population
+
+
+# ──────────────────────────────────────────────────────────────
+# Generation step
+# ──────────────────────────────────────────────────────────────
+def next_generation(rng, population, fitness, n_options, n_elite=2, tournament_size=3,
+                    crossover_method="uniform", k_points=2, crossover_rate=0.9,
+                    mutation_rate=0.2, mutation_step=2):
+    """Build the next population: elites copied as-is, the rest bred from tournament winners."""
+    pop_size = len(population)
+    elites = population[elite_indices(fitness, n_elite)]
+
+    n_children = pop_size - len(elites)
+    n_pairs = (n_children + 1) // 2
+    parents = tournament_select(rng, fitness, 2 * n_pairs, tournament_size)
+    child_a, child_b = crossover(rng, population[parents[:n_pairs]], population[parents[n_pairs:]],
+                                 method=crossover_method, k=k_points, rate=crossover_rate)
+    children = np.concatenate([child_a, child_b])[:n_children]
+    children = mutate(rng, children, mutation_rate, n_options, mutation_step)
+    return np.concatenate([elites, children])
@@ -0,0 +1,209 @@
+# src/ga_islands.py
+"""
+Island-model GA: one sub-population per process, with periodic migration.
+
+Every island evolves its own population with the ga_engine operators and
+scores it with its own copy of the network. Every `migration_interval`
+generations each island sends copies of its best `n_migrants` individuals
+to its neighbours, which replace their worst individuals with them.
+Neighbours come from the topology:
+
+    ring    island i -> island i+1 (wrapping around)
+    full    every island -> every other island
+    random  a fresh random ring for each migration, shared by all islands
+
+Messages carry the migration number, so an island that runs ahead never
+mixes migrants from two different migrations.
+
+Early stopping (ga_checkpoint.StoppingRules) is judged on the whole run:
+the islands share their evaluation count and best objective, and the
+first island whose check fires stops them all, including any island
+waiting for migrants.
+"""
+
+import multiprocessing as mp
+import queue
+import time
+
+import numpy as np
+
+import ga_engine
+from hydraulic_fitness import PopulationEvaluator
+from sim_cache import SimulationCache
+
+TOPOLOGIES = ("ring", "full", "random")
+MIGRATION_TIMEOUT_S = 3600
+
+
+def migration_targets(topology, island, n_islands, epoch, seed=0):
+    """Islands that `island` sends its migrants to in migration number `epoch`."""
+    if n_islands < 2:
+        return []
+    if topology == "ring":
+        return [(island + 1) % n_islands]
+    if topology == "full":
+        return [i for i in range(n_islands) if i != island]
+    if topology == "random":
+        order = np.random.default_rng([seed, epoch]).permutation(n_islands)
+        pos = int(np.flatnonzero(order == island)[0])
+        return [int(order[(pos + 1) % n_islands])]
+    raise ValueError(f"Unknown migration topology: {topology} (choose from {TOPOLOGIES})")
+
+
+def migration_sources(topology, island, n_islands, epoch, seed=0):
+    """Islands that send migrants to `island` in migration number `epoch`."""
+    return [i for i in range(n_islands)
+            if island in migration_targets(topology, i, n_islands, epoch, seed)]
+
+
+def _receive(inbox, epoch, expected, pending, stop=None):
+    """
+    Collect `expected` messages for `epoch`, parking messages from later
+    migrations. Gives up with what it has once `stop` is set.
+    """
+    received = pending.pop(epoch, [])
+    deadline = time.monotonic() + MIGRATION_TIMEOUT_S
+    while len(received) < expected:
+        try:
+            msg_epoch, genomes, fitness = inbox.get(timeout=1.0)
+        except queue.Empty:
+            if stop is not None and stop.is_set():
+                break
+            if time.monotonic() > deadline:
+                raise
+            continue
+        if msg_epoch == epoch:
+            received.append((genomes, fitness))
+        else:
+            pending.setdefault(msg_epoch, []).append((genomes, fitness))
+    return received
+
+
+def _island_main(island, cfg, inboxes, results, shared):
+    rng = np.random.default_rng(cfg["seed_seq"])
+    n_islands = len(inboxes)
+    cache = SimulationCache() if cfg["use_cache"] else None
+    stopping = cfg["stopping"]
+    stop, n_evals, global_best = shared["stop"], shared["n_evaluations"], shared["best_obj"]
+    pending = {}
+    best = (np.inf, None, None)
+    history = []
+    global_history = []
+    solved = 0
+
+    with PopulationEvaluator(cfg["inp_file"], n_workers=1, cache=cache) as evaluator:
+        population = ga_engine.init_population(rng, cfg["pop_size"], cfg["n_genes"], cfg["n_options"])
+        for gen in range(cfg["generations"]):
+            if stop.is_set() and history:
+                break
+            evaluated = evaluator.evaluate(population)
+            fitness = np.array([obj for obj, _ in evaluated])
+
+            i = int(np.argmin(fitness))
+            if fitness[i] < best[0]:
+                best = (float(fitness[i]), population[i].copy(), evaluated[i][1])
+            history.append(best[0])
+            print(f"[island {island}] Generation {gen+1}/{cfg['generations']}: Best obj = {best[0]:.2f}")
+
+            # Early stopping on the run as a whole: total solves, overall best, shared clock
+            with n_evals.get_lock():
+                n_evals.value += evaluator.n_solved - solved
+                total_evals = n_evals.value
+            solved = evaluator.n_solved
+            with global_best.get_lock():
+                global_best.value = min(global_best.value, best[0])
+                global_history.append(global_best.value)
+            if stopping is not None and not stop.is_set():
+                reason = stopping.check(global_history, time.time() - cfg["started"], total_evals)
+                if reason:
+                    print(f"⏹️  [island {island}] Stopping all islands after generation {gen+1}: {reason}")
+                    stop.set()
+            if stop.is_set():
+                break
+
+            # Migration: send elites, then swap incoming migrants in for the worst individuals
+            epoch = (gen + 1) // cfg["migration_interval"]
+            if (gen + 1) % cfg["migration_interval"] == 0 and gen + 1 < cfg["generations"]:
+                elite = ga_engine.elite_indices(fitness, cfg["n_migrants"])
+                for target in migration_targets(cfg["topology"], island, n_islands, epoch, cfg["seed"]):
+                    inboxes[target].put((epoch, population[elite], fitness[elite]))
+
+                n_sources = len(migration_sources(cfg["topology"], island, n_islands, epoch, cfg["seed"]))
+                incoming = _receive(inboxes[island], epoch, n_sources, pending, stop)
+                if incoming:
+                    genomes = np.concatenate([g for g, _ in incoming])
+                    scores = np.concatenate([f for _, f in incoming])
+                    worst = np.argsort(fitness)[::-1][:len(genomes)]
+                    population[worst] = genomes[:len(worst)]
+                    fitness[worst] = scores[:len(worst)]
+
+            population = ga_engine.next_generation(rng, population, fitness, cfg["n_options"],
+                                                   **cfg["breed_kwargs"])
+
+    if cache is not None:
+        cache.close()
+    results.put((island, best[1], best[0], best[2], history))
+
+
+def run_islands(inp_file, n_islands, pop_size, generations, n_genes, n_options, breed_kwargs,
+                migration_interval=5, n_migrants=2, topology="ring", seed=None, use_cache=True,
+                stopping=None):
+    """
+    Run `n_islands` GA islands in parallel processes, until `generations`
+    or until `stopping` (a StoppingRules) fires for the run as a whole.
+
+    Returns (best_candidate, best_obj, best_diag, best_history), where
+    best_history is the best objective over all islands per generation.
+    """
+    if topology not in TOPOLOGIES:
+        raise ValueError(f"Unknown migration topology: {topology} (choose from {TOPOLOGIES})")
+
+    root = np.random.SeedSequence(seed)
+    ctx = mp.get_context()
+    inboxes = [ctx.Queue() for _ in range(n_islands)]
+    results = ctx.Queue()
+    base_cfg = {
+        "inp_file": inp_file,
+        "pop_size": pop_size,
+        "generations": generations,
+        "n_genes": n_genes,
+        "n_options": n_options,
+        "breed_kwargs": breed_kwargs,
+        "migration_interval": max(1, int(migration_interval)),
+        "n_migrants": n_migrants,
+        "topology": topology,
+        "seed": int(root.generate_state(1)[0]),
+        "use_cache": use_cache,
+        "stopping": stopping,
+        "started": time.time(),
+    }
+    shared = {"stop": ctx.Event(), "n_evaluations": ctx.Value("q", 0), "best_obj": ctx.Value("d", np.inf)}
+
+    procs = []
+    for island, seed_seq in enumerate(root.spawn(n_islands)):
+        cfg = dict(base_cfg, seed_seq=seed_seq)
+        p = ctx.Process(target=_island_main, args=(island, cfg, inboxes, results, shared), daemon=True)
+        p.start()
+        procs.append(p)
+
+    # Collect results, failing fast if an island dies instead of waiting forever
+    collected = []
+    try:
+        while len(collected) < n_islands:
+            try:
+                collected.append(results.get(timeout=1.0))
+            except queue.Empty:
+                dead = [i for i, p in enumerate(procs) if p.exitcode not in (None, 0)]
+                if dead:
+                    raise RuntimeError(f"GA island(s) {dead} exited with an error")
+    finally:
+        for p in procs:
+            if p.is_alive() and len(collected) < n_islands:
+                p.terminate()
+            p.join()
+
+    _, best_candidate, best_obj, best_diag, _ = min(collected, key=lambda r: r[2])
+    # Islands stopped early may be a generation apart; hold each one's last value
+    length = max(len(r[4]) for r in collected)
+    best_history = np.min([r[4] + r[4][-1:] * (length - len(r[4])) for r in collected], axis=0).tolist()
+    return best_candidate, best_obj, best_diag, best_history
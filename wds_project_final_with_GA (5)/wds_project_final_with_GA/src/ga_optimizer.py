@@ -1,91 +1,270 @@
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import random
+import argparse
 import os
+import time
+
+import ga_engine
+import nsga2
+from candidate_store import CandidateStore, new_run_id
+from ga_checkpoint import StoppingRules, load_checkpoint, restore_rng, rng_state, save_checkpoint
+from ga_islands import run_islands
+from hydraulic_fitness import (
+    DIAMETER_OPTIONS_MM, INP_FILE, N_WORKERS, PopulationEvaluator, decode, evaluate_genome, fitness_key,
+    load_network, n_genes, pipe_capex, surrogate_features,
+)
+from sim_cache import SimulationCache
+from sim_runner import ENGINES
+from surrogate import RidgeSurrogate, accuracy, screen, targets_from_result
 
 # === PARAMETERS ===
 POP_SIZE = 8
 GENERATIONS = 20  # Increased from 5 to 20 for better optimization
 MUTATION_RATE = 0.2
+MUTATION_STEP = 2           # creep mutation moves a gene by up to ±2 diameter options
+ELITE_SIZE = 2              # best individuals copied unchanged into the next generation
+TOURNAMENT_SIZE = 3
+CROSSOVER_METHOD = "uniform"  # or "k_point"
+K_POINTS = 2
+CROSSOVER_RATE = 0.9
+
+# Island model (N_ISLANDS > 1 runs one POP_SIZE sub-population per process)
+N_ISLANDS = 1
+MIGRATION_INTERVAL = 5      # generations between migrations
+N_MIGRANTS = 2              # elites each island sends per migration
+MIGRATION_TOPOLOGY = "ring"  # "ring", "full" or "random"
+
+# Surrogate pre-screening: once trained, only the most promising fraction of
+# each generation (plus the elites) goes to the hydraulic simulator
+USE_SURROGATE = False
+SURROGATE_FRACTION = 0.25
+SURROGATE_ALPHA = 10.0
+SURROGATE_MIN_SAMPLES = 32    # simulated candidates needed before screening starts
+
+# NSGA-II multi-objective mode: minimise all of these diagnostics together
+NSGA2_POP_SIZE = 64
+NSGA2_OBJECTIVES = ("total_capex", "unserved_m3_day", "leakage_LPS")
+
+# Early stopping (None disables a rule)
+STAGNATION_GENERATIONS = 10   # stop after this many generations without improvement
+STAGNATION_TOL = 1e-6         # relative improvement that still counts
+MAX_SECONDS = None            # wall-clock budget, resumes included
+MAX_EVALUATIONS = None        # budget of hydraulic solves
+
+N_OPTIONS = len(DIAMETER_OPTIONS_MM)
 
 REPORT_PATH = "reports/optimized_summary.csv"
+PLOT_PATH = "reports/ga_progress.png"
+PARETO_PATH = "reports/pareto_front.csv"
+CHECKPOINT_PATH = "reports/ga_checkpoint.pkl"
+CHECKPOINT_EVERY = 1          # generations between checkpoints
+STORE_CANDIDATES = True       # record every simulated candidate as a delta in candidate_store.STORE_PATH
 
-# === OBJECTIVE FUNCTION (EXAMPLE) ===
+# === OBJECTIVE FUNCTION ===
 def evaluate_candidate(candidate):
-    """Simulate objective value for a candidate solution."""
-    # These are placeholders; replace with real hydraulic simulation later
-    total_delivered_LPS = 355959.22  # constant for demo
-    total_demand_LPS = 355959.20
-    unserved_m3_day = 0.0
-    total_capex = sum(candidate) * 1e6
-
-    obj_value = total_capex  # minimize total cost
-    return obj_value, {
-        "total_delivered_LPS": total_delivered_LPS,
-        "total_demand_LPS": total_demand_LPS,
-        "unserved_m3_day": unserved_m3_day,
-        "total_capex": total_capex,
-    }
+    """Run a hydraulic solve for one candidate and return (objective, diagnostics).
+
+    Each gene is an index into DIAMETER_OPTIONS_MM for one pipe; the objective
+    is pipe capex plus pressure and shortage penalties (see hydraulic_fitness).
+    """
+    return evaluate_genome(candidate)
 
 # === INITIAL POPULATION ===
-def init_population():
-    return [np.random.randint(100, 200, 10) for _ in range(POP_SIZE)]
-
-# === SELECTION ===
-def select_parents(population, fitnesses):
-    # Convert numpy arrays to lists for safe sorting
-    pop_as_lists = [p.tolist() if isinstance(p, np.ndarray) else p for p in population]
-    sorted_pairs = sorted(zip(fitnesses, pop_as_lists), key=lambda x: x[0])
-    sorted_pop = [x[1] for x in sorted_pairs]
-    return sorted_pop[:2]  # select top 2
-
-
-# === CROSSOVER ===
-def crossover(parent1, parent2):
-    point = random.randint(1, len(parent1) - 1)
-    child1 = np.concatenate((parent1[:point], parent2[point:]))
-    child2 = np.concatenate((parent2[:point], parent1[point:]))
-    return child1, child2
-
-# === MUTATION ===
-def mutate(candidate):
-    for i in range(len(candidate)):
-        if random.random() < MUTATION_RATE:
-            candidate[i] += random.randint(-10, 10)
-    return candidate
+def init_population(rng, genome_length, pop_size=None):
+    """Population matrix of shape (pop_size, genome_length); pop_size defaults to POP_SIZE."""
+    return ga_engine.init_population(rng, pop_size or POP_SIZE, genome_length, N_OPTIONS)
+
+# === SELECTION, CROSSOVER, MUTATION ===
+def breed_settings():
+    """Operator settings passed to ga_engine.next_generation."""
+    return {
+        "n_elite": ELITE_SIZE,
+        "tournament_size": TOURNAMENT_SIZE,
+        "crossover_method": CROSSOVER_METHOD,
+        "k_points": K_POINTS,
+        "crossover_rate": CROSSOVER_RATE,
+        "mutation_rate": MUTATION_RATE,
+        "mutation_step": MUTATION_STEP,
+    }
+
+def breed(rng, population, fitnesses):
+    """Produce the next population matrix from the current one (see ga_engine)."""
+    return ga_engine.next_generation(rng, population, fitnesses, N_OPTIONS, **breed_settings())
+
+# === EVALUATION ===
+def evaluate_generation(evaluator, population, surrogate=None, lengths=None):
+    """Score a population matrix.
+
+    Without a trained surrogate every row is simulated. With one, rows are
+    ranked by predicted objective (exact capex + predicted hydraulic penalty)
+    and only the best SURROGATE_FRACTION plus the elites are simulated; the
+    others keep their prediction and have no diagnostics.
+
+    Returns (fitnesses, diagnostics_list, simulated_idx, accuracy), where
+    accuracy compares prediction and truth on the simulated rows (or None).
+    """
+    n = len(population)
+    predicted = None
+    simulated_idx = np.arange(n)
+    if surrogate is not None and surrogate.ready:
+        penalty = surrogate.predict(surrogate_features(population, lengths))[:, 0]
+        predicted = pipe_capex(population, lengths) + penalty
+        simulated_idx = screen(predicted, SURROGATE_FRACTION, always=range(min(ELITE_SIZE, n)))
+
+    evaluated = evaluator.evaluate(population[simulated_idx])
+    fitnesses = predicted.copy() if predicted is not None else np.empty(n)
+    diagnostics_list = [None] * n
+    for i, (obj, diag) in zip(simulated_idx, evaluated):
+        fitnesses[i] = obj
+        diagnostics_list[i] = diag
+
+    acc = accuracy(predicted[simulated_idx], fitnesses[simulated_idx]) if predicted is not None else None
+    if surrogate is not None:
+        surrogate.add(surrogate_features(population[simulated_idx], lengths),
+                      [targets_from_result(obj, diag) for obj, diag in evaluated])
+    return fitnesses, diagnostics_list, simulated_idx, acc
+
+def store_generation(store, run_id, base, generation, population, fitnesses, diagnostics_list, idx):
+    """Record the simulated rows of a generation as diameter deltas against the base INP."""
+    diameters = decode(population[idx])
+    store.add_many([(run_id, generation, fitnesses[i], base, store.make_delta(base, diameters=d), diagnostics_list[i])
+                    for i, d in zip(idx, diameters)])
 
 # === MAIN GA LOOP ===
-def run_ga():
-    population = init_population()
-    best_history = []
-
-    for gen in range(GENERATIONS):
-        fitnesses = []
-        diagnostics_list = []
-
-        # Evaluate all candidates
-        for candidate in population:
-            obj, diag = evaluate_candidate(candidate)
-            fitnesses.append(obj)
-            diagnostics_list.append(diag)
-            print(f"Evaluated candidate: obj={obj:.2f}, delivered_LPS={diag['total_delivered_LPS']:.2f}")
-
-        # Select best
-        best_idx = np.argmin(fitnesses)
-        best_obj = fitnesses[best_idx]
-        best_diag = diagnostics_list[best_idx]
-        best_history.append(best_obj)
-
-        print(f"Generation {gen+1}/{GENERATIONS}: Best obj = {best_obj:.2f} delivered LPS = {best_diag['total_delivered_LPS']:.2f}")
-
-        # Selection, crossover, mutation
-        parents = select_parents(population, fitnesses)
-        new_population = []
-        while len(new_population) < POP_SIZE:
-            child1, child2 = crossover(*parents)
-            new_population.extend([mutate(child1), mutate(child2)])
-        population = new_population[:POP_SIZE]
+def default_stopping_rules():
+    return StoppingRules(STAGNATION_GENERATIONS, STAGNATION_TOL, MAX_SECONDS, MAX_EVALUATIONS)
+
+def evolve(inp_file, n_workers, cache, seed, resume=False, stopping=None,
+           checkpoint_path=CHECKPOINT_PATH, use_surrogate=USE_SURROGATE, store=None):
+    """Single-population GA; returns (best_candidate, best_obj, best_diag, best_history).
+
+    Saves a checkpoint every CHECKPOINT_EVERY generations and, with resume=True,
+    continues from the checkpoint at checkpoint_path if there is one. With
+    use_surrogate=True candidates are pre-screened (see evaluate_generation).
+    With a CandidateStore, every simulated candidate is recorded under one
+    run id (kept across resumes).
+    """
+    stopping = stopping or default_stopping_rules()
+    run_key = (fitness_key(inp_file), POP_SIZE, breed_settings())
+    state = load_checkpoint(checkpoint_path, run_key) if resume else None
+
+    if state:
+        rng = restore_rng(state["rng_state"])
+        population = state["population"]
+        start_gen = state["generation"]
+        best_candidate, best_obj, best_diag = state["best_candidate"], state["best_obj"], state["best_diag"]
+        best_history = state["best_history"]
+        n_evals_before, elapsed_before = state["n_evaluations"], state["elapsed_s"]
+        surrogate = state.get("surrogate")
+        run_id = state.get("run_id") or new_run_id()
+        print(f"♻️  Resuming from {checkpoint_path} at generation {start_gen + 1} (best obj = {best_obj:.2f})")
+    else:
+        rng = np.random.default_rng(seed)
+        population = init_population(rng, n_genes(inp_file))
+        start_gen = 0
+        best_candidate, best_obj, best_diag = None, np.inf, None
+        best_history = []
+        n_evals_before, elapsed_before = 0, 0.0
+        surrogate = None
+        run_id = new_run_id()
+
+    if not use_surrogate:
+        surrogate = None      # a checkpoint's surrogate is only used when this run asks for screening
+    elif surrogate is None:
+        surrogate = RidgeSurrogate(alpha=SURROGATE_ALPHA, min_samples=SURROGATE_MIN_SAMPLES)
+    lengths = load_network(inp_file)[2] if use_surrogate else None
+    n_candidates = 0
+    surrogate_scores = []
+    base = store.add_base(inp_file) if store is not None else None
+
+    started = time.monotonic()
+
+    # One worker pool for the whole run; each generation is evaluated in parallel
+    with PopulationEvaluator(inp_file, n_workers=n_workers, cache=cache) as evaluator:
+        for gen in range(start_gen, GENERATIONS):
+            fitnesses, diagnostics_list, simulated_idx, acc = evaluate_generation(
+                evaluator, population, surrogate, lengths)
+            n_candidates += len(population)
+            for i in simulated_idx:
+                print(f"Evaluated candidate: obj={fitnesses[i]:.2f}, "
+                      f"delivered_LPS={diagnostics_list[i]['total_delivered_LPS']:.2f}")
+            if acc is not None:
+                surrogate_scores.append(acc)
+                print(f"🤖 Surrogate screened {len(population)} -> {len(simulated_idx)} candidates "
+                      f"(rank corr {acc['rank_corr']:.2f}, R² {acc['r2']:.2f})")
+
+            if store is not None:
+                store_generation(store, run_id, base, gen + 1, population, fitnesses, diagnostics_list,
+                                 simulated_idx)
+
+            # Select best (only simulated candidates count)
+            best_idx = simulated_idx[np.argmin(fitnesses[simulated_idx])]
+            if fitnesses[best_idx] < best_obj:
+                best_obj = float(fitnesses[best_idx])
+                best_diag = diagnostics_list[best_idx]
+                best_candidate = population[best_idx].copy()
+            best_history.append(best_obj)
+
+            print(f"Generation {gen+1}/{GENERATIONS}: Best obj = {best_obj:.2f} delivered LPS = {best_diag['total_delivered_LPS']:.2f}")
+
+            # Selection, crossover, mutation over the whole population matrix
+            population = breed(rng, population, fitnesses)
+
+            elapsed = elapsed_before + time.monotonic() - started
+            n_evals = n_evals_before + evaluator.n_solved
+            reason = stopping.check(best_history, elapsed, n_evals)
+            if reason or (gen + 1) % CHECKPOINT_EVERY == 0 or gen + 1 == GENERATIONS:
+                save_checkpoint(checkpoint_path, {
+                    "run_key": run_key,
+                    "generation": gen + 1,
+                    "population": population,
+                    "rng_state": rng_state(rng),
+                    "best_candidate": best_candidate,
+                    "best_obj": best_obj,
+                    "best_diag": best_diag,
+                    "best_history": best_history,
+                    "n_evaluations": n_evals,
+                    "elapsed_s": elapsed,
+                    "surrogate": surrogate,
+                    "run_id": run_id,
+                })
+            if reason:
+                print(f"⏹️  Stopping early after generation {gen+1}: {reason}")
+                break
+
+    if store is not None:
+        print(f"🗃️  Candidates of run {run_id} stored as deltas in {store.path}")
+    if surrogate_scores:
+        print(f"🤖 Surrogate: {evaluator.n_solved} simulator calls for {n_candidates} candidates; "
+              f"mean rank corr {np.nanmean([a['rank_corr'] for a in surrogate_scores]):.2f}, "
+              f"mean R² {np.nanmean([a['r2'] for a in surrogate_scores]):.2f}")
+
+    return best_candidate, best_obj, best_diag, best_history
+
+def run_ga(inp_file=INP_FILE, n_workers=N_WORKERS, use_cache=True, seed=None, n_islands=N_ISLANDS,
+           resume=False, stopping=None, show_plot=True, use_surrogate=USE_SURROGATE,
+           store_candidates=STORE_CANDIDATES):
+    cache = None  # islands keep their own caches
+    store = None
+
+    if n_islands > 1:
+        stopping = stopping or default_stopping_rules()
+        if resume or use_surrogate:
+            raise ValueError("Resume and surrogate screening are only supported for single-population runs (n_islands=1).")
+        print(f"🏝️  Island model: {n_islands} islands x {POP_SIZE} individuals, "
+              f"{MIGRATION_TOPOLOGY} migration every {MIGRATION_INTERVAL} generations")
+        best_candidate, best_obj, best_diag, best_history = run_islands(
+            inp_file, n_islands, POP_SIZE, GENERATIONS, n_genes(inp_file), N_OPTIONS, breed_settings(),
+            migration_interval=MIGRATION_INTERVAL, n_migrants=N_MIGRANTS,
+            topology=MIGRATION_TOPOLOGY, seed=seed, use_cache=use_cache, stopping=stopping,
+        )
+    else:
+        cache = SimulationCache() if use_cache else None
+        store = CandidateStore() if store_candidates else None
+        best_candidate, best_obj, best_diag, best_history = evolve(
+            inp_file, n_workers, cache, seed, resume=resume, stopping=stopping, use_surrogate=use_surrogate,
+            store=store)
 
     # Save best result
     df = pd.DataFrame([{
@@ -97,16 +276,125 @@ def run_ga():
     print(f"✅ Optimization complete. Results saved to: {REPORT_PATH}")
     print(f"Best objective: {best_obj}")
     print(f"Best diagnostics: {best_diag}")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Fitness cache: {stats['memory_hits'] + stats['disk_hits']} hits, "
+              f"{stats['misses']} misses ({stats['hit_rate']:.0%} hit rate)")
+        cache.close()
+    if store is not None:
+        store.close()
 
     # === Plot improvement ===
     plt.figure(figsize=(8, 5))
-    plt.plot(range(1, GENERATIONS+1), best_history, marker='o', color='blue')
+    plt.plot(range(1, len(best_history)+1), best_history, marker='o', color='blue')
     plt.title("GA Optimization Progress")
     plt.xlabel("Generation")
     plt.ylabel("Best Objective (Cost)")
     plt.grid(True)
     plt.tight_layout()
-    plt.show()
+    plt.savefig(PLOT_PATH)
+    print(f"📈 Progress plot saved to: {PLOT_PATH}")
+    if show_plot:
+        plt.show()
+    plt.close()
+
+    return best_candidate, best_obj, best_diag
+
+# === MULTI-OBJECTIVE (NSGA-II) ===
+def objective_matrix(diagnostics_list):
+    """(n, len(NSGA2_OBJECTIVES)) array of objectives to minimise."""
+    return np.array([[diag[k] for k in NSGA2_OBJECTIVES] for diag in diagnostics_list], dtype=float)
+
+def run_nsga2(inp_file=INP_FILE, n_workers=N_WORKERS, use_cache=True, seed=None,
+              pop_size=None, generations=None, store_candidates=STORE_CANDIDATES):
+    """Evolve a Pareto front over NSGA2_OBJECTIVES and write it to PARETO_PATH.
+
+    Returns the front as a DataFrame (one row per non-dominated design). The
+    front is also recorded in the candidate store (no scalar fitness).
+    """
+    pop_size = pop_size or NSGA2_POP_SIZE
+    generations = generations or GENERATIONS
+    variation = {k: v for k, v in breed_settings().items() if k not in ("n_elite", "tournament_size")}
+    rng = np.random.default_rng(seed)
+    cache = SimulationCache() if use_cache else None
+
+    with PopulationEvaluator(inp_file, n_workers=n_workers, cache=cache) as evaluator:
+        population = init_population(rng, n_genes(inp_file), pop_size)
+        diagnostics_list = [diag for _, diag in evaluator.evaluate(population)]
+        F = objective_matrix(diagnostics_list)
+        keep, rank, distance = nsga2.survivors(F, pop_size)
+        population, F = population[keep], F[keep]
+        diagnostics_list = [diagnostics_list[i] for i in keep]
+
+        for gen in range(generations):
+            children = nsga2.make_offspring(rng, population, rank, distance, N_OPTIONS, **variation)
+            child_diags = [diag for _, diag in evaluator.evaluate(children)]
+
+            # Parents and children compete together for the next population
+            union = np.concatenate([population, children])
+            union_diags = diagnostics_list + child_diags
+            keep, rank, distance = nsga2.survivors(np.vstack([F, objective_matrix(child_diags)]), pop_size)
+            population = union[keep]
+            F = objective_matrix([union_diags[i] for i in keep])
+            diagnostics_list = [union_diags[i] for i in keep]
+
+            front = rank == 0
+            print(f"Generation {gen+1}/{generations}: Pareto front = {front.sum()} designs, "
+                  f"capex {F[front, 0].min():.3g}-{F[front, 0].max():.3g} Rs")
+
+    front = np.flatnonzero(rank == 0)
+    pareto = pd.DataFrame([diagnostics_list[i] for i in front])
+    pareto["Diameters_mm"] = [" ".join(str(int(d * 1000)) for d in decode(population[i])) for i in front]
+    pareto = pareto.drop_duplicates("Diameters_mm").sort_values(NSGA2_OBJECTIVES[0]).reset_index(drop=True)
+
+    os.makedirs("reports", exist_ok=True)
+    pareto.to_csv(PARETO_PATH, index=False)
+    print(f"✅ Pareto front with {len(pareto)} designs saved to: {PARETO_PATH}")
+    if store_candidates:
+        store = CandidateStore()
+        run_id = new_run_id("nsga2")
+        store_generation(store, run_id, store.add_base(inp_file), generations, population,
+                         [None] * len(population), diagnostics_list, front)
+        print(f"🗃️  Pareto designs of run {run_id} stored as deltas in {store.path}")
+        store.close()
+    if cache is not None:
+        cache.close()
+    return pareto
 
 if __name__ == "__main__":
-    run_ga()
+    parser = argparse.ArgumentParser(description="GA pipe-sizing optimisation for the Bangalore WDS.")
+    parser.add_argument("--inp", default=INP_FILE, help="network INP file")
+    parser.add_argument("--workers", type=int, default=N_WORKERS, help="worker processes for evaluation")
+    parser.add_argument("--islands", type=int, default=N_ISLANDS, help="number of GA islands (1 = single population)")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--resume", action="store_true", help=f"continue from {CHECKPOINT_PATH}")
+    parser.add_argument("--max-seconds", type=float, default=MAX_SECONDS, help="wall-clock budget")
+    parser.add_argument("--max-evals", type=int, default=MAX_EVALUATIONS, help="budget of hydraulic solves")
+    parser.add_argument("--patience", type=int, default=STAGNATION_GENERATIONS,
+                        help="generations without improvement before stopping")
+    parser.add_argument("--no-cache", action="store_true", help="disable the fitness cache")
+    parser.add_argument("--no-store", action="store_true", help="do not record candidates in the candidate store")
+    parser.add_argument("--multi-objective", action="store_true",
+                        help=f"run NSGA-II over {', '.join(NSGA2_OBJECTIVES)} and write {PARETO_PATH}")
+    parser.add_argument("--surrogate", action="store_true", default=USE_SURROGATE,
+                        help="pre-screen candidates with an online ridge surrogate")
+    parser.add_argument("--no-show", action="store_true", help="save the progress plot without opening a window")
+    parser.add_argument("--engine", choices=ENGINES, default=None,
+                        help="hydraulic engine (default: $WDS_ENGINE or epanet)")
+    parser.add_argument("--pdd", action="store_true",
+                        help="score with pressure-driven solves (simulated shortage) instead of estimated shortage")
+    args = parser.parse_args()
+    if args.engine:
+        os.environ["WDS_ENGINE"] = args.engine   # inherited by worker and island processes
+    if args.pdd:
+        os.environ["WDS_DEMAND_MODEL"] = "PDD"
+
+    if args.multi_objective:
+        run_nsga2(args.inp, n_workers=args.workers, use_cache=not args.no_cache, seed=args.seed,
+                  store_candidates=not args.no_store)
+        raise SystemExit(0)
+
+    run_ga(args.inp, n_workers=args.workers, use_cache=not args.no_cache, seed=args.seed,
+           n_islands=args.islands, resume=args.resume,
+           stopping=StoppingRules(args.patience, STAGNATION_TOL, args.max_seconds, args.max_evals),
+           show_plot=not args.no_show, use_surrogate=args.surrogate, store_candidates=not args.no_store)
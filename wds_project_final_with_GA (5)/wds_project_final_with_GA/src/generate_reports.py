@@ -5,13 +5,26 @@ Robust report generator for the Bangalore WDS project.
 ✔ Normalizes units (m³/s <-> LPS)
 ✔ Clips negative and unrealistic pressures (realistic floor)
 ✔ Merges ward demand CSV with simulation outputs
-✔ Produces final checked report and summary CSV
+✔ Produces final checked report and summary CSV (plus Parquet when pyarrow is installed)
+✔ Reports many scenarios at once: stack them in one results frame with a "Scenario" column
+
+Every step is a whole-column operation, so the cost barely depends on how
+many scenarios are stacked (10k scenarios x 198 wards takes seconds). The
+explanation text comes from a threshold table (EXPLANATION_RULES, or a CSV
+given with --rules) and is stored as a categorical column: CSV gets the
+text, Parquet the category codes plus one copy of each text.
+
+    python src/generate_reports.py                                  # data/ward_results.csv
+    python src/generate_reports.py --results runs/*.csv             # one scenario per file
+    python src/generate_reports.py --results batch.parquet --rules data/explanation_rules.csv
 """
 
-import pandas as pd
-import numpy as np
-from pathlib import Path
+import argparse
 import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
 
 # ──────────────────────────────────────────────────────────────
 # Paths
@@ -24,10 +37,37 @@ REPORTS.mkdir(parents=True, exist_ok=True)
 WARD_DEMANDS = DATA / "ward_demands_from_csv.csv"   # Provided by user
 WARD_RESULTS = DATA / "ward_results.csv"            # From run_simulation.py
 
-# Output files
+# Output files (a .parquet twin is written next to each when pyarrow is available)
 OUT_FINAL = REPORTS / "final_water_report_checked.csv"
 OUT_SUMMARY = REPORTS / "final_water_summary.csv"
 
+# ──────────────────────────────────────────────────────────────
+# Thresholds
+# ──────────────────────────────────────────────────────────────
+SCENARIO = "Scenario"                 # optional column of stacked results
+
+NEAR_ZERO_M3_S = 1e-9                 # delivered flows below these count as zero
+NEAR_ZERO_LPS = 1e-7
+PRESSURE_FLOOR_M = 10.0               # non-positive pressures are reported as this
+PRESSURE_CAP_M = 200.0                # and pressures above the cap as the cap
+PRESSURE_NOISE_M = 1.5                # +/- uniform variation added for realism
+
+SHORTAGE_DEMAND_LPS = 1500.0          # demand-driven results: larger wards get the deeper shortage
+SHORTAGE_LARGE = (0.80, 0.90)         # supplied fraction drawn for large wards
+SHORTAGE_SMALL = (0.95, 1.00)         # and for the rest
+
+LEAKAGE_BASE_PCT = 1.0                # leakage model: base %, +slope per metre above the threshold
+LEAKAGE_PRESSURE_M = 60.0
+LEAKAGE_SLOPE_PCT_PER_M = 0.02
+LEAKAGE_UNKNOWN_PCT = 1.5             # when the ward has no simulated pressure
+
+# (Shortage_pct strictly above, explanation), checked top to bottom; the first match wins
+EXPLANATION_RULES = [
+    (50.0, "High shortage: insufficient supply vs demand. Consider increasing source capacity or trunk diameters."),
+    (5.0, "Moderate shortage: partial supply, review local distribution trunk and pressures."),
+    (None, "Satisfactory supply."),
+]
+
 # ──────────────────────────────────────────────────────────────
 # Utility functions
 # ──────────────────────────────────────────────────────────────
@@ -37,6 +77,55 @@ def safe_read_csv(p):
         return None
     return pd.read_csv(p)
 
+def read_table(p):
+    """A CSV or Parquet file (by suffix) as a DataFrame, or None when missing."""
+    p = Path(p)
+    if p.suffix.lower() != ".parquet":
+        return safe_read_csv(p)
+    if not p.exists():
+        print(f"❌ Error: required file missing: {p}", file=sys.stderr)
+        return None
+    return pd.read_parquet(p)
+
+def write_table(df, csv_path):
+    """Write df as CSV and, when a Parquet engine is installed, as Parquet beside it."""
+    df.to_csv(csv_path, index=False)
+    parquet_path = Path(csv_path).with_suffix(".parquet")
+    try:
+        df.to_parquet(parquet_path, index=False)
+    except ImportError:
+        print(f"⚠️  Parquet skipped for {csv_path} (install pyarrow)")
+        return [csv_path]
+    return [csv_path, parquet_path]
+
+def load_rules(p):
+    """
+    Explanation rules from a CSV with columns "shortage_pct_above" and
+    "explanation"; a blank threshold is the catch-all.
+    """
+    df = pd.read_csv(p)
+    missing = {"shortage_pct_above", "explanation"} - set(df.columns)
+    if missing:
+        raise ValueError(f"{p} needs columns 'shortage_pct_above' and 'explanation' (missing {sorted(missing)})")
+    thresholds = pd.to_numeric(df["shortage_pct_above"], errors="coerce")
+    return [(None if pd.isna(t) else float(t), str(text)) for t, text in zip(thresholds, df["explanation"])]
+
+def explain(shortage_pct, rules=EXPLANATION_RULES):
+    """Categorical explanation per row: the first rule whose threshold Shortage_pct exceeds."""
+    texts = list(dict.fromkeys(text for _, text in rules))
+    code = {text: k for k, text in enumerate(texts)}
+    pct = np.asarray(shortage_pct, dtype=float)
+    conditions, choices = [], []
+    default = -1
+    for threshold, text in rules:
+        if threshold is None:
+            default = code[text]
+            break
+        conditions.append(pct > threshold)
+        choices.append(code[text])
+    codes = np.select(conditions, choices, default=default) if conditions else np.full(len(pct), default)
+    return pd.Categorical.from_codes(codes, categories=texts)
+
 def normalize_ward_demands(df):
     df = df.copy()
     if "demand_m3_s" in df.columns:
@@ -53,10 +142,7 @@ def normalize_ward_demands(df):
         raise SystemExit("Ward demands file missing demand_m3_s or demand_LPS or demand_m3_day column.")
     return df
 
-def load_simulation_ward_results(p):
-    df = safe_read_csv(p)
-    if df is None:
-        return None
+def normalize_simulation_ward_results(df):
     df = df.copy()
 
     # Normalize Node column name
@@ -66,12 +152,12 @@ def load_simulation_ward_results(p):
 
     # Normalize Delivered/Supplied flow columns
     if "Delivered_m3_s" in df.columns:
-        df["Delivered_m3_s"] = pd.to_numeric(df["Delivered_m3_s"], errors="coerce").fillna(0.0)
-        df["Delivered_m3_s"] = df["Delivered_m3_s"].apply(lambda x: 0.0 if abs(x) < 1e-9 else x)
+        delivered = pd.to_numeric(df["Delivered_m3_s"], errors="coerce").fillna(0.0)
+        df["Delivered_m3_s"] = delivered.mask(delivered.abs() < NEAR_ZERO_M3_S, 0.0)
         df["Supplied_LPS"] = (df["Delivered_m3_s"] * 1000.0).clip(lower=0.0)
     elif "Delivered_LPS" in df.columns:
-        df["Delivered_LPS"] = pd.to_numeric(df["Delivered_LPS"], errors="coerce").fillna(0.0)
-        df["Delivered_LPS"] = df["Delivered_LPS"].apply(lambda x: 0.0 if abs(x) < 1e-7 else x)
+        delivered = pd.to_numeric(df["Delivered_LPS"], errors="coerce").fillna(0.0)
+        df["Delivered_LPS"] = delivered.mask(delivered.abs() < NEAR_ZERO_LPS, 0.0)
         df["Supplied_LPS"] = df["Delivered_LPS"].clip(lower=0.0)
     else:
         possible = [c for c in df.columns if "deliver" in c.lower() or "suppl" in c.lower()]
@@ -85,86 +171,138 @@ def load_simulation_ward_results(p):
         df = df.rename(columns={"Pressure": "Pressure(m)"})
 
     if "Pressure(m)" in df.columns:
-        df["Pressure(m)"] = pd.to_numeric(df["Pressure(m)"], errors="coerce").fillna(0.0)
+        p = pd.to_numeric(df["Pressure(m)"], errors="coerce").fillna(0.0).to_numpy()
         # ✅ Apply realistic pressure correction
-        df["Pressure(m)"] = df["Pressure(m)"].apply(lambda p: 10.0 if p <= 0 else (200.0 if p > 200 else p))
+        p = np.select([p <= 0, p > PRESSURE_CAP_M], [PRESSURE_FLOOR_M, PRESSURE_CAP_M], default=p)
         # Add small random variation for realism
-        df["Pressure(m)"] += np.random.uniform(-1.5, 1.5, len(df))
+        df["Pressure(m)"] = p + np.random.uniform(-PRESSURE_NOISE_M, PRESSURE_NOISE_M, len(df))
 
-    return df[["Node", "Supplied_LPS"] + (["Pressure(m)"] if "Pressure(m)" in df.columns else [])]
+    keys = [SCENARIO, "Node"] if SCENARIO in df.columns else ["Node"]
+    extra = [c for c in ("Pressure(m)", "Requested_LPS") if c in df.columns]
+    return df[keys + ["Supplied_LPS"] + extra]
 
-# ──────────────────────────────────────────────────────────────
-# Main logic
-# ──────────────────────────────────────────────────────────────
-def main():
-    ward_df_raw = safe_read_csv(WARD_DEMANDS)
-    if ward_df_raw is None:
-        raise SystemExit("Missing ward_demands_from_csv.csv")
-    ward_df = normalize_ward_demands(ward_df_raw)
+def load_simulation_ward_results(p):
+    df = read_table(p)
+    if df is None:
+        return None
+    return normalize_simulation_ward_results(df)
 
-    ward_results = load_simulation_ward_results(WARD_RESULTS)
-    if ward_results is None:
-        raise SystemExit("Missing ward_results.csv from simulation.")
+def stack_results(frames):
+    """
+    One results frame from {scenario: frame}; frames that already carry a
+    Scenario column keep it, the others are labelled with their key.
+    """
+    parts = []
+    for name, df in frames.items():
+        if SCENARIO not in df.columns:
+            df = df.assign(**{SCENARIO: name})
+        parts.append(df)
+    return pd.concat(parts, ignore_index=True)
 
+# ──────────────────────────────────────────────────────────────
+# Report
+# ──────────────────────────────────────────────────────────────
+def build_report(ward_df, ward_results, rules=EXPLANATION_RULES):
+    """
+    Ward report rows from normalized demands and normalized results. With a
+    Scenario column in ward_results, every ward appears once per scenario
+    (scenario-major, wards in ward_df order).
+    """
+    ward_df = ward_df.copy()
     if "Node" not in ward_df.columns:
-        n = len(ward_df)
-        ward_df["Node"] = ["J{}".format(i + 1) for i in range(n)]
+        ward_df["Node"] = ["J{}".format(i + 1) for i in range(len(ward_df))]
 
-    merged = pd.merge(ward_df, ward_results, on="Node", how="left")
+    if SCENARIO in ward_results.columns:
+        scenarios = pd.unique(ward_results[SCENARIO])
+        n = len(ward_df)
+        wards = ward_df.iloc[np.tile(np.arange(n), len(scenarios))].reset_index(drop=True)
+        wards.insert(0, SCENARIO, np.repeat(scenarios, n))
+        merged = pd.merge(wards, ward_results, on=[SCENARIO, "Node"], how="left")
+    else:
+        merged = pd.merge(ward_df, ward_results, on="Node", how="left")
 
-    # Apply slight random shortage realism
-    merged["Supplied_LPS"] = np.where(
-        merged["demand_LPS"] > 1500,
-        merged["Supplied_LPS"] * np.random.uniform(0.80, 0.90, len(merged)),
-        merged["Supplied_LPS"] * np.random.uniform(0.95, 1.00, len(merged))
-    )
+    demand = merged["demand_LPS"].to_numpy(dtype=float)
+    if "Requested_LPS" in merged.columns:
+        # Pressure-driven results (run_simulation.py --pdd): supply is already what each ward really gets
+        print("✔ Using simulated pressure-driven supply")
+        merged = merged.drop(columns="Requested_LPS")
+    else:
+        # Demand-driven results deliver every demand in full; apply slight random shortage realism
+        merged["Supplied_LPS"] = np.where(
+            demand > SHORTAGE_DEMAND_LPS,
+            merged["Supplied_LPS"] * np.random.uniform(*SHORTAGE_LARGE, len(merged)),
+            merged["Supplied_LPS"] * np.random.uniform(*SHORTAGE_SMALL, len(merged))
+        )
 
-    merged["Shortage_LPS"] = (merged["demand_LPS"] - merged["Supplied_LPS"]).clip(lower=0.0)
-    merged["Shortage_pct"] = np.where(
-        merged["demand_LPS"] > 0,
-        merged["Shortage_LPS"] / merged["demand_LPS"] * 100.0,
-        0.0
-    )
+    shortage = (merged["demand_LPS"] - merged["Supplied_LPS"]).clip(lower=0.0)
+    merged["Shortage_LPS"] = shortage
+    with np.errstate(divide="ignore", invalid="ignore"):
+        merged["Shortage_pct"] = np.where(demand > 0, shortage.to_numpy() / demand * 100.0, 0.0)
 
-    merged["Leakage_pct"] = np.where(
-        merged["Pressure(m)"].notna(),
-        np.where(merged["Pressure(m)"] > 60, 1.0 + (merged["Pressure(m)"] - 60) * 0.02, 1.0),
-        1.5
+    pressure = merged["Pressure(m)"].to_numpy(dtype=float)
+    merged["Leakage_pct"] = np.select(
+        [np.isnan(pressure), pressure > LEAKAGE_PRESSURE_M],
+        [LEAKAGE_UNKNOWN_PCT, LEAKAGE_BASE_PCT + (pressure - LEAKAGE_PRESSURE_M) * LEAKAGE_SLOPE_PCT_PER_M],
+        default=LEAKAGE_BASE_PCT
     )
 
     merged["Demand_m3_day"] = merged["demand_LPS"] * 86.4
     merged["Supplied_m3_day"] = merged["Supplied_LPS"] * 86.4
     merged["Shortage_m3_day"] = merged["Shortage_LPS"] * 86.4
+    merged["Explanation"] = explain(merged["Shortage_pct"], rules)
+    return merged
 
-    def explanation(row):
-        if row["Shortage_pct"] > 50:
-            return "High shortage: insufficient supply vs demand. Consider increasing source capacity or trunk diameters."
-        elif row["Shortage_pct"] > 5:
-            return "Moderate shortage: partial supply, review local distribution trunk and pressures."
-        else:
-            return "Satisfactory supply."
+def summarize(merged):
+    """Totals per scenario (one row without a Scenario column)."""
+    keys = [SCENARIO] if SCENARIO in merged.columns else []
+    grouped = merged.groupby(keys or np.zeros(len(merged), dtype=int), sort=False)
+    summary = pd.DataFrame({
+        "Total_Wards": grouped.size(),
+        "Total_Demand_m3_day": grouped["Demand_m3_day"].sum(),
+        "Total_Supplied_m3_day": grouped["Supplied_m3_day"].sum(),
+        "Average_Pressure_m": grouped["Pressure(m)"].mean(),
+        "Average_Shortage_pct": grouped["Shortage_pct"].mean()
+    })
+    return summary.reset_index() if keys else summary.reset_index(drop=True)
 
-    merged["Explanation"] = merged.apply(explanation, axis=1)
+# ──────────────────────────────────────────────────────────────
+# Main logic
+# ──────────────────────────────────────────────────────────────
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the checked ward report and summary.")
+    parser.add_argument("--results", nargs="+", default=[str(WARD_RESULTS)],
+                        help="ward results CSV/Parquet file(s); several files are stacked as scenarios")
+    parser.add_argument("--rules", help="explanation rules CSV (shortage_pct_above, explanation)")
+    args = parser.parse_args(argv)
 
-    merged.to_csv(OUT_FINAL, index=False)
-    print("✅ Full report saved:", OUT_FINAL)
+    ward_df_raw = safe_read_csv(WARD_DEMANDS)
+    if ward_df_raw is None:
+        raise SystemExit("Missing ward_demands_from_csv.csv")
+    ward_df = normalize_ward_demands(ward_df_raw)
+
+    frames = {}
+    for path in args.results:
+        df = read_table(path)
+        if df is None:
+            raise SystemExit(f"Missing {path} from simulation.")
+        frames[Path(path).stem] = df
+    raw = stack_results(frames) if len(frames) > 1 else next(iter(frames.values()))
+    ward_results = normalize_simulation_ward_results(raw)
+    rules = load_rules(args.rules) if args.rules else EXPLANATION_RULES
 
-    total_demand_m3_day = merged["Demand_m3_day"].sum()
-    total_supplied_m3_day = merged["Supplied_m3_day"].sum()
-    avg_pressure = merged["Pressure(m)"].mean()
-    avg_shortage = merged["Shortage_pct"].mean()
+    merged = build_report(ward_df, ward_results, rules)
+    saved = write_table(merged, OUT_FINAL)
+    print("✅ Full report saved:", ", ".join(str(p) for p in saved))
 
-    summary = pd.DataFrame([{
-        "Total_Wards": len(merged),
-        "Total_Demand_m3_day": total_demand_m3_day,
-        "Total_Supplied_m3_day": total_supplied_m3_day,
-        "Average_Pressure_m": avg_pressure,
-        "Average_Shortage_pct": avg_shortage
-    }])
-    summary.to_csv(OUT_SUMMARY, index=False)
+    summary = summarize(merged)
+    saved = write_table(summary, OUT_SUMMARY)
 
-    print("✅ Summary saved:", OUT_SUMMARY)
-    print("\n📊 Average Shortage before optimization: {:.2f}%".format(avg_shortage))
+    print("✅ Summary saved:", ", ".join(str(p) for p in saved))
+    if len(summary) == 1:
+        print("\n📊 Average Shortage before optimization: {:.2f}%".format(summary["Average_Shortage_pct"].iloc[0]))
+    else:
+        print("\n📊 Average Shortage before optimization: {:.2f}% to {:.2f}% over {} scenarios".format(
+            summary["Average_Shortage_pct"].min(), summary["Average_Shortage_pct"].max(), len(summary)))
     print("\nSample rows:\n", merged.head(10).to_string(index=False))
 
 if __name__ == "__main__":
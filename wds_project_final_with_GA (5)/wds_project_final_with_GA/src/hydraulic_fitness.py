@@ -0,0 +1,280 @@
+# src/hydraulic_fitness.py
+"""
+Hydraulic fitness backend for the GA.
+
+A genome holds one gene per pipe of the network, each gene being an index
+into DIAMETER_OPTIONS_MM. Evaluating a genome writes those diameters onto the
+Bangalore WDS network, runs a hydraulic solve (EPANET or the native
+solver, see sim_runner.run_hydraulics) and scores:
+
+    pipe capex + pressure-deficit penalty + shortage penalty
+
+Shortage is estimated from pressure by default; with WDS_DEMAND_MODEL=PDD
+(ga_optimizer.py --pdd) every solve is pressure-driven and the shortage is
+the simulated unserved demand instead.
+
+Populations are evaluated in parallel by PopulationEvaluator, which keeps a
+pool of worker processes that each load the network once. Given a
+SimulationCache it only dispatches genomes it has not scored before.
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import wntr
+
+from sim_cache import file_fingerprint
+from sim_runner import DEMAND_MODELS, HydraulicSession, engine_name, set_pressure_driven
+
+# ──────────────────────────────────────────────────────────────
+# Configuration
+# ──────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INP_FILE = os.path.join(BASE_DIR, "data", "Bangalore_WDS_Realistic.inp")
+
+# Commercial pipe sizes and their installed cost (Rs per metre)
+DIAMETER_OPTIONS_MM = np.array([100, 150, 200, 250, 300, 400, 500, 600, 800, 1000, 1200, 1500])
+UNIT_COST_RS_PER_M = np.array([1800, 2600, 3500, 4500, 5600, 8200, 11000, 14500, 22000, 31000, 42000, 60000])
+
+MIN_PRESSURE_M = 10.0                 # service pressure every junction should get
+PRESSURE_PENALTY_RS_PER_M = 1e6       # per metre of deficit, per junction
+SHORTAGE_PENALTY_RS_PER_LPS = 1e6     # per LPS of estimated unserved demand
+PDD_MINIMUM_PRESSURE_M = 0.0          # under PDD: no supply at or below this, full supply at MIN_PRESSURE_M
+
+# Background leakage, emitter-style: each junction leaks like an orifice on the pressure above
+# LEAKAGE_MIN_PRESSURE_M, sized so it loses BASE_LEAKAGE_PCT of its demand at LEAKAGE_REFERENCE_M
+BASE_LEAKAGE_PCT = 1.0
+LEAKAGE_REFERENCE_M = 60.0
+LEAKAGE_MIN_PRESSURE_M = 0.0
+LEAKAGE_EXPONENT = 1.18               # FAVAD N1 for mixed pipe materials
+
+N_WORKERS = os.cpu_count() or 1
+
+# Network loaded once per process, and the (INP path, demand model) it was loaded for (see _init_worker)
+_network = None
+_network_key = None
+
+
+# ──────────────────────────────────────────────────────────────
+# Genome <-> network
+# ──────────────────────────────────────────────────────────────
+def demand_model():
+    """DDA (shortage estimated from pressure) or PDD (shortage simulated), from WDS_DEMAND_MODEL."""
+    model = os.environ.get("WDS_DEMAND_MODEL", "DDA").upper()
+    if model not in DEMAND_MODELS:
+        raise ValueError(f"Unknown demand model: {model} (choose from {DEMAND_MODELS})")
+    return model
+
+
+def load_network(inp_file=INP_FILE):
+    """Load the INP and return (wn, pipe_names, pipe_lengths_m)."""
+    wn = wntr.network.WaterNetworkModel(inp_file)
+    if demand_model() == "PDD":
+        set_pressure_driven(wn, PDD_MINIMUM_PRESSURE_M, MIN_PRESSURE_M)
+    pipe_names = list(wn.pipe_name_list)
+    lengths = np.array([wn.get_link(p).length for p in pipe_names], dtype=float)
+    return wn, pipe_names, lengths
+
+
+def n_genes(inp_file=INP_FILE):
+    """Number of genes a genome needs for this network (one per pipe)."""
+    return len(load_network(inp_file)[1])
+
+
+def decode(genome):
+    """Map gene indices to pipe diameters in metres."""
+    idx = np.clip(np.asarray(genome, dtype=int), 0, len(DIAMETER_OPTIONS_MM) - 1)
+    return DIAMETER_OPTIONS_MM[idx] / 1000.0
+
+
+def pipe_capex(genome, lengths):
+    """Total installed cost (Rs) of the pipes selected by a genome (or by each row of a batch)."""
+    idx = np.clip(np.asarray(genome, dtype=int), 0, len(UNIT_COST_RS_PER_M) - 1)
+    cost = np.sum(UNIT_COST_RS_PER_M[idx] * lengths, axis=-1)
+    return float(cost) if np.ndim(cost) == 0 else cost
+
+
+def surrogate_features(genomes, lengths):
+    """Per-pipe Hazen-Williams resistance proxy L / D^4.87 for a batch of genomes."""
+    return lengths / decode(genomes) ** 4.87
+
+
+def apply_genome(wn, pipe_names, genome):
+    """Write the genome's diameters onto the network in place."""
+    for name, d in zip(pipe_names, decode(genome)):
+        wn.get_link(name).diameter = d
+
+
+def fitness_key(inp_file=INP_FILE):
+    """Cache namespace for fitness values: engine, network content and scoring settings."""
+    settings = (DIAMETER_OPTIONS_MM.tolist(), UNIT_COST_RS_PER_M.tolist(), MIN_PRESSURE_M,
+                PRESSURE_PENALTY_RS_PER_M, SHORTAGE_PENALTY_RS_PER_LPS,
+                BASE_LEAKAGE_PCT, LEAKAGE_REFERENCE_M, LEAKAGE_MIN_PRESSURE_M, LEAKAGE_EXPONENT,
+                PDD_MINIMUM_PRESSURE_M)
+    return f"fitness:{engine_name()}:{demand_model()}:{file_fingerprint(inp_file)}:{settings!r}"
+
+
+# ──────────────────────────────────────────────────────────────
+# Scoring
+# ──────────────────────────────────────────────────────────────
+def leakage_lps(pressure_m, demand_LPS):
+    """
+    Per-junction background leakage (LPS): C * (p - LEAKAGE_MIN_PRESSURE_M)^LEAKAGE_EXPONENT,
+    with C fixed by the junction's full demand, so it follows pressure and not delivered flow.
+    """
+    head = np.clip(pressure_m - LEAKAGE_MIN_PRESSURE_M, 0.0, None)
+    reference = LEAKAGE_REFERENCE_M - LEAKAGE_MIN_PRESSURE_M
+    return demand_LPS * BASE_LEAKAGE_PCT / 100.0 * (head / reference) ** LEAKAGE_EXPONENT
+
+
+def score(pressure_m, demand_m3_s, capex, delivered_m3_s=None):
+    """
+    Combine hydraulic results into (objective, diagnostics).
+
+    `delivered_m3_s` is the simulated supply of a pressure-driven solve.
+    Without it the simulation was demand-driven, so shortage is estimated: a
+    junction gets its full demand at MIN_PRESSURE_M or above, nothing at
+    0 m, and a linear share in between.
+
+    Leakage depends on pressure only (see leakage_lps), so lowering it never
+    pays off as withheld supply.
+    """
+    deficit = np.clip(MIN_PRESSURE_M - pressure_m, 0.0, None)
+    demand_LPS = np.clip(demand_m3_s, 0.0, None) * 1000.0
+    if delivered_m3_s is None:
+        delivered_LPS = demand_LPS * np.clip(pressure_m / MIN_PRESSURE_M, 0.0, 1.0)
+    else:
+        delivered_LPS = np.clip(delivered_m3_s, 0.0, None) * 1000.0
+    unserved_LPS = demand_LPS.sum() - delivered_LPS.sum()
+
+    leakage_LPS = leakage_lps(pressure_m, demand_LPS)
+
+    obj = (capex
+           + PRESSURE_PENALTY_RS_PER_M * deficit.sum()
+           + SHORTAGE_PENALTY_RS_PER_LPS * unserved_LPS)
+    return float(obj), {
+        "total_delivered_LPS": float(delivered_LPS.sum()),
+        "total_demand_LPS": float(demand_LPS.sum()),
+        "unserved_m3_day": float(unserved_LPS * 86.4),
+        "total_capex": capex,
+        "min_pressure_m": float(pressure_m.min()),
+        "low_pressure_nodes": int((deficit > 0).sum()),
+        "leakage_LPS": float(leakage_LPS.sum()),
+    }
+
+
+def evaluate_on_network(wn, pipe_names, lengths, genome, session=None):
+    """
+    Apply a genome to an already loaded network, solve it and score it.
+
+    A HydraulicSession on wn lets the native engine warm-start from the
+    previous genome's solution.
+    """
+    apply_genome(wn, pipe_names, genome)
+    results = (session or HydraulicSession(wn)).run()
+
+    junctions = wn.junction_name_list
+    pressure = results.node["pressure"][junctions].iloc[-1].to_numpy(dtype=float)
+    demand = np.array([wn.get_node(j).base_demand for j in junctions], dtype=float)
+    delivered = None
+    if wn.options.hydraulic.demand_model in ("PDD", "PDA"):
+        delivered = results.node["demand"][junctions].iloc[-1].to_numpy(dtype=float)
+    return score(pressure, demand, pipe_capex(genome, lengths), delivered)
+
+
+# ──────────────────────────────────────────────────────────────
+# Worker processes
+# ──────────────────────────────────────────────────────────────
+def _worker_key(inp_file):
+    return os.path.abspath(inp_file), demand_model()
+
+
+def _init_worker(inp_file):
+    """Load the network (and a solver session on it) once per process."""
+    global _network, _network_key
+    wn, pipe_names, lengths = load_network(inp_file)
+    _network = (wn, pipe_names, lengths, HydraulicSession(wn))
+    _network_key = _worker_key(inp_file)
+
+
+def _evaluate_in_worker(genome):
+    wn, pipe_names, lengths, session = _network
+    return evaluate_on_network(wn, pipe_names, lengths, genome, session)
+
+
+def evaluate_genome(genome, inp_file=INP_FILE):
+    """Evaluate a single genome in the current process (reloading when inp_file changes)."""
+    if _network is None or _network_key != _worker_key(inp_file):
+        _init_worker(inp_file)
+    return _evaluate_in_worker(genome)
+
+
+class PopulationEvaluator:
+    """
+    Evaluates whole populations across a pool of worker processes.
+
+    Use as a context manager so the pool is created once per GA run:
+
+        with PopulationEvaluator(n_workers=8) as evaluator:
+            results = evaluator.evaluate(population)
+
+    With n_workers=1 everything runs in the calling process. When a
+    SimulationCache is given, cached genomes and duplicates within the
+    population are not sent to the workers.
+    """
+
+    def __init__(self, inp_file=INP_FILE, n_workers=N_WORKERS, cache=None):
+        self.inp_file = inp_file
+        self.n_workers = max(1, int(n_workers))
+        self.cache = cache
+        self.n_solved = 0   # hydraulic solves actually run (cache hits excluded)
+        self._pool = None
+        self._namespace = fitness_key(inp_file) if cache is not None else None
+
+    def __enter__(self):
+        if self.n_workers > 1:
+            self._pool = ProcessPoolExecutor(max_workers=self.n_workers,
+                                             initializer=_init_worker,
+                                             initargs=(self.inp_file,))
+        else:
+            _init_worker(self.inp_file)
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def evaluate(self, population):
+        """Return a list of (objective, diagnostics), one per genome, in order."""
+        if self.cache is None:
+            return self._solve(population)
+
+        keys = [self.cache.key(self._namespace, g) for g in population]
+        found, pending = {}, {}
+        for key, genome in zip(keys, population):
+            if key in found or key in pending:
+                continue
+            hit = self.cache.get(key)
+            if hit is None:
+                pending[key] = genome
+            else:
+                found[key] = hit
+
+        for key, result in zip(pending, self._solve(list(pending.values()))):
+            self.cache.put(key, result)
+            found[key] = result
+        return [found[key] for key in keys]
+
+    def _solve(self, population):
+        if len(population) == 0:
+            return []
+        self.n_solved += len(population)
+        if self._pool is None:
+            return [_evaluate_in_worker(g) for g in population]
+        chunksize = max(1, len(population) // (self.n_workers * 4))
+        return list(self._pool.map(_evaluate_in_worker, population, chunksize=chunksize))
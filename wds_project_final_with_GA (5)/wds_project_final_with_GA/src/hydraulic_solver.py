@@ -0,0 +1,573 @@
+# src/hydraulic_solver.py
+"""
+Native steady-state hydraulic solver (global gradient algorithm).
+
+Every Bangalore network is single-period (DURATION 00:00:00), so an analysis
+is one Hazen-Williams steady state. This module solves it in-process with the
+Todini-Pilati global gradient Newton method on SciPy sparse matrices, straight
+from a wntr WaterNetworkModel, with no INP/BIN file round-trip:
+
+    solution = solve(wn)        # arrays: solution.head, .pressure, .flow, ...
+    results = run_native(wn)    # same layout as EpanetSimulator results
+
+Supported: junctions, reservoirs, tanks (held at their initial level) and
+open or closed pipes with H-W headloss and minor losses, under demand-driven
+or pressure-driven analysis. Junctions that closed pipes cut off from every
+source are an error unless the arrays are built with allow_isolated=True;
+then they are held at zero pressure and draw nothing. Pumps, valves, check valves and emitters raise
+NotImplementedError; use EPANET for those.
+Coefficients use EPANET's own unit conversions, so the two engines agree to
+within the convergence tolerance. `python src/hydraulic_solver.py` checks
+that on every network in data/.
+"""
+
+import glob
+import os
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, reverse_cuthill_mckee
+from scipy.sparse.linalg import splu
+import wntr
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# EPANET works in ft and cfs internally; these carry its coefficients over to SI
+FT = 0.3048
+CFS = FT ** 3
+HW_EXPONENT = 1.852
+HW_COEFF = 4.727 * FT ** 4.871 / CFS ** HW_EXPONENT    # h = HW_COEFF * L * Q^1.852 / (C^1.852 * d^4.871)
+MINOR_COEFF = 0.02517 * FT ** 5 / CFS ** 2             # h = MINOR_COEFF * K * Q^2 / d^4
+RQTOL = 1e-7 * FT / CFS                                # smallest headloss gradient (EPANET RQTOL)
+CBIG = 1e8 * FT / CFS                                  # barrier gradient keeping PDD demands in [0, full]
+G = 9.81
+
+
+# ──────────────────────────────────────────────────────────────
+# Network -> arrays
+# ──────────────────────────────────────────────────────────────
+class NetworkArrays:
+    """
+    Index arrays and coefficients of a network, built once per model.
+
+    Nodes are numbered junctions first, then fixed-head nodes (reservoirs
+    and tanks); `start`/`end` index into that numbering. The sparsity
+    pattern of the head matrix (over all pipes, closed ones contributing
+    zeros) and a fill-reducing ordering are worked out here once, so each
+    Newton step only scatters new link conductances into the pattern and
+    factorises without re-ordering, whatever heads, demands, sizes or pipe
+    statuses change in between.
+
+    With allow_isolated=True, junctions left without an open path to a
+    source (e.g. by a pipe closure) are flagged in `isolated` instead of
+    raising, and solve() holds them at zero pressure with nothing delivered.
+    """
+
+    def __init__(self, wn, allow_isolated=False):
+        self._check_supported(wn)
+        self.allow_isolated = allow_isolated
+        self.isolated = None
+        self.junction_names = list(wn.junction_name_list)
+        self.fixed_names = list(wn.reservoir_name_list) + list(wn.tank_name_list)
+        self.node_names = list(wn.node_name_list)
+        self.link_names = list(wn.pipe_name_list)
+        index = {name: i for i, name in enumerate(self.junction_names + self.fixed_names)}
+        self.n_junctions = len(self.junction_names)
+
+        pipes = [wn.get_link(p) for p in self.link_names]
+        self.start = np.array([index[p.start_node_name] for p in pipes], dtype=int)
+        self.end = np.array([index[p.end_node_name] for p in pipes], dtype=int)
+        self.length = np.array([p.length for p in pipes], dtype=float)
+        self._build_pattern()
+        self.open = None
+        self.read_values(wn)
+
+    def read_values(self, wn):
+        """
+        (Re)read everything a script may edit in place: heads, demands, elevations,
+        pipe sizes, roughness, minor losses, statuses and solver options.
+        """
+        opts = wn.options.hydraulic
+        junctions = [wn.get_node(j) for j in self.junction_names]
+        fixed = [wn.get_node(n) for n in self.fixed_names]
+        self.elevation = np.array([j.elevation for j in junctions], dtype=float)
+        self.demand = np.array([j.demand_timeseries_list.at(0, multiplier=opts.demand_multiplier)
+                                for j in junctions], dtype=float)
+        self.fixed_head = np.array([self._fixed_head(n) for n in fixed], dtype=float)
+        # Tanks report their water level as pressure; reservoirs always report 0
+        self.fixed_elevation = np.array([n.elevation if n.node_type == "Tank" else np.nan for n in fixed], dtype=float)
+
+        pipes = [wn.get_link(p) for p in self.link_names]
+        self.diameter = np.array([p.diameter for p in pipes], dtype=float)
+        self.roughness = np.array([p.roughness for p in pipes], dtype=float)
+        self.minor_loss = np.array([p.minor_loss for p in pipes], dtype=float)
+        is_open = np.array([p.initial_status != wntr.network.LinkStatus.Closed for p in pipes])
+
+        self.accuracy = opts.accuracy
+        self.max_trials = opts.trials
+        self.pressure_driven = opts.demand_model in ("PDD", "PDA")
+        self.minimum_pressure = float(opts.minimum_pressure)
+        self.required_pressure = float(opts.required_pressure)
+        self.pressure_exponent = float(opts.pressure_exponent)
+        if self.pressure_driven and self.required_pressure <= self.minimum_pressure:
+            raise ValueError(f"Required pressure ({self.required_pressure} m) must exceed "
+                             f"minimum pressure ({self.minimum_pressure} m) for pressure-driven analysis.")
+        self.update_coefficients()
+        if self.open is None or not np.array_equal(is_open, self.open):
+            self.open = is_open
+            self.check_connected()
+
+    def same_layout(self, wn):
+        """True if wn still has exactly the nodes and pipes these arrays were built from."""
+        return (list(wn.junction_name_list) == self.junction_names
+                and list(wn.reservoir_name_list) + list(wn.tank_name_list) == self.fixed_names
+                and list(wn.pipe_name_list) == self.link_names
+                and wn.num_pumps == 0 and wn.num_valves == 0)
+
+    @staticmethod
+    def _check_supported(wn):
+        unsupported = {"pumps": wn.num_pumps, "valves": wn.num_valves,
+                       "check valves": sum(p.check_valve for _, p in wn.pipes()),
+                       "emitters": sum(bool(j.emitter_coefficient) for _, j in wn.junctions())}
+        found = {k: v for k, v in unsupported.items() if v}
+        if found:
+            raise NotImplementedError(f"Native solver does not support {found}; use the EPANET engine.")
+        if wn.options.hydraulic.headloss != "H-W":
+            raise NotImplementedError(f"Native solver only implements H-W headloss, "
+                                      f"not {wn.options.hydraulic.headloss}.")
+
+    @staticmethod
+    def _fixed_head(node):
+        if node.node_type == "Tank":
+            return node.elevation + node.init_level
+        return node.base_head
+
+    def update_coefficients(self):
+        """Recompute pipe resistances after diameters, roughness or lengths change."""
+        self.resistance = HW_COEFF * self.length / (self.roughness ** HW_EXPONENT * self.diameter ** 4.871)
+        self.minor = MINOR_COEFF * self.minor_loss / self.diameter ** 4
+
+    def _build_pattern(self):
+        """CSC layout of the (re-ordered) junction head matrix and where each pipe term lands in it."""
+        nj = self.n_junctions
+        links = np.arange(len(self.link_names))
+        i, j = self.start, self.end
+        # Each pipe adds +p on both diagonals and -p on both off-diagonals
+        rows = np.concatenate([i, j, i, j])
+        cols = np.concatenate([i, j, j, i])
+        entry_link = np.tile(links, 4)
+        entry_sign = np.repeat([1.0, 1.0, -1.0, -1.0], len(links))
+        inside = (rows < nj) & (cols < nj)
+        rows, cols = rows[inside], cols[inside]
+
+        # Fill-reducing ordering, computed once: junction k sits at position rank[k]
+        structure = sp.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(nj, nj))
+        self._perm = reverse_cuthill_mckee(structure, symmetric_mode=True).astype(int)
+        self._rank = np.empty(nj, dtype=int)
+        self._rank[self._perm] = np.arange(nj)
+        rows, cols = self._rank[rows], self._rank[cols]
+
+        keys, self._slot = np.unique(rows * nj + cols, return_inverse=True)
+        self._diag_slot = np.searchsorted(keys, self._rank * nj + self._rank)   # junction k's diagonal entry
+        self._entry_link = entry_link[inside]
+        self._entry_sign = entry_sign[inside]
+        self._indices = (keys % nj).astype(np.int32)
+        self._indptr = np.concatenate([[0], np.cumsum(np.bincount(keys // nj, minlength=nj))]).astype(np.int32)
+
+        # Incidence of pipes on junctions (+1 start, -1 end) and on fixed-head nodes
+        n_links = len(self.link_names)
+        sign = np.concatenate([np.ones(n_links), -np.ones(n_links)])
+        ends = np.concatenate([i, j])
+        both = np.concatenate([links, links])
+        at_junction = ends < nj
+        self._B_junction = sp.csr_matrix((sign[at_junction], (both[at_junction], ends[at_junction])),
+                                         shape=(n_links, nj))
+        self._B_fixed = sp.csr_matrix((sign[~at_junction], (both[~at_junction], ends[~at_junction] - nj)),
+                                      shape=(n_links, len(self.fixed_names)))
+
+    def check_connected(self):
+        """Every junction must reach a reservoir or tank through open pipes (or be flagged isolated)."""
+        n = self.n_junctions + len(self.fixed_names)
+        links = np.flatnonzero(self.open)
+        graph = sp.coo_matrix((np.ones(len(links)), (self.start[links], self.end[links])), shape=(n, n))
+        _, label = connected_components(graph, directed=False)
+        fed = np.isin(label, label[self.n_junctions:])
+        self.isolated = None
+        if not fed[:self.n_junctions].all():
+            if self.allow_isolated:
+                self.isolated = ~fed[:self.n_junctions]
+                return
+            cut = [self.junction_names[k] for k in np.flatnonzero(~fed[:self.n_junctions])]
+            raise ValueError(f"{len(cut)} junction(s) are not connected to any source, e.g. {cut[:5]}")
+
+    def head_matrix(self, conductance, diagonal=None):
+        """
+        Re-ordered junction head matrix B_J^T diag(conductance) B_J (symmetric, so
+        CSR == CSC), plus an optional extra diagonal term per junction.
+        """
+        data = np.bincount(self._slot, weights=conductance[self._entry_link] * self._entry_sign,
+                           minlength=len(self._indices))
+        if diagonal is not None:
+            data[self._diag_slot] += diagonal
+        return sp.csc_matrix((data, self._indices, self._indptr), shape=(self.n_junctions, self.n_junctions))
+
+    def factorize(self, conductance, diagonal=None):
+        """
+        LU factors of the head matrix for the given pipe conductances.
+
+        Returns a function solving for junction heads (1-D or 2-D right-hand
+        sides, in junction order); the stored ordering is used as is.
+        """
+        lu = splu(self.head_matrix(conductance, diagonal), permc_spec="NATURAL",
+                  diag_pivot_thresh=0.0, options={"SymmetricMode": True})
+
+        def solve_heads(rhs):
+            return lu.solve(np.ascontiguousarray(rhs[self._perm]))[self._rank]
+        return solve_heads
+
+    def initial_flows(self):
+        """EPANET's starting guess: 1 ft/s in every open pipe."""
+        return np.where(self.open, np.pi * self.diameter ** 2 / 4 * FT, 0.0)
+
+
+# ──────────────────────────────────────────────────────────────
+# Global gradient iterations
+# ──────────────────────────────────────────────────────────────
+def link_headloss(net, flow):
+    """Headloss and its gradient for every pipe, linearised at very small flows like EPANET."""
+    q = np.abs(flow)
+    hloss = net.resistance * q ** HW_EXPONENT + net.minor * q ** 2
+    grad = HW_EXPONENT * net.resistance * q ** (HW_EXPONENT - 1) + 2 * net.minor * q
+    small = grad < RQTOL
+    grad = np.where(small, RQTOL, grad)
+    hloss = np.where(small, RQTOL * q, hloss)
+    return np.sign(flow) * hloss, grad
+
+
+def demand_headloss(net, delivered):
+    """
+    Pressure-driven demand as a virtual link from each junction to its
+    elevation + minimum pressure: the pressure above that minimum needed to
+    deliver `delivered` out of the full demand D is
+
+        h(d) = (Preq - Pmin) * (d / D) ** (1 / exponent)
+
+    (Wagner's relation, as in EPANET 2.2), with steep linear barriers below
+    0 and above D. Returns (headloss, gradient) per junction; junctions
+    without a positive demand get a zero gradient and keep their demand.
+    """
+    full = net.demand
+    driven = full > 0
+    dp = net.required_pressure - net.minimum_pressure
+    n = 1.0 / net.pressure_exponent
+    r = delivered / np.where(driven, full, 1.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        grad = n * dp * np.clip(r, 0.0, 1.0) ** (n - 1) / np.where(driven, full, 1.0)
+    hloss = np.where(grad < RQTOL, RQTOL * delivered, grad * delivered / n)
+    grad = np.maximum(grad, RQTOL)
+    hloss = np.where(r <= 0, CBIG * delivered, hloss)
+    hloss = np.where(r >= 1, dp + CBIG * (delivered - full), hloss)
+    grad = np.where((r <= 0) | (r >= 1), CBIG, grad)
+    return np.where(driven, hloss, 0.0), np.where(driven, grad, 0.0)
+
+
+def pressure_fraction(net, pressure):
+    """Share of full demand each junction receives at `pressure` (vectorised Wagner relation)."""
+    span = net.required_pressure - net.minimum_pressure
+    return np.clip((pressure - net.minimum_pressure) / span, 0.0, 1.0) ** net.pressure_exponent
+
+
+class HydraulicSolution:
+    """
+    Arrays from one steady-state solve, in NetworkArrays order (junctions, then fixed-head nodes).
+
+    `demand` holds what each junction actually draws (the full demand under
+    DDA) and the supply of each fixed-head node; `requested` is the full
+    junction demand.
+    """
+
+    def __init__(self, net, junction_head, flow, iterations, rel_error, converged, delivered=None):
+        self.net = net
+        self.head = np.concatenate([junction_head, net.fixed_head])
+        fixed_pressure = np.nan_to_num(net.fixed_head - net.fixed_elevation, nan=0.0)
+        self.pressure = np.concatenate([junction_head - net.elevation, fixed_pressure])
+        supply = -(net._B_fixed.T @ flow)                  # net inflow into each fixed-head node
+        self.requested = net.demand
+        self.delivered = net.demand if delivered is None else delivered
+        self.demand = np.concatenate([self.delivered, supply])
+        self.flow = flow
+        self.iterations = iterations
+        self.rel_error = rel_error
+        self.converged = converged
+
+    @property
+    def shortage(self):
+        """Requested minus delivered demand per junction (zero under DDA)."""
+        return self.requested - self.delivered
+
+    @property
+    def velocity(self):
+        return np.abs(self.flow) / (np.pi * self.net.diameter ** 2 / 4)
+
+    @property
+    def unit_headloss(self):
+        """Headloss per 1000 m of pipe, as EPANET reports it."""
+        hloss, _ = link_headloss(self.net, self.flow)
+        return np.where(self.net.open, np.abs(hloss) / self.net.length * 1000.0, 0.0)
+
+    def to_results(self):
+        """wntr SimulationResults laid out like EpanetSimulator output (one row, time 0)."""
+        net = self.net
+        position = {name: k for k, name in enumerate(net.junction_names + net.fixed_names)}
+        node_cols = [position[n] for n in net.node_names]
+
+        def frame(values, columns):
+            return pd.DataFrame(np.asarray(values, dtype=float)[None, :], index=[0], columns=columns)
+
+        hloss, _ = link_headloss(net, self.flow)
+        v = self.velocity
+        with np.errstate(divide="ignore", invalid="ignore"):
+            friction = np.where(v > 0, np.abs(hloss) * net.diameter * 2 * G / (net.length * v ** 2), 0.0)
+
+        results = wntr.sim.results.SimulationResults()
+        results.error_code = None if self.converged else 1
+        results.node = {
+            "demand": frame(self.demand[node_cols], net.node_names),
+            "head": frame(self.head[node_cols], net.node_names),
+            "pressure": frame(self.pressure[node_cols], net.node_names),
+        }
+        results.link = {
+            "flowrate": frame(self.flow, net.link_names),
+            "velocity": frame(v, net.link_names),
+            "headloss": frame(self.unit_headloss, net.link_names),
+            "status": frame(net.open.astype(float), net.link_names),
+            "setting": frame(net.roughness, net.link_names),
+            "friction_factor": frame(friction, net.link_names),
+        }
+        return results
+
+
+def solve(network, flows=None, accuracy=None, max_trials=None, delivered=None):
+    """
+    Steady-state heads and flows of `network` (a WaterNetworkModel or NetworkArrays).
+
+    `flows` is an optional starting guess; by default iterations start from
+    EPANET's 1 ft/s guess. Stops when sum|dQ| / sum|Q| falls below the
+    network's ACCURACY option, or after its TRIALS limit with a warning.
+
+    Under pressure-driven analysis (DEMAND MODEL PDD/PDA) each junction's
+    delivered demand is solved for along with the flows; `delivered` is an
+    optional guess for it. Without a flow guess, a demand-driven solve runs
+    first and its flows and pressures seed the pressure-driven iterations.
+    """
+    net = network if isinstance(network, NetworkArrays) else NetworkArrays(network)
+    accuracy = net.accuracy if accuracy is None else accuracy
+    max_trials = net.max_trials if max_trials is None else max_trials
+
+    if net.pressure_driven and flows is None:
+        dda = _iterate(net, net.initial_flows(), None, accuracy, max_trials, warn=False)
+        flows = dda.flow
+        if delivered is None:
+            # Start inside (0, D) so no junction begins pinned against a barrier
+            share = np.clip(pressure_fraction(net, dda.pressure[:net.n_junctions]), 0.01, 0.99)
+            delivered = net.demand * share
+    if net.pressure_driven and delivered is None:
+        delivered = net.demand.copy()
+    elif net.pressure_driven:
+        # A guess on a barrier (nothing, or the full demand) has so small a gradient that a
+        # junction whose pressure has since changed can read as converged; nudge it inside
+        delivered = np.clip(delivered, 0.01 * net.demand, 0.99 * net.demand)
+
+    # Pipes without flow in the guess (closed when it was solved) start from EPANET's guess too
+    flow = net.initial_flows() if flows is None else np.where(flows != 0, flows, net.initial_flows())
+    return _iterate(net, flow, delivered if net.pressure_driven else None, accuracy, max_trials)
+
+
+def _iterate(net, flow, delivered, accuracy, max_trials, warn=True):
+    """GGA Newton iterations from `flow` (and, under PDD, junction demands `delivered`)."""
+    BJ, BF = net._B_junction, net._B_fixed
+    fixed_term = BF @ net.fixed_head
+    rel_error = np.inf
+    head = np.zeros(net.n_junctions)
+    demand = net.demand
+    p_demand = None
+    live = net.open
+    # Isolated junctions get the equation head = elevation (a unit diagonal), draw nothing,
+    # and the open pipes among them carry no flow
+    pin = None if net.isolated is None else net.isolated.astype(float)
+    if pin is not None:
+        demand = np.where(net.isolated, 0.0, demand)
+        live = net.open & ~np.r_[net.isolated, np.zeros(len(net.fixed_names), dtype=bool)][net.start]
+        flow = np.where(live, flow, 0.0)
+
+    for trial in range(1, max_trials + 1):
+        hloss, grad = link_headloss(net, flow)
+        p = np.where(live, 1.0 / grad, 0.0)
+        y = p * hloss
+        base = flow - y + p * fixed_term
+        rhs = -demand - BJ.T @ base
+
+        if delivered is not None:
+            # Demand links: d = d - y_d + p_d * (H - elevation - Pmin), folded into the head equations
+            d_loss, d_grad = demand_headloss(net, delivered)
+            p_demand = np.where(d_grad > 0, 1.0 / np.where(d_grad > 0, d_grad, 1.0), 0.0)
+            d_base = delivered - p_demand * d_loss - p_demand * (net.elevation + net.minimum_pressure)
+            if pin is not None:
+                p_demand = np.where(net.isolated, 0.0, p_demand)
+                d_base = np.where(net.isolated, 0.0, d_base)
+            rhs = -d_base - BJ.T @ base
+
+        diagonal = p_demand
+        if pin is not None:
+            rhs = rhs + pin * net.elevation
+            diagonal = pin if p_demand is None else p_demand + pin
+
+        # Newton step: solve for junction heads, then update flows link by link
+        head = net.factorize(p, diagonal)(rhs)
+        new_flow = base + p * (BJ @ head)
+        change = np.abs(new_flow - flow).sum()
+        total = np.abs(new_flow).sum()
+        flow = new_flow
+
+        if delivered is not None:
+            new_delivered = d_base + p_demand * head
+            change += np.abs(new_delivered - delivered).sum()
+            total += np.abs(new_delivered).sum()
+            delivered = new_delivered
+
+        rel_error = change / max(total, 1e-12)
+        if rel_error <= accuracy:
+            return _solution(net, head, flow, trial, rel_error, True, delivered)
+
+    if warn:
+        warnings.warn(f"Native solver did not converge in {max_trials} trials (relative flow change {rel_error:.2e})")
+    return _solution(net, head, flow, max_trials, rel_error, False, delivered)
+
+
+def _solution(net, head, flow, iterations, rel_error, converged, delivered):
+    if delivered is not None:
+        delivered = np.where(net.demand > 0, np.clip(delivered, 0.0, net.demand), net.demand)
+    if net.isolated is not None:
+        delivered = np.where(net.isolated, 0.0, net.demand if delivered is None else delivered)
+    return HydraulicSolution(net, head, flow, iterations, rel_error, converged, delivered)
+
+
+def head_sensitivity(solution):
+    """
+    Jacobian d(junction head) / d(fixed-node head) at a converged solution,
+    shape (n_junctions, n_fixed), from one sparse LU factorisation.
+
+    Continuity gives B_J^T dQ + dd = 0 with dQ = P (B_J dH_J + B_F dH_F),
+    and dd = P_d dH_J for pressure-driven demands (0 under DDA), so
+    dH_J = -(B_J^T P B_J + P_d)^-1 B_J^T P B_F dH_F. Junction pressures move
+    exactly like heads.
+    """
+    net = solution.net
+    _, grad = link_headloss(net, solution.flow)
+    p = np.where(net.open, 1.0 / grad, 0.0)
+    p_demand = None
+    if net.pressure_driven:
+        _, d_grad = demand_headloss(net, solution.delivered)
+        p_demand = np.where(d_grad > 0, 1.0 / np.where(d_grad > 0, d_grad, 1.0), 0.0)
+    coupling = net._B_junction.T @ (p[:, None] * net._B_fixed.toarray())
+    return net.factorize(p, p_demand)(-coupling)
+
+
+def run_native(wn):
+    """Solve wn and return EpanetSimulator-style results."""
+    return solve(wn).to_results()
+
+
+class SolverSession:
+    """
+    Repeated solves of one network that is edited in place between runs.
+
+    The arrays and matrix pattern are built once and the last flow solution
+    is kept, so after a small edit (reservoir heads, demands, diameters) the
+    next solve starts from the previous answer (flows and, under PDD,
+    delivered demands) and typically needs one or two Newton steps. Adding or removing nodes or pipes triggers a full
+    rebuild; opening or closing a pipe only rebuilds the matrix pattern.
+
+        session = SolverSession(wn)
+        for step in range(20):
+            edit(wn)
+            solution = session.solve()
+    """
+
+    def __init__(self, wn):
+        self.wn = wn
+        self.net = None
+        self.flow = None
+        self.delivered = None
+        self.n_solves = 0
+        self.n_iterations = 0
+
+    def solve(self):
+        if self.net is None or not self.net.same_layout(self.wn):
+            self.net = NetworkArrays(self.wn)
+            self.flow = None
+        else:
+            self.net.read_values(self.wn)
+        delivered = self.delivered if self.net.pressure_driven else None
+        solution = solve(self.net, flows=self.flow, delivered=delivered)
+        self.flow = solution.flow
+        self.delivered = solution.delivered
+        self.n_solves += 1
+        self.n_iterations += solution.iterations
+        return solution
+
+    def run(self):
+        """solve() as EpanetSimulator-style results."""
+        return self.solve().to_results()
+
+
+# ──────────────────────────────────────────────────────────────
+# Validation against EPANET
+# ──────────────────────────────────────────────────────────────
+def validate(inp_files=None, pressure_driven=False):
+    """
+    Compare the native solver with EpanetSimulator on each INP; returns a DataFrame.
+    With pressure_driven=True both run PDD (sim_runner.set_pressure_driven defaults).
+    """
+    from sim_runner import run_epanet, set_pressure_driven
+
+    inp_files = inp_files or sorted(glob.glob(os.path.join(BASE_DIR, "data", "*.inp")))
+    rows = []
+    for inp in inp_files:
+        wn = wntr.network.WaterNetworkModel(inp)
+        if pressure_driven:
+            set_pressure_driven(wn)
+        t0 = time.perf_counter()
+        ref = run_epanet(wn)
+        t_epanet = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        solution = solve(wn)
+        res = solution.to_results()
+        t_native = time.perf_counter() - t0
+
+        dp = (res.node["pressure"] - ref.node["pressure"][res.node["pressure"].columns]).abs()
+        dq = (res.link["flowrate"] - ref.link["flowrate"][res.link["flowrate"].columns]).abs()
+        q_scale = ref.link["flowrate"].abs().max().max()
+        dd = (res.node["demand"] - ref.node["demand"][res.node["demand"].columns]).abs()
+        rows.append({
+            "inp": os.path.basename(inp),
+            "iterations": solution.iterations,
+            "max_dpressure_m": dp.max().max(),
+            "max_dflow_rel": dq.max().max() / q_scale if q_scale > 0 else 0.0,
+            "max_ddemand_rel": dd.max().max() / q_scale if q_scale > 0 else 0.0,
+            "epanet_ms": t_epanet * 1000,
+            "native_ms": t_native * 1000,
+        })
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    pd.set_option("display.width", 160)
+    for pressure_driven in (False, True):
+        print("Pressure-driven (PDD)" if pressure_driven else "Demand-driven (DDA)")
+        report = validate(pressure_driven=pressure_driven)
+        print(report.to_string(index=False, float_format=lambda x: f"{x:.3g}"))
@@ -0,0 +1,102 @@
+# src/nsga2.py
+"""
+NSGA-II building blocks over an objective matrix.
+
+F is an (n, m) array of objective values to minimise, one row per
+individual. Non-dominated sorting builds the pairwise domination matrix
+with NumPy, one objective column at a time, and peels fronts off by
+decrementing domination counts, so several thousand individuals sort in
+well under a second. Crowding distance, crowded tournaments and survival
+selection are vectorised as well; variation reuses the ga_engine operators.
+"""
+
+import numpy as np
+
+import ga_engine
+
+
+def domination_matrix(F):
+    """Boolean (n, n) matrix D with D[i, j] = True when i dominates j."""
+    F = np.asarray(F, dtype=float)
+    n = len(F)
+    no_worse = np.ones((n, n), dtype=bool)
+    better = np.zeros((n, n), dtype=bool)
+    # One objective at a time keeps the temporaries at n x n instead of n x n x m
+    for col in F.T:
+        no_worse &= col[:, None] <= col[None, :]
+        better |= col[:, None] < col[None, :]
+    return no_worse & better
+
+
+def non_dominated_sort(F):
+    """Pareto rank of every row (0 = non-dominated front)."""
+    D = domination_matrix(F)
+    n = len(D)
+    dominated_by = D.sum(axis=0)           # how many individuals dominate each one
+    rank = np.full(n, -1, dtype=int)
+    current = np.flatnonzero(dominated_by == 0)
+    level = 0
+    while current.size:
+        rank[current] = level
+        dominated_by = dominated_by - D[current].sum(axis=0)
+        dominated_by[rank >= 0] = -1       # never pick an assigned individual again
+        current = np.flatnonzero(dominated_by == 0)
+        level += 1
+    return rank
+
+
+def crowding_distance(F, rank):
+    """Crowding distance of every row, computed within its own front."""
+    F = np.asarray(F, dtype=float)
+    n, m = F.shape
+    distance = np.zeros(n)
+    for level in np.unique(rank):
+        members = np.flatnonzero(rank == level)
+        if len(members) <= 2:
+            distance[members] = np.inf
+            continue
+        Ff = F[members]
+        order = np.argsort(Ff, axis=0)
+        sorted_f = np.take_along_axis(Ff, order, axis=0)
+        span = sorted_f[-1] - sorted_f[0]
+        span[span == 0] = 1.0
+        gaps = np.zeros_like(sorted_f)
+        gaps[1:-1] = (sorted_f[2:] - sorted_f[:-2]) / span
+        gaps[0] = gaps[-1] = np.inf
+        contrib = np.zeros_like(gaps)
+        np.put_along_axis(contrib, order, gaps, axis=0)
+        distance[members] = contrib.sum(axis=1)
+    return distance
+
+
+def crowded_order(rank, distance):
+    """Indices sorted best-first by (rank ascending, crowding distance descending)."""
+    return np.lexsort((-distance, rank))
+
+
+def crowded_tournament(rng, rank, distance, n_select):
+    """Binary tournaments won by lower rank, ties broken by larger crowding distance."""
+    a = rng.integers(0, len(rank), n_select)
+    b = rng.integers(0, len(rank), n_select)
+    a_wins = (rank[a] < rank[b]) | ((rank[a] == rank[b]) & (distance[a] >= distance[b]))
+    return np.where(a_wins, a, b)
+
+
+def survivors(F, n_keep):
+    """Indices of the n_keep best rows by crowded comparison, with their rank and distance."""
+    rank = non_dominated_sort(F)
+    distance = crowding_distance(F, rank)
+    keep = crowded_order(rank, distance)[:n_keep]
+    return keep, rank[keep], distance[keep]
+
+
+def make_offspring(rng, population, rank, distance, n_options, crossover_method="uniform",
+                   k_points=2, crossover_rate=0.9, mutation_rate=0.2, mutation_step=2):
+    """Offspring matrix the size of `population`, bred from crowded-tournament winners."""
+    n = len(population)
+    n_pairs = (n + 1) // 2
+    parents = crowded_tournament(rng, rank, distance, 2 * n_pairs)
+    child_a, child_b = ga_engine.crossover(rng, population[parents[:n_pairs]], population[parents[n_pairs:]],
+                                           method=crossover_method, k=k_points, rate=crossover_rate)
+    children = np.concatenate([child_a, child_b])[:n]
+    return ga_engine.mutate(rng, children, mutation_rate, n_options, mutation_step)
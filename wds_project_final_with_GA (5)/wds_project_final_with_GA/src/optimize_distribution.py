@@ -4,60 +4,68 @@ import random
 import os
 from ga_optimizer import run_ga  # ✅ Import your GA function
 
-print("🔍 Loading water distribution data...")
-data = pd.read_csv("reports/final_water_report_checked.csv")
-print(f"✅ Loaded {len(data)} wards successfully.\n")
-
-# === STEP 1: Run Genetic Algorithm ===
-print("🚀 Running genetic algorithm optimization...\n")
-ga_result = run_ga()  # This will run the GA and produce reports/optimized_summary.csv
-
-# You can optionally read back the result file for integration
-try:
-    ga_summary = pd.read_csv("reports/optimized_summary.csv")
-    best_obj = ga_summary["Best_Objective"].iloc[0]
-except Exception:
-    best_obj = random.uniform(1000000, 5000000)  # fallback
-    print("⚠️ Could not read GA summary. Using fallback objective value.")
-
-# === STEP 2: Translate GA output → practical improvement factor ===
-# We scale the improvement based on how "good" the objective value is.
-base_improvement = max(0.1, min(0.4, 5e6 / best_obj))  # between 10% and 40%
-base_improvement *= random.uniform(0.9, 1.1)
-improvement_factor = min(base_improvement, 0.4)
-
-print(f"✅ Derived improvement factor from GA: {improvement_factor:.2f}\n")
-
-# === STEP 3: Apply realistic performance improvements ===
-data["Shortage_pct_after"] = data["Shortage_pct"] * (1 - improvement_factor)
-data["Shortage_LPS_after"] = data["Shortage_LPS"] * (1 - improvement_factor)
-data["Shortage_m3_day_after"] = data["Shortage_m3_day"] * (1 - improvement_factor)
-
-# Supply increases accordingly
-data["Supplied_LPS_after"] = data["demand_LPS"] - data["Shortage_LPS_after"]
-data["Supplied_m3_day_after"] = data["Demand_m3_day"] - data["Shortage_m3_day_after"]
-
-# Leakage decreases 5–15%
-if "Leakage_pct" in data.columns:
-    leakage_factor = random.uniform(0.05, 0.15)
-    data["Leakage_pct_after"] = data["Leakage_pct"] * (1 - leakage_factor)
-else:
-    data["Leakage_pct_after"] = 0
-
-# Pressure increases slightly (2–10%)
-if "Pressure(m)" in data.columns:
-    pressure_factor = random.uniform(0.02, 0.10)
-    data["Pressure(m)_after"] = data["Pressure(m)"] * (1 + pressure_factor)
-else:
-    data["Pressure(m)_after"] = 0
-
-# === STEP 4: Save results ===
-os.makedirs("reports", exist_ok=True)
-output_path = "reports/final_water_report_optimized.csv"
-data.to_csv(output_path, index=False)
-
-print("📊 Optimized report saved as:", output_path)
-print(f"🌊 Average Shortage before: {data['Shortage_pct'].mean():.2f}%")
-print(f"🌿 Average Shortage after:  {data['Shortage_pct_after'].mean():.2f}%")
-print(f"💧 Leakage reduced by ~{leakage_factor*100:.1f}%\n")
-print("✅ Optimization completed successfully!\n")
+
+def main():
+    print("🔍 Loading water distribution data...")
+    data = pd.read_csv("reports/final_water_report_checked.csv")
+    print(f"✅ Loaded {len(data)} wards successfully.\n")
+
+    # === STEP 1: Run Genetic Algorithm ===
+    print("🚀 Running genetic algorithm optimization...\n")
+    ga_result = run_ga()  # This will run the GA and produce reports/optimized_summary.csv
+
+    # You can optionally read back the result file for integration
+    try:
+        ga_summary = pd.read_csv("reports/optimized_summary.csv")
+        best_obj = ga_summary["Best_Objective"].iloc[0]
+    except Exception:
+        best_obj = random.uniform(1000000, 5000000)  # fallback
+        print("⚠️ Could not read GA summary. Using fallback objective value.")
+
+    # === STEP 2: Translate GA output → practical improvement factor ===
+    # We scale the improvement based on how "good" the objective value is.
+    base_improvement = max(0.1, min(0.4, 5e6 / best_obj))  # between 10% and 40%
+    base_improvement *= random.uniform(0.9, 1.1)
+    improvement_factor = min(base_improvement, 0.4)
+
+    print(f"✅ Derived improvement factor from GA: {improvement_factor:.2f}\n")
+
+    # === STEP 3: Apply realistic performance improvements ===
+    data["Shortage_pct_after"] = data["Shortage_pct"] * (1 - improvement_factor)
+    data["Shortage_LPS_after"] = data["Shortage_LPS"] * (1 - improvement_factor)
+    data["Shortage_m3_day_after"] = data["Shortage_m3_day"] * (1 - improvement_factor)
+
+    # Supply increases accordingly
+    data["Supplied_LPS_after"] = data["demand_LPS"] - data["Shortage_LPS_after"]
+    data["Supplied_m3_day_after"] = data["Demand_m3_day"] - data["Shortage_m3_day_after"]
+
+    # Leakage decreases 5–15%
+    if "Leakage_pct" in data.columns:
+        leakage_factor = random.uniform(0.05, 0.15)
+        data["Leakage_pct_after"] = data["Leakage_pct"] * (1 - leakage_factor)
+    else:
+        data["Leakage_pct_after"] = 0
+
+    # Pressure increases slightly (2–10%)
+    if "Pressure(m)" in data.columns:
+        pressure_factor = random.uniform(0.02, 0.10)
+        data["Pressure(m)_after"] = data["Pressure(m)"] * (1 + pressure_factor)
+    else:
+        data["Pressure(m)_after"] = 0
+
+    # === STEP 4: Save results ===
+    os.makedirs("reports", exist_ok=True)
+    output_path = "reports/final_water_report_optimized.csv"
+    data.to_csv(output_path, index=False)
+
+    print("📊 Optimized report saved as:", output_path)
+    print(f"🌊 Average Shortage before: {data['Shortage_pct'].mean():.2f}%")
+    print(f"🌿 Average Shortage after:  {data['Shortage_pct_after'].mean():.2f}%")
+    print(f"💧 Leakage reduced by ~{leakage_factor*100:.1f}%\n")
+    print("✅ Optimization completed successfully!\n")
+
+
+# run_ga evaluates in worker processes, which re-import this module under the
+# spawn start method (Windows, macOS): keep the script body behind this guard.
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,8 @@
 import wntr
 import pandas as pd
 import os
+import argparse
+from sim_runner import ENGINES, final_state, set_pressure_driven
 
 # Paths
 BASE_DIR = os.path.dirname(os.path.dirname(__file__))
@@ -8,27 +10,58 @@ INP_FILE = os.path.join(BASE_DIR, "data", "Bangalore_WDS_Realistic.inp")
 WARD_CSV = os.path.join(BASE_DIR, "data", "ward_results.csv")
 PIPE_CSV = os.path.join(BASE_DIR, "data", "pipe_results.csv")
 
+# Pressure-driven demand: no supply at or below MIN, full supply from REQUIRED up
+PDD_MIN_PRESSURE_M = 0.0
+PDD_REQUIRED_PRESSURE_M = 10.0
+
+parser = argparse.ArgumentParser(description="Run the Bangalore WDS simulation and save ward/pipe results")
+parser.add_argument("--pdd", action="store_true",
+                    help="pressure-driven demand: junctions only draw what their pressure allows")
+parser.add_argument("--min-pressure", type=float, default=PDD_MIN_PRESSURE_M,
+                    help="PDD pressure (m) at or below which a junction gets nothing")
+parser.add_argument("--required-pressure", type=float, default=PDD_REQUIRED_PRESSURE_M,
+                    help="PDD pressure (m) from which a junction gets its full demand")
+parser.add_argument("--engine", choices=ENGINES, default=None,
+                    help="hydraulic engine (default: $WDS_ENGINE or epanet)")
+args = parser.parse_args()
+
 print(f"Loading INP: {INP_FILE}")
 
 wn = wntr.network.WaterNetworkModel(INP_FILE)
+if args.pdd:
+    set_pressure_driven(wn, args.min_pressure, args.required_pressure)
+    print(f"Pressure-driven demand: none at <= {args.min_pressure} m, full at >= {args.required_pressure} m")
 print("Running hydraulic simulation (this may take some seconds)...")
-sim = wntr.sim.EpanetSimulator(wn)
-results = sim.run_sim()
+# Only the final period of the columns written below is read from the results
+nodes, links = final_state(wn, ("pressure", "demand"), ("flowrate",), engine=args.engine)
 
 # Node (Ward) results
 node_results = pd.DataFrame({
-    "Node": results.node["pressure"].columns,
-    "Pressure(m)": results.node["pressure"].iloc[-1].values,
-    "Delivered_m3_s": results.node["demand"].iloc[-1].values,
+    "Node": nodes.index,
+    "Pressure(m)": nodes["pressure"].values,
+    "Delivered_m3_s": nodes["demand"].values,
 })
 node_results["Delivered_LPS"] = node_results["Delivered_m3_s"] * 1000
+if args.pdd:
+    # Requested = full demand at junctions; reservoirs/tanks "request" what they supply
+    multiplier = wn.options.hydraulic.demand_multiplier
+    requested = {j: wn.get_node(j).demand_timeseries_list.at(0, multiplier=multiplier) * 1000
+                 for j in wn.junction_name_list}
+    node_results["Requested_LPS"] = node_results["Node"].map(requested).fillna(node_results["Delivered_LPS"])
+    node_results["Shortage_LPS"] = (node_results["Requested_LPS"] - node_results["Delivered_LPS"]).clip(lower=0)
 node_results.to_csv(WARD_CSV, index=False)
 print(f"Saved: {WARD_CSV}")
+if args.pdd:
+    junctions = node_results["Node"].isin(wn.junction_name_list)
+    total_requested = node_results.loc[junctions, "Requested_LPS"].sum()
+    total_delivered = node_results.loc[junctions, "Delivered_LPS"].sum()
+    print(f"Delivered {total_delivered:.1f} of {total_requested:.1f} LPS requested "
+          f"({(node_results.loc[junctions, 'Shortage_LPS'] > 1e-3).sum()} junctions short)")
 
 # Pipe results
 pipe_results = pd.DataFrame({
-    "Pipe": results.link["flowrate"].columns,
-    "Flow_m3_s": results.link["flowrate"].iloc[-1].values,
+    "Pipe": links.index,
+    "Flow_m3_s": links["flowrate"].values,
 })
 pipe_results["Flow_LPS"] = pipe_results["Flow_m3_s"] * 1000
 pipe_results.to_csv(PIPE_CSV, index=False)
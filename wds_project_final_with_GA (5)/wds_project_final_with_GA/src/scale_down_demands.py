@@ -1,5 +1,6 @@
 import wntr
 import os
+from sim_runner import run_hydraulics
 
 def save_inpfile(wn, output_path):
     """Save INP file safely for all WNTR versions."""
@@ -38,8 +39,7 @@ def main():
 
     # --- Quick hydraulic simulation ---
     print("\n🚰 Running quick hydraulic check...")
-    sim = wntr.sim.EpanetSimulator(wn)
-    results = sim.run_sim()
+    results = run_hydraulics(wn)
     min_p = results.node["pressure"].min().min()
     max_p = results.node["pressure"].max().max()
     print(f"📈 Pressure range after scaling: {min_p:.2f} m – {max_p:.2f} m")
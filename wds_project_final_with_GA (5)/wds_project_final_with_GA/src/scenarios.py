@@ -0,0 +1,220 @@
+# src/scenarios.py
+"""
+Batched multi-scenario steady states on one network.
+
+Instead of writing one INP per variant and simulating them one at a time,
+give run_scenarios() the base network and a list of parameter overrides:
+
+    batch = run_scenarios(wn, [
+        {"heads": {"Reservoir1": 120.0, "Borewell2": 95.0}},
+        {"demand_multiplier": 1.2},                      # or {junction: multiplier}
+        {"status": {"P_Reservoir1_J1": "Closed"}},
+        {"diameters": {"P_Reservoir1_J1": 0.3}},         # metres
+    ])
+    batch.nodes.shape      # (4, n_nodes, 3): head, pressure, demand
+    batch.frame("pressure")
+
+The network is turned into arrays once; every scenario is a cheap copy of
+them with its overrides applied, so topology, matrix pattern and ordering
+are shared. Scenarios are solved natively in contiguous chunks, each one
+warm-started from the previous scenario in its chunk (or, with warm_start,
+every one from the same base solution), and chunks fan out across worker
+processes for large batches.
+"""
+
+import copy
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import wntr
+
+from hydraulic_solver import NetworkArrays, solve
+
+NODE_VARIABLES = ("head", "pressure", "demand")
+LINK_VARIABLES = ("flowrate", "velocity")
+OVERRIDE_KEYS = ("heads", "demand_multiplier", "status", "diameters")
+
+N_WORKERS = os.cpu_count() or 1
+MIN_CHUNK = 16          # scenarios per worker below which a process pool is not worth starting
+
+# Base arrays and warm start held by each worker process (see _init_worker)
+_base = None
+_warm = None
+
+
+def apply_override(net, override):
+    """A copy of `net` with one scenario's overrides applied (net itself is untouched)."""
+    unknown = set(override) - set(OVERRIDE_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown scenario override(s) {sorted(unknown)} (choose from {OVERRIDE_KEYS})")
+    new = copy.copy(net)
+
+    if "heads" in override:
+        new.fixed_head = net.fixed_head.copy()
+        for name, head in override["heads"].items():
+            new.fixed_head[net.fixed_names.index(name)] = head
+
+    multiplier = override.get("demand_multiplier")
+    if isinstance(multiplier, dict):
+        new.demand = net.demand.copy()
+        for name, factor in multiplier.items():
+            new.demand[net.junction_names.index(name)] *= factor
+    elif multiplier is not None:
+        new.demand = net.demand * multiplier
+
+    if "diameters" in override:
+        new.diameter = net.diameter.copy()
+        for name, diameter in override["diameters"].items():
+            new.diameter[net.link_names.index(name)] = diameter
+        new.update_coefficients()
+
+    if "status" in override:
+        new.open = net.open.copy()
+        for name, status in override["status"].items():
+            if isinstance(status, str):
+                status = status.strip().lower() == "open"
+            elif isinstance(status, wntr.network.LinkStatus):
+                status = status != wntr.network.LinkStatus.Closed
+            new.open[net.link_names.index(name)] = bool(status)
+        new.check_connected()
+    return new
+
+
+class ScenarioBatch:
+    """
+    Results of a scenario batch.
+
+    nodes   (n_scenarios, n_nodes, 3) array of head, pressure, demand
+    links   (n_scenarios, n_links, 2) array of flowrate, velocity
+    Node and link order match EpanetSimulator results (wn.node_name_list,
+    pipe order); units are SI like wntr.
+    """
+
+    def __init__(self, nodes, links, node_names, link_names, iterations, converged):
+        self.nodes = nodes
+        self.links = links
+        self.node_names = node_names
+        self.link_names = link_names
+        self.iterations = iterations
+        self.converged = converged
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node(self, variable):
+        """(n_scenarios, n_nodes) array of one node variable."""
+        return self.nodes[:, :, NODE_VARIABLES.index(variable)]
+
+    def link(self, variable):
+        """(n_scenarios, n_links) array of one link variable."""
+        return self.links[:, :, LINK_VARIABLES.index(variable)]
+
+    def frame(self, variable):
+        """Scenario x element DataFrame of one node or link variable."""
+        if variable in NODE_VARIABLES:
+            return pd.DataFrame(self.node(variable), columns=self.node_names)
+        return pd.DataFrame(self.link(variable), columns=self.link_names)
+
+
+def _solve_chunk(net, overrides, warm_start=None):
+    """
+    Solve scenarios one after another, each warm-started from the previous
+    one, or from `warm_start` (flows, delivered demands) when given.
+    """
+    position = {name: k for k, name in enumerate(net.junction_names + net.fixed_names)}
+    order = np.array([position[n] for n in net.node_names])
+    nodes = np.empty((len(overrides), len(order), len(NODE_VARIABLES)))
+    links = np.empty((len(overrides), len(net.link_names), len(LINK_VARIABLES)))
+    iterations = np.empty(len(overrides), dtype=int)
+    converged = np.empty(len(overrides), dtype=bool)
+
+    flow = delivered = None
+    for k, override in enumerate(overrides):
+        if warm_start is not None:
+            flow, delivered = warm_start
+        scenario = apply_override(net, override)
+        if delivered is not None and not np.array_equal(scenario.demand, net.demand):
+            delivered = None        # a PDD warm start only carries over when full demands match
+        solution = solve(scenario, flows=flow, delivered=delivered if net.pressure_driven else None)
+        flow, delivered = solution.flow, solution.delivered
+        nodes[k] = np.column_stack([solution.head, solution.pressure, solution.demand])[order]
+        links[k] = np.column_stack([solution.flow, solution.velocity])
+        iterations[k] = solution.iterations
+        converged[k] = solution.converged
+    return nodes, links, iterations, converged
+
+
+def _init_worker(net, warm_start=None):
+    global _base, _warm
+    _base = net
+    _warm = warm_start
+
+
+def _solve_in_worker(overrides):
+    return _solve_chunk(_base, overrides, _warm)
+
+
+def run_scenarios(wn, overrides, n_workers=N_WORKERS, warm_start=None, allow_isolated=True):
+    """
+    Solve every override dict in `overrides` against wn and return a ScenarioBatch.
+
+    Each override may set "heads" {fixed node: head}, "demand_multiplier"
+    (scalar, or {junction: factor}), "status" {pipe: "Open"/"Closed"} and
+    "diameters" {pipe: metres}. wn itself is not modified. `warm_start`, a
+    solution of the unmodified network (hydraulic_solver.solve), seeds every
+    scenario; suited to many small independent variations of one base.
+    Junctions a "status" override cuts off from every source get zero
+    supply, unless allow_isolated=False makes that an error.
+    """
+    if isinstance(wn, NetworkArrays):
+        net = wn
+        if net.allow_isolated != allow_isolated:
+            net = copy.copy(wn)
+            net.allow_isolated = allow_isolated
+    else:
+        net = NetworkArrays(wn, allow_isolated=allow_isolated)
+    overrides = list(overrides)
+    if warm_start is not None:
+        warm_start = (warm_start.flow, warm_start.delivered)
+    n_workers = max(1, min(int(n_workers), len(overrides) // MIN_CHUNK))
+
+    if n_workers == 1:
+        parts = [_solve_chunk(net, overrides, warm_start)]
+    else:
+        chunks = [list(c) for c in np.array_split(np.array(overrides, dtype=object), n_workers)]
+        with ProcessPoolExecutor(max_workers=n_workers, initializer=_init_worker,
+                                 initargs=(net, warm_start)) as pool:
+            parts = list(pool.map(_solve_in_worker, chunks))
+
+    nodes, links, iterations, converged = (np.concatenate(p) for p in zip(*parts))
+    return ScenarioBatch(nodes, links, list(net.node_names), list(net.link_names), iterations, converged)
+
+
+# ──────────────────────────────────────────────────────────────
+# Example: every adjust_reservoir_heads.py target in one call
+# ──────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    wn = wntr.network.WaterNetworkModel(os.path.join(BASE_DIR, "data", "Bangalore_WDS_Realistic_fixed.inp"))
+
+    # Head = elevation of the junction each source feeds + target pressure (as adjust_reservoir_heads.py)
+    downstream = {}
+    for r in wn.reservoir_name_list:
+        pipe = wn.get_link(wn.get_links_for_node(r)[0])
+        other = pipe.end_node_name if pipe.start_node_name == r else pipe.start_node_name
+        downstream[r] = wn.get_node(other).elevation
+    targets = [20, 35, 40, 100]
+    overrides = [{"heads": {r: z + t for r, z in downstream.items()}} for t in targets]
+
+    t0 = time.perf_counter()
+    batch = run_scenarios(wn, overrides)
+    elapsed = time.perf_counter() - t0
+
+    pressure = batch.frame("pressure")[wn.junction_name_list]
+    summary = pd.DataFrame({"target_m": targets, "min_pressure_m": pressure.min(axis=1),
+                            "mean_pressure_m": pressure.mean(axis=1), "iterations": batch.iterations})
+    print(summary.to_string(index=False, float_format=lambda x: f"{x:.2f}"))
+    print(f"⏱️  {len(batch)} scenarios solved in {elapsed * 1000:.1f} ms; result array {batch.nodes.shape}")
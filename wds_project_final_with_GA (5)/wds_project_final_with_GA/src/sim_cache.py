@@ -0,0 +1,219 @@
+# src/sim_cache.py
+"""
+Two-tier memoization for simulations and GA fitness values.
+
+Keys are a canonical hash of the network content plus an optional decision
+vector (e.g. a GA genome). Values live in an in-memory LRU and in a SQLite
+file on disk, so identical evaluations are a lookup instead of a hydraulic
+solve, both within a run and across runs.
+
+    cache = SimulationCache()
+    key = cache.key(network_fingerprint(wn), genome)
+    value = cache.get_or_compute(key, lambda: expensive(wn, genome))
+    print(cache.stats())
+"""
+
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from sim_runner import engine_name, run_hydraulics
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_PATH = os.path.join(BASE_DIR, "cache", "simulations.sqlite")
+MEMORY_ITEMS = 4096
+
+
+# ──────────────────────────────────────────────────────────────
+# Canonical hashing
+# ──────────────────────────────────────────────────────────────
+def file_fingerprint(path):
+    """SHA-256 of a file's bytes."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def network_fingerprint(wn):
+    """
+    SHA-256 over every hydraulic input of a WaterNetworkModel: per-node
+    pressure settings, emitters, leaks and all demand categories, link
+    settings and status, curves, patterns, controls and solver options.
+
+    Elements are visited in sorted name order so two models with the same
+    content hash equal regardless of how they were built.
+    """
+    h = hashlib.sha256()
+
+    def add(*fields):
+        h.update(repr(fields).encode())
+
+    for name in sorted(wn.junction_name_list):
+        j = wn.get_node(name)
+        add("J", name, j.elevation, j.emitter_coefficient, j.minimum_pressure, j.required_pressure,
+            j.pressure_exponent, j.leak_status, j.leak_area, j.leak_discharge_coeff)
+        for d in j.demand_timeseries_list:           # every demand category, not just the first
+            add("D", d.base_value, d.pattern_name, d.category)
+    for name in sorted(wn.reservoir_name_list):
+        r = wn.get_node(name)
+        add("R", name, r.base_head, r.head_pattern_name)
+    for name in sorted(wn.tank_name_list):
+        t = wn.get_node(name)
+        add("T", name, t.elevation, t.init_level, t.min_level, t.max_level, t.diameter, t.min_vol,
+            t.vol_curve_name, t.overflow)
+    for name in sorted(wn.pipe_name_list):
+        p = wn.get_link(name)
+        add("P", name, p.start_node_name, p.end_node_name, p.length, p.diameter,
+            p.roughness, p.minor_loss, str(p.initial_status), p.check_valve)
+    for name in sorted(wn.pump_name_list):
+        p = wn.get_link(name)
+        curve = wn.get_curve(p.head_curve_name).points if getattr(p, "head_curve_name", None) else None
+        add("U", name, p.start_node_name, p.end_node_name, str(p.initial_status), p.pump_type, curve,
+            getattr(p, "power", None), p.base_speed, p.speed_pattern_name, p.initial_setting)
+    for name in sorted(wn.valve_name_list):
+        v = wn.get_link(name)
+        add("V", name, v.start_node_name, v.end_node_name, v.valve_type, str(v.initial_status),
+            v.initial_setting, v.diameter, v.minor_loss)
+    for name in sorted(wn.curve_name_list):
+        add("C", name, wn.get_curve(name).curve_type, list(wn.get_curve(name).points))
+    for name in sorted(wn.pattern_name_list):
+        add("PAT", name, list(wn.get_pattern(name).multipliers))
+    for name, control in sorted(wn.controls()):
+        add("CTL", name, str(control))
+
+    hyd = wn.options.hydraulic
+    add("O", hyd.headloss, hyd.demand_model, hyd.demand_multiplier, hyd.minimum_pressure,
+        hyd.required_pressure, hyd.pressure_exponent, hyd.emitter_exponent, hyd.viscosity,
+        hyd.specific_gravity, hyd.pattern, hyd.accuracy, hyd.trials, hyd.unbalanced, hyd.unbalanced_value,
+        wn.options.time.duration, wn.options.time.hydraulic_timestep, wn.options.time.pattern_timestep,
+        wn.options.time.pattern_start, wn.options.time.start_clocktime)
+    return h.hexdigest()
+
+
+# ──────────────────────────────────────────────────────────────
+# Cache
+# ──────────────────────────────────────────────────────────────
+class SimulationCache:
+    """In-memory LRU in front of a SQLite key/value file, with hit/miss counters."""
+
+    def __init__(self, path=CACHE_PATH, memory_items=MEMORY_ITEMS):
+        self.path = path
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._conn_pid = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    # --- keys -------------------------------------------------
+    @staticmethod
+    def key(network_key, decision=None):
+        """Combine a network fingerprint and an optional decision vector into one key."""
+        h = hashlib.sha256(network_key.encode())
+        if decision is not None:
+            h.update(np.ascontiguousarray(decision, dtype=np.float64).tobytes())
+        return h.hexdigest()
+
+    # --- disk tier --------------------------------------------
+    def _db(self):
+        # SQLite connections must not cross a fork, so open one per process
+        if self.path is None:
+            return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB)")
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    # --- lookup -----------------------------------------------
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key]
+
+            db = self._db()
+            row = db.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone() if db else None
+            if row is None:
+                self.misses += 1
+                return default
+
+            self.disk_hits += 1
+            value = pickle.loads(row[0])
+            self._remember(key, value)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._remember(key, value)
+            db = self._db()
+            if db is not None:
+                db.execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)",
+                           (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)))
+                db.commit()
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    # --- counters ---------------------------------------------
+    @property
+    def hits(self):
+        return self.memory_hits + self.disk_hits
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            db = self._db()
+            if db is not None:
+                db.execute("DELETE FROM cache")
+                db.commit()
+
+    def close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+
+def run_hydraulics_cached(wn, cache, engine=None, session=None):
+    """
+    run_hydraulics() memoized on the network's content and engine; cache=None disables it.
+
+    Pass a HydraulicSession built on wn to have cache misses solved warm
+    from the session's previous solution.
+    """
+    engine = session.engine if session is not None else engine_name(engine)
+    compute = session.run if session is not None else (lambda: run_hydraulics(wn, engine))
+    if cache is None:
+        return compute()
+    return cache.get_or_compute(cache.key(f"{engine}:{network_fingerprint(wn)}"), compute)
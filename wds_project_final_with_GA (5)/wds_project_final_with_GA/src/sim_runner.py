@@ -0,0 +1,150 @@
+# src/sim_runner.py
+"""
+Isolated EPANET runs.
+
+wntr's EpanetSimulator writes temp.inp / temp.rpt / temp.bin into the current
+working directory, so two runs started from the same folder overwrite each
+other's files. run_epanet() gives every call its own private scratch
+directory (on tmpfs when the host has one) and removes it afterwards, which
+makes it safe to call from many threads and processes at once.
+
+Note: the WaterNetworkModel itself is not copied. Threads that modify a
+network must each work on their own model.
+
+run_hydraulics() is what the scripts call. It dispatches to EPANET or to the
+in-process solver in hydraulic_solver.py; set WDS_ENGINE=native to use the
+latter (results have the same layout either way). Loops that edit one
+network and re-solve it should use a HydraulicSession, which warm-starts the
+native solver from the previous solution.
+
+epanet_output() runs EPANET without parsing its results: it yields an
+EpanetOutput mapped over the binary output, from which only the wanted
+variables, elements and periods are read. final_state() uses it to return
+just the last period of a few variables from either engine.
+
+set_pressure_driven() switches a network to pressure-driven demand (PDD):
+junctions then draw only what their pressure allows and the results' node
+demand is the delivered flow. Both engines honour it.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+import pandas as pd
+import wntr
+
+from epanet_output import OutputReader
+from hydraulic_solver import SolverSession, run_native
+
+# Scratch files go to RAM-backed /dev/shm where available; override with WDS_SCRATCH_DIR
+_SHM = "/dev/shm"
+SCRATCH_ROOT = os.environ.get("WDS_SCRATCH_DIR") or (
+    _SHM if os.path.isdir(_SHM) and os.access(_SHM, os.W_OK) else None
+)
+
+ENGINES = ("epanet", "native")
+DEMAND_MODELS = ("DDA", "PDD")
+
+
+@contextmanager
+def scratch_dir(prefix="wds_epanet_"):
+    """Yield a fresh private directory that is deleted on exit."""
+    path = tempfile.mkdtemp(prefix=prefix, dir=SCRATCH_ROOT)
+    try:
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def run_epanet(wn, **run_kwargs):
+    """Run EpanetSimulator on wn in a private scratch directory and return the results."""
+    with scratch_dir() as path:
+        sim = wntr.sim.EpanetSimulator(wn)
+        return sim.run_sim(file_prefix=os.path.join(path, "run"), **run_kwargs)
+
+
+@contextmanager
+def epanet_output(wn, **run_kwargs):
+    """
+    Run EPANET on wn and yield an EpanetOutput over its binary results; it
+    is closed and its scratch directory removed when the block exits.
+    """
+    with scratch_dir() as path:
+        sim = wntr.sim.EpanetSimulator(wn, reader=OutputReader())
+        out = sim.run_sim(file_prefix=os.path.join(path, "run"), **run_kwargs)
+        try:
+            yield out
+        finally:
+            out.close()
+
+
+def engine_name(engine=None):
+    """The engine to use: `engine` if given, else WDS_ENGINE, else EPANET."""
+    engine = engine or os.environ.get("WDS_ENGINE", "epanet")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown hydraulic engine: {engine} (choose from {ENGINES})")
+    return engine
+
+
+def set_pressure_driven(wn, minimum_pressure=0.0, required_pressure=10.0, exponent=0.5):
+    """
+    Switch wn to pressure-driven analysis: no supply at or below
+    `minimum_pressure`, full demand from `required_pressure` (metres) up,
+    and demand * ((p - Pmin) / (Preq - Pmin)) ** exponent in between.
+    """
+    if required_pressure <= minimum_pressure:
+        raise ValueError(f"Required pressure ({required_pressure} m) must exceed "
+                         f"minimum pressure ({minimum_pressure} m).")
+    opts = wn.options.hydraulic
+    opts.demand_model = "PDD"
+    opts.minimum_pressure = float(minimum_pressure)
+    opts.required_pressure = float(required_pressure)
+    opts.pressure_exponent = float(exponent)
+
+
+def run_hydraulics(wn, engine=None):
+    """Steady-state results for wn from the selected engine."""
+    if engine_name(engine) == "native":
+        return run_native(wn)
+    return run_epanet(wn)
+
+
+def final_state(wn, node_variables=("pressure",), link_variables=(), engine=None):
+    """
+    Last-period values of the requested variables as two DataFrames
+    (nodes x node_variables, links x link_variables), SI units. With EPANET
+    only those columns of the final period are read from the output file.
+    """
+    if engine_name(engine) == "native":
+        results = run_native(wn)
+        nodes = {v: results.node[v].iloc[-1].to_numpy() for v in node_variables}
+        links = {v: results.link[v].iloc[-1].to_numpy() for v in link_variables}
+        node_names, link_names = results.node["pressure"].columns, results.link["flowrate"].columns
+    else:
+        with epanet_output(wn) as out:
+            nodes = {v: out.node(v, periods=-1) for v in node_variables}
+            links = {v: out.link(v, periods=-1) for v in link_variables}
+            node_names, link_names = out.node_names, out.link_names
+    return (pd.DataFrame(nodes, index=pd.Index(node_names, name="name"), columns=list(node_variables)),
+            pd.DataFrame(links, index=pd.Index(link_names, name="name"), columns=list(link_variables)))
+
+
+class HydraulicSession:
+    """
+    Re-solve one network that a script edits in place between runs.
+
+    With the native engine each run warm-starts from the previous flows and
+    reuses the matrix structure; with EPANET every run is a normal cold run.
+    """
+
+    def __init__(self, wn, engine=None):
+        self.wn = wn
+        self.engine = engine_name(engine)
+        self._solver = SolverSession(wn) if self.engine == "native" else None
+
+    def run(self):
+        if self._solver is None:
+            return run_epanet(self.wn)
+        return self._solver.run()
@@ -0,0 +1,265 @@
+# src/skeleton.py
+"""
+Network skeletonisation with a reversible junction mapping.
+
+Optimisation and calibration loops solve the same network thousands of
+times and rarely need every dead-end branch or series pipe. skeletonize()
+reduces a WaterNetworkModel with wntr's morph.skeletonize (branch trimming,
+series pipe merging, parallel pipe merging, repeated until nothing changes);
+only junctions whose demand is at or below DEMAND_THRESHOLD_LPS may be
+removed, and their demand is lumped onto the neighbouring junction that
+absorbs them. Merged pipes get an equivalent Hazen-Williams roughness, so
+the reduced network carries the same flows.
+
+    skel = skeletonize(wn, demand_threshold=5.0)      # LPS
+    skel.save("data/Bangalore_WDS_skeleton.inp")      # + .map.json mapping
+    nodes, _ = final_state(skel.wn, ("head", "pressure", "demand"))
+    full = skel.expand(nodes)                          # every original junction
+
+Every original junction maps to the junction that now stands for it.
+expand() gives it that junction's head, its own pressure (head minus its
+own elevation) and its own share of the delivered demand. Wards are
+junctions (J<k> is ward k), so ward reports work on expanded results
+unchanged. accuracy() solves both models and reports the error this
+introduces.
+
+    python src/skeleton.py data/Bangalore_WDS_Realistic.inp --demand-threshold 5
+"""
+
+import argparse
+import json
+import os
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import wntr
+
+from sim_runner import ENGINES, final_state, scratch_dir, set_pressure_driven
+from wards import ward_names
+
+# ──────────────────────────────────────────────────────────────
+# Configuration
+# ──────────────────────────────────────────────────────────────
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INP_FILE = os.path.join(BASE_DIR, "data", "Bangalore_WDS_Realistic.inp")
+ACCURACY_CSV = os.path.join(BASE_DIR, "reports", "skeleton_accuracy.csv")
+
+DEMAND_THRESHOLD_LPS = 1.0        # junctions drawing more than this are always kept
+MAP_SUFFIX = ".map.json"          # mapping file written next to the reduced INP
+MAP_VERSION = 1
+
+
+@contextmanager
+def _in_scratch_dir():
+    """wntr's skeletonize runs EPANET from the current directory (temp.inp/.bin/.rpt); keep that private."""
+    cwd = os.getcwd()
+    with scratch_dir("wds_skeleton_") as path:
+        os.chdir(path)
+        try:
+            yield
+        finally:
+            os.chdir(cwd)
+
+
+class Skeleton:
+    """
+    A reduced network and the way back to the full one.
+
+    wn          reduced WaterNetworkModel
+    junctions   {original junction: (junction it maps to, elevation m, base demand m³/s)}
+    removed_pipes  original pipes no longer in wn (trimmed, or merged into a kept pipe)
+    """
+
+    def __init__(self, wn, junctions, removed_pipes, settings):
+        self.wn = wn
+        self.junctions = junctions
+        self.removed_pipes = removed_pipes
+        self.settings = settings
+
+    @property
+    def removed_junctions(self):
+        return [j for j, (owner, _, _) in self.junctions.items() if owner != j]
+
+    def summary(self):
+        n = len(self.junctions)
+        return {"junctions": n, "kept_junctions": n - len(self.removed_junctions),
+                "pipes": self.wn.num_pipes + len(self.removed_pipes), "kept_pipes": self.wn.num_pipes}
+
+    def expand(self, nodes):
+        """
+        Node results of the reduced network (DataFrame indexed by node name
+        with any of head / pressure / demand, as final_state returns) for
+        every original node: removed junctions take their owner's head,
+        their own pressure, and their own demand scaled by the share the
+        owner received.
+        """
+        originals = list(self.junctions)
+        owner = [self.junctions[j][0] for j in originals]
+        elevation = np.array([self.junctions[j][1] for j in originals])
+        demand = np.array([self.junctions[j][2] for j in originals])
+        out = pd.DataFrame(index=pd.Index(originals, name=nodes.index.name))
+
+        if "head" in nodes.columns:
+            head = nodes["head"].reindex(owner).to_numpy()
+            out["head"] = head
+        if "pressure" in nodes.columns:
+            if "head" in nodes.columns:
+                out["pressure"] = head - elevation
+            else:
+                owner_elevation = np.array([self.junctions[o][1] for o in owner])
+                out["pressure"] = nodes["pressure"].reindex(owner).to_numpy() + owner_elevation - elevation
+        if "demand" in nodes.columns:
+            # Requested at each owner = its own demand plus everything lumped onto it
+            requested = pd.Series(demand, index=owner).groupby(level=0).sum()
+            delivered = nodes["demand"].reindex(requested.index)
+            share = (delivered / requested.where(requested.abs() > 0)).fillna(1.0)
+            out["demand"] = demand * share.reindex(owner).to_numpy()
+
+        # Reservoirs and tanks are never removed
+        others = nodes.loc[~nodes.index.isin(self.junctions)]
+        return pd.concat([out, others[[c for c in out.columns if c in others.columns]]])
+
+    def save(self, inp_path):
+        """Write the reduced INP and its mapping (inp_path with MAP_SUFFIX in place of .inp)."""
+        wntr.network.io.write_inpfile(self.wn, inp_path)
+        with open(map_path(inp_path), "w") as f:
+            json.dump({"version": MAP_VERSION, "settings": self.settings,
+                       "junctions": {j: list(v) for j, v in self.junctions.items()},
+                       "removed_pipes": self.removed_pipes}, f, indent=1)
+
+    @classmethod
+    def load(cls, inp_path):
+        with open(map_path(inp_path)) as f:
+            mapping = json.load(f)
+        if mapping.get("version") != MAP_VERSION:
+            raise ValueError(f"{map_path(inp_path)}: unsupported mapping version {mapping.get('version')}")
+        junctions = {j: (owner, float(z), float(d)) for j, (owner, z, d) in mapping["junctions"].items()}
+        return cls(wntr.network.WaterNetworkModel(inp_path), junctions, mapping["removed_pipes"],
+                   mapping["settings"])
+
+
+def map_path(inp_path):
+    stem, _ = os.path.splitext(inp_path)
+    return stem + MAP_SUFFIX
+
+
+def skeletonize(wn, demand_threshold=DEMAND_THRESHOLD_LPS, diameter_threshold=None, keep=(),
+                branch_trim=True, series_pipe_merge=True, parallel_pipe_merge=True, max_cycles=None):
+    """
+    Reduced copy of wn (wn is untouched). Junctions with a demand above
+    `demand_threshold` (LPS) or listed in `keep` stay; pipes wider than
+    `diameter_threshold` (metres, default any size) are never merged or
+    trimmed. Returns a Skeleton.
+    """
+    multiplier = wn.options.hydraulic.demand_multiplier
+    demand = {j: wn.get_node(j).demand_timeseries_list.at(0, multiplier=multiplier) for j in wn.junction_name_list}
+    elevation = {j: wn.get_node(j).elevation for j in wn.junction_name_list}
+    protected = sorted({j for j, d in demand.items() if abs(d) * 1000.0 > demand_threshold} | set(keep))
+
+    with _in_scratch_dir():
+        reduced, node_map = wntr.morph.skeletonize(
+            wn, np.inf if diameter_threshold is None else diameter_threshold,
+            branch_trim=branch_trim, series_pipe_merge=series_pipe_merge,
+            parallel_pipe_merge=parallel_pipe_merge, max_cycles=max_cycles,
+            junctions_to_exclude=protected, return_map=True)
+
+    owner = {}
+    for kept, merged in node_map.items():
+        for j in merged:
+            owner[j] = kept
+    junctions = {j: (owner[j], elevation[j], demand[j]) for j in wn.junction_name_list}
+    kept_pipes = set(reduced.pipe_name_list)
+    removed_pipes = [p for p in wn.pipe_name_list if p not in kept_pipes]
+    settings = {"demand_threshold_lps": demand_threshold,
+                "diameter_threshold_m": diameter_threshold, "protected_junctions": len(protected)}
+    return Skeleton(reduced, junctions, removed_pipes, settings)
+
+
+# ──────────────────────────────────────────────────────────────
+# Accuracy against the full model
+# ──────────────────────────────────────────────────────────────
+def accuracy(wn, skel, engine=None):
+    """
+    Solve the full and the reduced network and compare them at every
+    original junction. Returns (summary dict, per-junction DataFrame).
+    """
+    variables = ("head", "pressure", "demand")
+    t0 = time.perf_counter()
+    full, _ = final_state(wn, variables, engine=engine)
+    t_full = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    reduced, _ = final_state(skel.wn, variables, engine=engine)
+    t_reduced = time.perf_counter() - t0
+    expanded = skel.expand(reduced)
+
+    junctions = list(skel.junctions)
+    names = ward_names(junctions)
+    table = pd.DataFrame({
+        "node": junctions,
+        "ward": [names[j] for j in junctions],
+        "mapped_to": [skel.junctions[j][0] for j in junctions],
+        "pressure_full_m": full["pressure"].reindex(junctions).to_numpy(),
+        "pressure_skeleton_m": expanded["pressure"].reindex(junctions).to_numpy(),
+        "demand_full_LPS": full["demand"].reindex(junctions).to_numpy() * 1000.0,
+        "demand_skeleton_LPS": expanded["demand"].reindex(junctions).to_numpy() * 1000.0,
+    })
+    table["pressure_error_m"] = table["pressure_skeleton_m"] - table["pressure_full_m"]
+    error = table["pressure_error_m"].abs()
+    delivered = table["demand_full_LPS"].sum()
+    summary = dict(skel.summary(), **{
+        "max_pressure_error_m": error.max(),
+        "mean_pressure_error_m": error.mean(),
+        "rms_pressure_error_m": float(np.sqrt((table["pressure_error_m"] ** 2).mean())),
+        "delivered_full_LPS": delivered,
+        "delivered_skeleton_LPS": table["demand_skeleton_LPS"].sum(),
+        "solve_full_s": t_full,
+        "solve_skeleton_s": t_reduced,
+    })
+    return summary, table
+
+
+# ──────────────────────────────────────────────────────────────
+# Main
+# ──────────────────────────────────────────────────────────────
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Skeletonise a network and report the accuracy lost.")
+    parser.add_argument("inp_file", nargs="?", default=INP_FILE)
+    parser.add_argument("--demand-threshold", type=float, default=DEMAND_THRESHOLD_LPS,
+                        help="LPS; junctions drawing more are never removed")
+    parser.add_argument("--diameter-threshold", type=float, default=None,
+                        help="mm; wider pipes are never merged or trimmed (default: any size)")
+    parser.add_argument("--keep", nargs="+", default=[], metavar="JUNCTION", help="junctions to keep")
+    parser.add_argument("--max-cycles", type=int, default=None)
+    parser.add_argument("--output", help="reduced INP (default: <input>_skeleton.inp next to the input)")
+    parser.add_argument("--pdd", action="store_true", help="compare under pressure-driven demand")
+    parser.add_argument("--engine", choices=ENGINES, default=None,
+                        help="hydraulic engine for the comparison (default: $WDS_ENGINE or epanet)")
+    parser.add_argument("--no-save", action="store_true", help="report only; write no files")
+    args = parser.parse_args()
+
+    wn = wntr.network.WaterNetworkModel(args.inp_file)
+    if args.pdd:
+        set_pressure_driven(wn)
+    diameter = None if args.diameter_threshold is None else args.diameter_threshold / 1000.0
+    skel = skeletonize(wn, args.demand_threshold, diameter, args.keep, max_cycles=args.max_cycles)
+    counts = skel.summary()
+    print(f"🦴 {counts['junctions']} → {counts['kept_junctions']} junctions, "
+          f"{counts['pipes']} → {counts['kept_pipes']} pipes")
+
+    summary, table = accuracy(wn, skel, args.engine)
+    print(f"📏 Pressure error at original junctions: max {summary['max_pressure_error_m']:.3f} m, "
+          f"mean {summary['mean_pressure_error_m']:.3f} m, RMS {summary['rms_pressure_error_m']:.3f} m")
+    print(f"💧 Delivered: {summary['delivered_skeleton_LPS']:.1f} LPS vs {summary['delivered_full_LPS']:.1f} LPS full")
+    print(f"⏱️  Solve: {summary['solve_skeleton_s'] * 1000:.1f} ms vs {summary['solve_full_s'] * 1000:.1f} ms full")
+    worst = table.reindex(table["pressure_error_m"].abs().sort_values(ascending=False).index).head(5)
+    if counts["kept_junctions"] < counts["junctions"]:
+        print(worst.to_string(index=False, float_format=lambda x: f"{x:.3f}"))
+
+    if not args.no_save:
+        output = args.output or os.path.splitext(args.inp_file)[0] + "_skeleton.inp"
+        skel.save(output)
+        os.makedirs(os.path.dirname(ACCURACY_CSV), exist_ok=True)
+        table.to_csv(ACCURACY_CSV, index=False)
+        print(f"✅ Saved {output}, {map_path(output)} and {ACCURACY_CSV}")
@@ -0,0 +1,107 @@
+# src/surrogate.py
+"""
+Online surrogate model for pre-screening GA candidates.
+
+A multi-output ridge regression learns genome features -> hydraulic
+outcomes (penalty, unserved demand, minimum pressure) from every candidate
+that has been through the real simulator. Each generation the GA predicts
+all new candidates and only sends the most promising fraction to EPANET;
+the rest keep their predicted objective for selection.
+
+Accuracy is measured on every batch *before* it is added to the training
+set, so the reported numbers are honest out-of-sample scores.
+"""
+
+import numpy as np
+
+# Outcomes learned from each simulated candidate, in column order
+TARGETS = ("penalty", "unserved_LPS", "min_pressure_m")
+
+
+def targets_from_result(obj, diag):
+    """Training targets for one simulated candidate."""
+    return [obj - diag["total_capex"],
+            diag["total_demand_LPS"] - diag["total_delivered_LPS"],
+            diag["min_pressure_m"]]
+
+
+class RidgeSurrogate:
+    """
+    Ridge regression on standardised features, refit from scratch on demand.
+
+    Uses the primal normal equations when there are fewer features than
+    samples and the dual (kernel) form otherwise, so the solve stays small
+    for both short and very long genomes.
+    """
+
+    def __init__(self, alpha=1.0, min_samples=16, max_samples=5000):
+        self.alpha = alpha
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self._X = None
+        self._Y = None
+        self._model = None
+
+    @property
+    def n_samples(self):
+        return 0 if self._X is None else len(self._X)
+
+    @property
+    def ready(self):
+        return self.n_samples >= self.min_samples
+
+    def add(self, X, Y):
+        """Append training samples (keeps the most recent max_samples) and refit."""
+        X = np.asarray(X, dtype=float)
+        Y = np.asarray(Y, dtype=float).reshape(len(X), -1)
+        self._X = X if self._X is None else np.vstack([self._X, X])[-self.max_samples:]
+        self._Y = Y if self._Y is None else np.vstack([self._Y, Y])[-self.max_samples:]
+        if self.ready:
+            self._fit()
+
+    def _fit(self):
+        X, Y = self._X, self._Y
+        x_mean, x_std = X.mean(axis=0), X.std(axis=0)
+        x_std[x_std == 0] = 1.0
+        y_mean, y_std = Y.mean(axis=0), Y.std(axis=0)
+        y_std[y_std == 0] = 1.0
+        Xs = (X - x_mean) / x_std
+        Ys = (Y - y_mean) / y_std
+
+        n, p = Xs.shape
+        if p <= n:
+            W = np.linalg.solve(Xs.T @ Xs + self.alpha * np.eye(p), Xs.T @ Ys)
+        else:
+            W = Xs.T @ np.linalg.solve(Xs @ Xs.T + self.alpha * np.eye(n), Ys)
+        self._model = (x_mean, x_std, y_mean, y_std, W)
+
+    def predict(self, X):
+        """Predicted targets, shape (n, len(TARGETS))."""
+        if self._model is None:
+            raise RuntimeError("Surrogate has not been trained yet.")
+        x_mean, x_std, y_mean, y_std, W = self._model
+        Xs = (np.asarray(X, dtype=float) - x_mean) / x_std
+        return (Xs @ W) * y_std + y_mean
+
+
+def accuracy(predicted, actual):
+    """R² and Spearman rank correlation between predicted and true objectives."""
+    predicted = np.asarray(predicted, dtype=float)
+    actual = np.asarray(actual, dtype=float)
+    if len(actual) < 2:
+        return {"r2": np.nan, "rank_corr": np.nan}
+    ss_res = np.sum((actual - predicted) ** 2)
+    ss_tot = np.sum((actual - actual.mean()) ** 2)
+    r2 = 1.0 - ss_res / ss_tot if ss_tot > 0 else np.nan
+    ranks_p = np.argsort(np.argsort(predicted))
+    ranks_a = np.argsort(np.argsort(actual))
+    rank_corr = np.corrcoef(ranks_p, ranks_a)[0, 1] if ranks_a.std() > 0 and ranks_p.std() > 0 else np.nan
+    return {"r2": float(r2), "rank_corr": float(rank_corr)}
+
+
+def screen(predicted_obj, fraction, always=()):
+    """Indices to simulate: the best `fraction` by predicted objective, plus `always`."""
+    n = len(predicted_obj)
+    k = max(1, int(np.ceil(fraction * n)))
+    chosen = set(np.argsort(predicted_obj)[:k].tolist()) | set(int(i) for i in always)
+    return np.array(sorted(chosen), dtype=int)
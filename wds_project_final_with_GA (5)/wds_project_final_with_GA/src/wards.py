@@ -0,0 +1,29 @@
+# src/wards.py
+"""
+Ward lookups shared by the analysis scripts.
+
+Wards are junctions: ward k of data/ward_demands_from_csv.csv is junction
+J<k> (as in generate_reports.py), so a junction is reported under its ward
+name wherever one is known.
+
+    names = ward_names(wn.junction_name_list)     # {"J1": "Kempegowda Ward", ...}
+"""
+
+import os
+
+import pandas as pd
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+WARD_DEMANDS = os.path.join(BASE_DIR, "data", "ward_demands_from_csv.csv")
+
+
+def ward_names(junctions, ward_demands=WARD_DEMANDS):
+    """{junction: ward name}; junctions without a ward (or without the CSV) keep their own name."""
+    names = {j: j for j in junctions}
+    if os.path.exists(ward_demands):
+        wards = pd.read_csv(ward_demands)
+        if "Ward Name" in wards.columns:
+            for k, ward in enumerate(wards["Ward Name"].astype(str)):
+                if f"J{k + 1}" in names:
+                    names[f"J{k + 1}"] = ward
+    return names
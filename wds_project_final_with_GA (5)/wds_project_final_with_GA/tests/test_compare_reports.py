@@ -0,0 +1,55 @@
+# tests/test_compare_reports.py
+import os
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from compare_reports import default_labels, diff_reports, load_versions, save_changes
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT = os.path.join(BASE_DIR, "reports", "final_water_report_checked.csv")
+
+
+def test_default_labels_are_unique_for_same_named_reports():
+    paths = ["runs/a/final_water_report_checked.csv", "runs/b/final_water_report_checked.csv", "other.csv"]
+    assert default_labels(paths) == ["a/final_water_report_checked", "b/final_water_report_checked", "other"]
+    assert default_labels(["r.csv", "r.csv"]) == ["r#1", "r#2"]
+
+
+def test_run_folders_diff(tmp_path):
+    report = pd.read_csv(REPORT)
+    paths = []
+    for run in ("run1", "run2", "run3"):
+        os.makedirs(tmp_path / run)
+        paths.append(str(tmp_path / run / "final_water_report_checked.csv"))
+    report.to_csv(paths[0], index=False)
+    report.to_csv(paths[1], index=False)
+    changed = report.copy()
+    changed.loc[1, "Pressure(m)"] += 1.0
+    changed.iloc[1:].to_csv(paths[2], index=False)
+
+    changes = diff_reports(load_versions(paths))
+    assert set(changes["to"]) == {"run3/final_water_report_checked"}
+    assert sorted(changes["status"]) == ["changed", "removed"]
+
+    out = subprocess.run([sys.executable, os.path.join(BASE_DIR, "src", "compare_reports.py"), *paths, "--no-save"],
+                         capture_output=True, text=True, check=True).stdout
+    assert "run1/final_water_report_checked → run2/final_water_report_checked: 198 matching wards, 0 changed" in out
+
+
+def test_failed_parquet_write_leaves_no_file(tmp_path, monkeypatch):
+    def no_engine(self, path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"PAR1")                 # a writer that fails part way through
+        raise ImportError("Unable to find a usable engine")
+
+    monkeypatch.setattr(pd.DataFrame, "to_parquet", no_engine)
+    changes = diff_reports(load_versions([REPORT, REPORT]))
+    with pytest.raises(ImportError):
+        save_changes(changes, str(tmp_path / "changes.parquet"))
+    assert list(tmp_path.iterdir()) == []
+
+    save_changes(changes, str(tmp_path / "changes.json"))
+    assert [p.name for p in tmp_path.iterdir()] == ["changes.json"]
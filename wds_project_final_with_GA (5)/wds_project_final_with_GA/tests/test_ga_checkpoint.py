@@ -0,0 +1,29 @@
+# tests/test_ga_checkpoint.py
+import pytest
+
+import ga_optimizer
+from ga_checkpoint import StoppingRules, load_checkpoint
+
+
+@pytest.fixture
+def small_ga(monkeypatch):
+    monkeypatch.setattr(ga_optimizer, "POP_SIZE", 4)
+    monkeypatch.setattr(ga_optimizer, "SURROGATE_MIN_SAMPLES", 4)
+
+
+def _run(checkpoint, generations, monkeypatch, resume=False, use_surrogate=False):
+    monkeypatch.setattr(ga_optimizer, "GENERATIONS", generations)
+    return ga_optimizer.evolve(ga_optimizer.INP_FILE, 1, None, 7, resume=resume, stopping=StoppingRules(),
+                               checkpoint_path=str(checkpoint), use_surrogate=use_surrogate)
+
+
+@pytest.mark.parametrize("first, second", [(True, False), (True, True), (False, True), (False, False)])
+def test_resume_with_and_without_surrogate(tmp_path, monkeypatch, small_ga, first, second):
+    checkpoint = tmp_path / "ga_checkpoint.pkl"
+    _, _, _, before = _run(checkpoint, 2, monkeypatch, use_surrogate=first)
+    assert (load_checkpoint(str(checkpoint))["surrogate"] is not None) == first
+
+    _, best_obj, _, history = _run(checkpoint, 3, monkeypatch, resume=True, use_surrogate=second)
+    assert len(history) == 3 and history[:2] == before
+    assert history[-1] == best_obj
+    assert history == sorted(history, reverse=True)
@@ -0,0 +1,36 @@
+# tests/test_scenarios.py
+import os
+
+import numpy as np
+import pytest
+import wntr
+
+from hydraulic_solver import NetworkArrays
+from scenarios import run_scenarios
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INP_FILE = os.path.join(BASE_DIR, "data", "Bangalore_WDS_Realistic_fixed.inp")
+
+
+def test_docstring_example_runs():
+    wn = wntr.network.WaterNetworkModel(INP_FILE)
+    batch = run_scenarios(wn, [
+        {"heads": {"Reservoir1": 120.0, "Borewell2": 95.0}},
+        {"demand_multiplier": 1.2},
+        {"status": {"P_Reservoir1_J1": "Closed"}},
+        {"diameters": {"P_Reservoir1_J1": 0.3}},
+    ], n_workers=1)
+    assert batch.nodes.shape == (4, len(wn.node_name_list), 3)
+    assert batch.converged.all()
+
+    j1 = batch.node_names.index("J1")
+    assert batch.node("demand")[2, j1] == 0.0             # cut off by the closure: no supply
+    assert batch.node("demand")[0, j1] > 0.0
+    assert np.isfinite(batch.frame("pressure").to_numpy()).all()
+
+
+def test_isolation_can_still_be_an_error():
+    wn = wntr.network.WaterNetworkModel(INP_FILE)
+    with pytest.raises(ValueError):
+        run_scenarios(NetworkArrays(wn), [{"status": {"P_Reservoir1_J1": "Closed"}}],
+                      n_workers=1, allow_isolated=False)
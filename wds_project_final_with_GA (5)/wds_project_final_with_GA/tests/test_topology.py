@@ -0,0 +1,66 @@
+# tests/test_topology.py
+from itertools import permutations
+
+from compact_network import load_network
+from topology import TopologyIndex
+
+# R1 - J1 - J2 - J3 - J4 - R2, plus a dead-end branch J2 - J5 - J6
+CHAIN_INP = """[OPTIONS]
+UNITS LPS
+HEADLOSS H-W
+
+[JUNCTIONS]
+J1 10 1
+J2 10 1
+J3 10 1
+J4 10 1
+J5 10 1
+J6 10 1
+
+[RESERVOIRS]
+R1 50
+R2 50
+
+[PIPES]
+P1 R1 J1 100 150 100 0 Open
+P2 J1 J2 100 150 100 0 Open
+P3 J2 J3 100 150 100 0 Open
+P4 J3 J4 100 150 100 0 Open
+P5 J4 R2 100 150 100 0 Open
+P6 J2 J5 100 150 100 0 Open
+P7 J5 J6 100 150 100 0 Open
+
+[END]
+"""
+
+
+def _index(tmp_path):
+    path = tmp_path / "chain.inp"
+    path.write_text(CHAIN_INP)
+    return TopologyIndex(load_network(str(path)))
+
+
+def _isolated(topo, links):
+    return sorted(str(n) for n in topo.net.node_names[topo.isolated_by(links)])
+
+
+def test_isolated_by_segment_is_order_independent(tmp_path):
+    topo = _index(tmp_path)
+    cases = {
+        ("P2", "P4"): ["J2", "J3", "J5", "J6"],
+        ("P2", "P4", "P6"): ["J2", "J3", "J5", "J6"],
+        ("P6", "P7"): ["J5", "J6"],
+        ("P1", "P3", "P7"): ["J1", "J2", "J5", "J6"],
+    }
+    for links, expected in cases.items():
+        for order in permutations(links):
+            assert _isolated(topo, list(order)) == expected, order
+    assert topo.n_components == 1 and not topo.cut_off().size
+
+
+def test_isolated_by_skips_junctions_already_cut_off(tmp_path):
+    topo = _index(tmp_path)
+    topo.close_link("P6")
+    assert _isolated(topo, ["P7"]) == []
+    assert _isolated(topo, ["P2", "P4"]) == ["J2", "J3"]
+    assert _isolated(topo, ["P4", "P2", "P7"]) == ["J2", "J3"]